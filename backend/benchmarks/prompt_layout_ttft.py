@@ -0,0 +1,113 @@
+"""Time-to-first-token with the default vs. the prefix-stable prompt layout.
+
+Builds a synthetic population, samples patch prompts the way the runner does
+(random inspirations, meta recommendations) and streams a few tokens of the
+answer for each prompt. With the prefix-stable layout, consecutive prompts
+share their system prompt, recommendations and the sorted inspirations, so
+a server with prompt caching (e.g. Ollama) only prefills the new suffix.
+
+    python backend/benchmarks/prompt_layout_ttft.py --model ollama:gemma3:latest
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from shinka.core.sampler import PROMPT_LAYOUTS, PromptSampler  # noqa: E402
+from shinka.database import Program  # noqa: E402
+from shinka.llm import LLMClient  # noqa: E402
+
+RECOMMENDATIONS = "\n".join(
+    f"{i}. Try variant {i} of the approach and report its effect on the score."
+    for i in range(1, 6)
+)
+
+
+def make_population(size: int, lines: int) -> list:
+    programs = []
+    for i in range(size):
+        body = "\n".join(f"    x{j} = {i} * {j} + {j % 7}" for j in range(lines))
+        code = (
+            "import math\n\n# EVOLVE-BLOCK-START\n"
+            f"def solve():\n{body}\n    return x0\n# EVOLVE-BLOCK-END\n"
+        )
+        programs.append(
+            Program(
+                id=f"prog-{i:04d}",
+                code=code,
+                generation=i,
+                island_idx=0,
+                combined_score=random.random(),
+                public_metrics={"score": random.random()},
+                correct=True,
+            )
+        )
+    return programs
+
+
+def run_layout(layout: str, args, population: list) -> list:
+    sampler = PromptSampler(patch_types=["diff"], prompt_layout=layout)
+    llm = LLMClient(
+        model_names=[args.model],
+        temperatures=0.0,
+        max_tokens=args.max_tokens,
+        verbose=False,
+        stream=True,
+        keep_alive=args.keep_alive if layout == "prefix_stable" else None,
+    )
+    parent = population[-1]
+    # Each island keeps a slowly changing set of inspirations
+    pool = population[:-1]
+    ttfts = []
+    # The first query may load the model and always prefills the full prompt
+    for i in range(args.samples + 1):
+        inspirations = random.sample(pool, args.num_inspirations)
+        sys_msg, user_msg, _ = sampler.sample(
+            parent=parent,
+            archive_inspirations=inspirations[: args.num_inspirations // 2],
+            top_k_inspirations=inspirations[args.num_inspirations // 2 :],
+            meta_recommendations=RECOMMENDATIONS,
+        )
+        session_key = "island-0" if layout == "prefix_stable" else None
+        result = llm.query(msg=user_msg, system_msg=sys_msg, session_key=session_key)
+        if i == 0:
+            continue
+        if result is not None and result.time_to_first_token is not None:
+            ttfts.append(result.time_to_first_token)
+    return ttfts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="ollama:gemma3:latest")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--population", type=int, default=8)
+    parser.add_argument("--num-inspirations", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--max-tokens", type=int, default=8)
+    parser.add_argument("--keep-alive", default="30m")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    population = make_population(args.population, args.lines)
+    print(f"{'layout':<15} {'n':>3} {'median ttft':>12} {'p90 ttft':>10}")
+    for layout in PROMPT_LAYOUTS:
+        ttfts = run_layout(layout, args, population)
+        if not ttfts:
+            print(f"{layout:<15} no successful queries")
+            continue
+        ttfts.sort()
+        p90 = ttfts[min(len(ttfts) - 1, int(0.9 * len(ttfts)))]
+        print(
+            f"{layout:<15} {len(ttfts):>3} {statistics.median(ttfts):>11.3f}s "
+            f"{p90:>9.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,21 +7,76 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from shinka.core.wrap_eval import run_shinka_eval
+from shinka.llm.retry import RetryPolicy
+from shinka.llm.router import get_endpoint_pool
+from shinka.llm.models.pricing import get_model_prices
+from shinka.llm.usage import served_model_name
 
 
 DEFAULT_MODEL = os.getenv("EVAL_LLM_MODEL", "ollama:gemma3:latest")
 DEFAULT_TEMP = float(os.getenv("EVAL_LLM_TEMPERATURE", "0.3"))
 DEFAULT_MAX_TOKENS = int(os.getenv("EVAL_LLM_MAX_TOKENS", "512"))
 DEFAULT_TIMEOUT = float(os.getenv("EVAL_LLM_TIMEOUT", "15.0"))  # seconds
+# Total time for one judge call including failover and retries
+DEFAULT_DEADLINE = float(os.getenv("EVAL_LLM_DEADLINE", str(4 * DEFAULT_TIMEOUT)))
 DRY_RUN = os.getenv("EVAL_LLM_DRY_RUN", "false").lower() == "true"
-BASE_URL = os.getenv("EVAL_LLM_BASE_URL", os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"))
+# An explicit judge URL pins the judge to one host; otherwise it is routed
+# through the shared endpoint pool (OLLAMA_ENDPOINTS / OLLAMA_BASE_URL).
+BASE_URL = os.getenv("EVAL_LLM_BASE_URL")
 API_KEY = os.getenv("EVAL_LLM_API_KEY", os.getenv("OLLAMA_API_KEY", "ollama"))
 
 
-def _call_llm_judge(text: str) -> Tuple[float, str]:
+def _post_chat_completion(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a chat completion to the pinned judge URL or a pooled endpoint."""
+    if BASE_URL:
+        headers = {"Authorization": f"Bearer {API_KEY}"} if API_KEY else {}
+        with httpx.Client(base_url=BASE_URL, timeout=DEFAULT_TIMEOUT) as client:
+            resp = client.post("/chat/completions", json=payload, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+
+    def attempt(endpoint, timeout: float) -> Dict[str, Any]:
+        api_key = endpoint.api_key or API_KEY
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        timeout = min(timeout, DEFAULT_TIMEOUT)
+        with httpx.Client(base_url=endpoint.base_url, timeout=timeout) as client:
+            resp = client.post("/chat/completions", json=payload, headers=headers)
+            resp.raise_for_status()
+            return resp.json()
+
+    # Fails over to the other endpoints and backs off like the runner's queries
+    data, _ = get_endpoint_pool().call_with_failover(
+        DEFAULT_MODEL, attempt, retry_policy=RetryPolicy(deadline=DEFAULT_DEADLINE)
+    )
+    return data
+
+
+def _judge_usage(data: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    """Usage record of one judge call, in the runner's `llm_usage` format."""
+    model = served_model_name(DEFAULT_MODEL)
+    usage = data.get("usage") or {}
+    input_tokens = float(usage.get("prompt_tokens", 0) or 0)
+    output_tokens = float(usage.get("completion_tokens", 0) or 0)
+    prices = get_model_prices(model)
+    return {
+        "judge": {
+            model: {
+                "calls": 1.0,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "wall_time": elapsed,
+                "decode_time": elapsed,
+                "cost": input_tokens * prices["input_price"]
+                + output_tokens * prices["output_price"],
+            }
+        }
+    }
+
+
+def _call_llm_judge(text: str) -> Tuple[float, str, Dict[str, Any]]:
     """
     Call local Ollama (OpenAI-compatible) to score the methodology text.
-    Returns (score_0_100, feedback_text).
+    Returns (score_0_100, feedback_text, llm_usage).
     """
     prompt = (
         "You are a concise reviewer. Score the methodology text from 0 to 100 for clarity, "
@@ -45,19 +100,16 @@ def _call_llm_judge(text: str) -> Tuple[float, str]:
             "temperature": payload["temperature"],
             "max_tokens": payload["max_tokens"],
             "text_len": len(text),
-            "prompt_preview": prompt[:200],
         },
         flush=True,
     )
 
-    headers = {"Authorization": f"Bearer {API_KEY}"} if API_KEY else {}
-    with httpx.Client(base_url=BASE_URL, timeout=DEFAULT_TIMEOUT) as client:
-        resp = client.post("/chat/completions", json=payload, headers=headers)
-        resp.raise_for_status()
-        data = resp.json()
+    start = time.time()
+    data = _post_chat_completion(payload)
+    usage = _judge_usage(data, time.time() - start)
     # Extract content
     content = data["choices"][0]["message"]["content"]
-    print("[LLM-JUDGE] raw_content", content[:1000], flush=True)
+    print("[LLM-JUDGE] raw_content", content[:300], flush=True)
 
     def _extract_json_snippet(txt: str) -> Optional[str]:
         """Find a JSON object even if wrapped in fences or extra text."""
@@ -89,10 +141,10 @@ def _call_llm_judge(text: str) -> Tuple[float, str]:
     score = max(0.0, min(100.0, score))
     print(
         "[LLM-JUDGE] parsed",
-        {"score": score, "feedback_preview": feedback[:500]},
+        {"score": score, "feedback_preview": feedback[:200]},
         flush=True,
     )
-    return score, feedback
+    return score, feedback, usage
 
 
 def _aggregate_fn(results: List[Any]) -> Dict[str, Any]:
@@ -115,12 +167,14 @@ def _aggregate_fn(results: List[Any]) -> Dict[str, Any]:
         base = max(0.0, 100.0 - length * 0.1)
         return base, "Heuristic score favors concise, non-empty methodology text."
 
+    private: Dict[str, Any] = {}
     if DRY_RUN:
         score, fb = heuristic()
     else:
         try:
             start = time.time()
-            score, fb = _call_llm_judge(text)
+            score, fb, usage = _call_llm_judge(text)
+            private["llm_usage"] = usage
             elapsed = time.time() - start
             fb = fb or "LLM judge returned no feedback."
             fb = f"[LLM score in {elapsed:.1f}s] {fb}"
@@ -134,7 +188,7 @@ def _aggregate_fn(results: List[Any]) -> Dict[str, Any]:
             "length": length,
             "non_empty": non_empty,
         },
-        "private": {},
+        "private": private,
         "text_feedback": fb,
     }
 
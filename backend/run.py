@@ -39,7 +39,7 @@ def main():
         language="python",
         task_sys_msg=MUTATION_SYSTEM_PROMPT,
         llm_models=["ollama:gemma3:latest"],
-        embedding_model="ollama:nomic-embed-text",
+        embedding_model="ollama:nomic-embed-text",  # or "local:ngram" (offline)
         llm_kwargs={"temperatures": 0.3, "max_tokens": 2048},
     )
 
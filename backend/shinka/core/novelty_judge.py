@@ -1,4 +1,5 @@
 from typing import Optional, Tuple, List
+import hashlib
 import logging
 from pathlib import Path
 from shinka.database import Program
@@ -17,11 +18,64 @@ class NoveltyJudge:
         language: str = "python",
         similarity_threshold: float = 1.0,
         max_novelty_attempts: int = 3,
+        lexical_threshold: Optional[float] = 1.0,
     ):
         self.novelty_llm_client = novelty_llm_client
         self.language = language
         self.similarity_threshold = similarity_threshold
         self.max_novelty_attempts = max_novelty_attempts
+        # Min. MinHash similarity counted as a near-duplicate (1.0: exact
+        # duplicates only, None disables the check)
+        self.lexical_threshold = lexical_threshold
+        self.last_check_failed = False
+
+    def check_lexical_duplicate(
+        self,
+        exec_fname: str,
+        parent_program: Optional[Program],
+        database,
+    ) -> Tuple[bool, dict]:
+        """
+        Cheap MinHash/LSH duplicate check, run before embedding the code.
+
+        Exact duplicates (identical EVOLVE-block tokens, ignoring layout and
+        comments) and near-duplicates above `lexical_threshold` of a program
+        in the parent's island are flagged without any embedding or LLM call.
+
+        Args:
+            exec_fname: Path to the executable file containing the code
+            parent_program: Parent program (its island scopes the lookup)
+            database: Database instance holding the LSH index
+
+        Returns:
+            Tuple of (is_duplicate, lexical_metadata)
+        """
+        if self.lexical_threshold is None or parent_program is None:
+            return False, {}
+        try:
+            proposed_code = Path(exec_fname).read_text(encoding="utf-8")
+            matches = database.find_lexical_duplicates(
+                proposed_code,
+                island_idx=parent_program.island_idx,
+                threshold=self.lexical_threshold,
+                language=self.language,
+            )
+        except Exception as e:
+            logger.warning(f"Lexical duplicate check failed: {e}")
+            return False, {}
+        if not matches:
+            return False, {}
+        match_id, similarity, is_exact = matches[0]
+        logger.info(
+            "NOVELTY CHECK: Rejecting program as lexical "
+            f"{'exact' if is_exact else 'near'}-duplicate of {match_id[:8]}... "
+            f"(MinHash similarity {similarity:.2f})."
+        )
+        return True, {
+            "lexical_match_id": match_id,
+            "lexical_similarity": similarity,
+            "lexical_exact": is_exact,
+        }
 
     def should_check_novelty(
         self,
@@ -65,7 +119,15 @@ class NoveltyJudge:
         database,
     ) -> Tuple[bool, dict]:
         """
-        Perform novelty assessment with rejection sampling.
+        Single-pass novelty assessment of a proposed program.
+
+        Similarities to the parent's island are computed once. Neighbors
+        above `similarity_threshold` are then checked with the novelty LLM in
+        order of similarity (at most `max_novelty_attempts` of them); the
+        program is rejected as soon as one of them is judged equivalent.
+        Verdicts are memoized per (candidate code hash, neighbor id) in the
+        database, so repeated or resumed checks never re-query the LLM.
+        Rejected programs are resampled by the caller.
 
         Args:
             exec_fname: Path to the executable file containing the code
@@ -84,92 +146,83 @@ class NoveltyJudge:
             "similarity_scores": [],
         }
 
-        for attempt in range(self.max_novelty_attempts):
-            # Compute similarities with programs in island
-            similarity_scores = database.compute_similarity(
-                code_embedding, parent_program.island_idx
+        neighbors = database.get_top_similar_programs(
+            code_embedding, parent_program.island_idx
+        )
+        if not neighbors:
+            logger.info(
+                "NOVELTY CHECK: Accepting program due to no similarity scores."
             )
+            return True, novelty_metadata
+
+        similarity_scores = [sim for _, sim in neighbors]
+        max_similarity = similarity_scores[0]
+        formatted_similarities = [f"{s:.2f}" for s in similarity_scores[:5]]
+        logger.info(f"Top-5 similarity scores: {formatted_similarities}")
+        novelty_metadata["max_similarity"] = max_similarity
+        novelty_metadata["similarity_scores"] = similarity_scores
+
+        if max_similarity <= self.similarity_threshold:
+            logger.info(
+                "NOVELTY CHECK: Accepting program due to low similarity "
+                f"({max_similarity:.3f} <= {self.similarity_threshold})"
+            )
+            return True, novelty_metadata
 
-            if not similarity_scores:
-                logger.info(
-                    f"NOVELTY CHECK {attempt + 1}/{self.max_novelty_attempts}: "
-                    "Accepting program due to no similarity scores."
-                )
-                novelty_metadata["similarity_scores"] = []
-                return True, novelty_metadata
-
-            max_similarity = max(similarity_scores)
-            sorted_similarity_scores = sorted(similarity_scores, reverse=True)
-            formatted_similarities = [f"{s:.2f}" for s in sorted_similarity_scores]
-
-            logger.info(f"Top-5 similarity scores: {formatted_similarities[:5]}")
-
-            novelty_metadata["max_similarity"] = max_similarity
-            novelty_metadata["similarity_scores"] = similarity_scores
+        if self.novelty_llm_client is None:
+            logger.info(
+                "NOVELTY CHECK: Rejecting program due to high similarity "
+                f"({max_similarity:.3f} > {self.similarity_threshold})."
+            )
+            return False, novelty_metadata
 
-            if max_similarity <= self.similarity_threshold:
+        try:
+            proposed_code = Path(exec_fname).read_text(encoding="utf-8")
+        except Exception as e:
+            logger.warning(f"Error reading code for novelty check: {e}")
+            return False, novelty_metadata  # Default to rejection on error
+        candidate_hash = hashlib.sha256(proposed_code.encode("utf-8")).hexdigest()
+
+        similar = [
+            (pid, sim) for pid, sim in neighbors if sim > self.similarity_threshold
+        ][: self.max_novelty_attempts]
+        for check_idx, (neighbor_id, similarity) in enumerate(similar):
+            prefix = f"NOVELTY CHECK {check_idx + 1}/{len(similar)}"
+            verdict = database.get_novelty_verdict(candidate_hash, neighbor_id)
+            if verdict is not None:
+                is_novel, explanation, _ = verdict
                 logger.info(
-                    f"NOVELTY CHECK {attempt + 1}/{self.max_novelty_attempts}: "
-                    f"Accepting program due to low similarity "
-                    f"({max_similarity:.3f} <= {self.similarity_threshold})"
+                    f"{prefix}: Reusing memoized verdict for {neighbor_id[:8]}."
                 )
-                return True, novelty_metadata
-
-            # High similarity detected - check with LLM if configured
-            should_reject = True
-            novelty_cost = 0.0
-
-            if self.novelty_llm_client is not None:
-                # Get the most similar program for LLM comparison
-                most_similar_program = database.get_most_similar_program(
-                    code_embedding, parent_program.island_idx
+            else:
+                neighbor = database.get(neighbor_id)
+                if neighbor is None:
+                    continue
+                is_novel, explanation, cost = self.check_llm_novelty(
+                    proposed_code, neighbor
                 )
-
-                if most_similar_program:
-                    try:
-                        # Read the current proposed code
-                        proposed_code = Path(exec_fname).read_text(encoding="utf-8")
-                        is_novel, explanation, cost = self.check_llm_novelty(
-                            proposed_code, most_similar_program
-                        )
-                        should_reject = not is_novel
-                        novelty_cost = cost
-                        novelty_metadata["novelty_checks_performed"] += 1
-                        novelty_metadata["novelty_total_cost"] += cost
-                        novelty_metadata["novelty_explanation"] = explanation
-                    except Exception as e:
-                        logger.warning(f"Error reading code for novelty check: {e}")
-                        should_reject = True  # Default to rejection on error
-
-            if should_reject:
-                logger.info(
-                    f"NOVELTY CHECK {attempt + 1}/{self.max_novelty_attempts}: "
-                    f"Rejecting program due to high similarity "
-                    f"({max_similarity:.3f} > {self.similarity_threshold})"
-                    + (
-                        f" and LLM novelty check (cost: {novelty_cost:.4f})"
-                        if novelty_cost > 0
-                        else ""
+                novelty_metadata["novelty_checks_performed"] += 1
+                novelty_metadata["novelty_total_cost"] += cost
+                if not self.last_check_failed:
+                    database.store_novelty_verdict(
+                        candidate_hash, neighbor_id, is_novel, explanation, cost
                     )
-                    + ". Retrying with different parent/inspirations."
-                )
-                # Continue to next attempt (rejection sampling)
-                continue
-            else:
+            novelty_metadata["novelty_explanation"] = explanation
+            if not is_novel:
                 logger.info(
-                    f"NOVELTY CHECK {attempt + 1}/{self.max_novelty_attempts}: "
-                    f"Accepting program despite high similarity "
-                    f"({max_similarity:.3f} > {self.similarity_threshold}) "
-                    f"due to LLM novelty check (cost: {novelty_cost:.4f})."
+                    f"{prefix}: Rejecting program, LLM judged it equivalent to "
+                    f"{neighbor_id[:8]} (similarity {similarity:.3f} > "
+                    f"{self.similarity_threshold}). Retrying with different "
+                    "parent/inspirations."
                 )
-                return True, novelty_metadata
+                return False, novelty_metadata
 
-        # All attempts exhausted, reject the program
         logger.info(
-            f"NOVELTY CHECK: Exhausted all {self.max_novelty_attempts} attempts, "
-            "rejecting program."
+            "NOVELTY CHECK: Accepting program despite high similarity "
+            f"({max_similarity:.3f} > {self.similarity_threshold}) due to LLM "
+            f"novelty check (cost: {novelty_metadata['novelty_total_cost']:.4f})."
         )
-        return False, novelty_metadata
+        return True, novelty_metadata
 
     def check_llm_novelty(
         self, proposed_code: str, most_similar_program: Program
@@ -185,6 +238,8 @@ class NoveltyJudge:
         Returns:
             Tuple of (is_novel, explanation, api_cost)
         """
+        # Failed checks default to "novel" but must not be memoized
+        self.last_check_failed = True
         if not self.novelty_llm_client:
             logger.debug("Novelty LLM not configured, skipping novelty check")
             return True, "No novelty LLM configured", 0.0
@@ -214,6 +269,7 @@ class NoveltyJudge:
                 "NOVEL"
             ) or content.upper().startswith("**NOVEL**")
             explanation = content
+            self.last_check_failed = False
             return is_novel, explanation, api_cost
 
         except Exception as e:
@@ -1,3 +1,5 @@
+import json
+import os
 import shutil
 import uuid
 import time
@@ -7,12 +9,12 @@ from rich.logging import RichHandler
 from rich.table import Table
 from rich.console import Console
 import rich.box
-from typing import List, Optional, Union, cast
+from typing import Dict, List, Optional, Union, cast
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass, field, asdict
 from subprocess import Popen
-from shinka.launch import JobScheduler, JobConfig, ProcessWithLogging
+from shinka.launch import JobScheduler, JobConfig, ProcessWithLogging, PoolJob
 from shinka.database import ProgramDatabase, DatabaseConfig, Program
 from shinka.llm import (
     LLMClient,
@@ -20,17 +22,31 @@ from shinka.llm import (
     EmbeddingClient,
     BanditBase,
     AsymmetricUCB,
+    configure_endpoint_pool,
+    get_endpoint_pool,
+    merge_usage,
+    CircuitOpenError,
+    configure_embedding_cache,
 )
 from shinka.edit import (
     apply_diff_patch,
     apply_full_patch,
-    summarize_diff,
+    summarize_diff_text,
     redact_immutable,
+    validate_program,
+    make_relative_diff,
+    CODE_ENCODINGS,
+    PATCH_ARTIFACTS,
+    PATCH_OUTPUT_MODES,
+    patch_response_format,
+    repair_patch_text,
 )
+from shinka.prompts import STRUCTURED_SYS_FORMATS
 from shinka.core.sampler import PromptSampler
 from shinka.core.summarizer import MetaSummarizer
 from shinka.core.novelty_judge import NoveltyJudge
 from shinka.logo import print_gradient_logo
+from shinka.utils import configure_log_limits
 
 FOLDER_PREFIX = "gen"
 
@@ -54,21 +70,53 @@ class EvolutionConfig:
     meta_llm_models: Optional[List[str]] = None
     meta_llm_kwargs: dict = field(default_factory=lambda: {})
     meta_max_recommendations: int = 5
+    meta_background: bool = True
+    meta_summary_token_budget: Optional[int] = 8000
+    meta_journal_compact_every: int = 100
     embedding_model: Optional[str] = None
     init_program_path: Optional[str] = "initial.py"
     results_dir: Optional[str] = None
     max_novelty_attempts: int = 3
     code_embed_sim_threshold: float = 1.0
+    lexical_dup_threshold: Optional[float] = 1.0
     novelty_llm_models: Optional[List[str]] = None
     novelty_llm_kwargs: dict = field(default_factory=lambda: {})
     use_text_feedback: bool = False
+    llm_endpoints: Optional[List[Union[str, dict]]] = None
+    llm_routing: str = "least_outstanding"
+    embedding_batch_size: int = 1
+    embedding_batch_wait_ms: float = 5.0
+    embedding_cache: bool = True
+    embedding_chunk_chars: int = 6000
+    embedding_pooling: str = "mean"
+    embedding_cache_size: int = 100_000
+    patch_output_mode: str = "text"
+    patch_repair: bool = True
+    prompt_context_budget: Optional[int] = None
+    # "prefix_stable" maximizes prompt-cache reuse on local servers: stable
+    # prompt layout, patch queries routed per island, models kept loaded
+    prompt_layout: str = "default"
+    prompt_keep_alive: Optional[str] = "30m"
+    # "relative" sends one base program per island and programs as diffs
+    prompt_code_encoding: str = "full"
+    # Context lines of the stored code diffs; "code" keeps only main.<ext>
+    # (no raw patch, original or edit.diff) in each generation directory
+    patch_diff_context: int = 3
+    patch_artifacts: str = "all"
+    # Check patched programs in-process (syntax, EVOLVE interface) and send
+    # failures back to the LLM instead of evaluating them
+    patch_validation: bool = True
+    # Bytes kept from the start / end of each job log in program metadata
+    # (None keeps everything); the full logs stay in the results directory
+    log_head_bytes: Optional[int] = 4096
+    log_tail_bytes: Optional[int] = 16384
 
 
 @dataclass
 class RunningJob:
     """Represents a running job in the queue."""
 
-    job_id: Union[str, Popen, ProcessWithLogging]
+    job_id: Optional[Union[str, Popen, ProcessWithLogging, PoolJob]]
     exec_fname: str
     results_dir: str
     start_time: float
@@ -81,6 +129,8 @@ class RunningJob:
     code_embedding: List[float] = field(default_factory=list)
     embed_cost: float = 0.0
     novelty_cost: float = 0.0
+    # Set for candidates recorded without evaluation (e.g. failed validation)
+    results: Optional[dict] = None
 
 
 # Set up logging
@@ -156,6 +206,48 @@ class EvolutionRunner:
         else:
             raise ValueError("Invalid llm_dynamic_selection")
 
+        # Route all LLM/embedding traffic (incl. eval subprocesses) over the
+        # configured endpoints; otherwise the pool is built from env vars.
+        if evo_config.llm_endpoints:
+            configure_endpoint_pool(
+                evo_config.llm_endpoints, strategy=evo_config.llm_routing
+            )
+            logger.info(
+                f"Routing LLM requests over {len(evo_config.llm_endpoints)} "
+                f"endpoints ({evo_config.llm_routing})"
+            )
+
+        if evo_config.prompt_code_encoding not in CODE_ENCODINGS:
+            raise ValueError(
+                f"Unknown prompt_code_encoding '{evo_config.prompt_code_encoding}'. "
+                f"Choose from {CODE_ENCODINGS}"
+            )
+        if evo_config.patch_artifacts not in PATCH_ARTIFACTS:
+            raise ValueError(
+                f"Unknown patch_artifacts '{evo_config.patch_artifacts}'. "
+                f"Choose from {PATCH_ARTIFACTS}"
+            )
+        if evo_config.patch_output_mode not in PATCH_OUTPUT_MODES:
+            raise ValueError(
+                f"Invalid patch_output_mode '{evo_config.patch_output_mode}'. "
+                f"Choose from {PATCH_OUTPUT_MODES}"
+            )
+        # Patch success per LLM call (successful proposals / patch queries)
+        self.patch_stats = {"llm_calls": 0, "successes": 0, "repaired": 0}
+
+        # Shared embedding cache (runner, database, eval subprocesses and
+        # analysis tools); an explicit $SHINKA_EMBEDDING_CACHE takes precedence
+        if evo_config.embedding_cache:
+            cache_path = os.getenv(
+                "SHINKA_EMBEDDING_CACHE",
+                str(Path(self.results_dir) / "embedding_cache.sqlite"),
+            )
+            configure_embedding_cache(
+                cache_path, max_entries=evo_config.embedding_cache_size
+            )
+
+        configure_log_limits(evo_config.log_head_bytes, evo_config.log_tail_bytes)
+
         # Initialize database and scheduler
         db_config.db_path = str(db_path)
         embedding_model_to_use = (
@@ -175,11 +267,19 @@ class EvolutionRunner:
             model_selection=self.llm_selection,
             **evo_config.llm_kwargs,
             verbose=verbose,
+            caller="patch",
         )
+        if evo_config.prompt_layout == "prefix_stable" and self.llm.keep_alive is None:
+            self.llm.keep_alive = evo_config.prompt_keep_alive
         if evo_config.embedding_model is not None:
             self.embedding = EmbeddingClient(
                 model_name=evo_config.embedding_model,
                 verbose=verbose,
+                batch_size=evo_config.embedding_batch_size,
+                batch_wait_ms=evo_config.embedding_batch_wait_ms,
+                chunk_chars=evo_config.embedding_chunk_chars,
+                pooling=evo_config.embedding_pooling,
+                language=evo_config.language,
             )
         else:
             self.embedding = None
@@ -189,6 +289,7 @@ class EvolutionRunner:
                 model_names=evo_config.meta_llm_models,
                 **evo_config.meta_llm_kwargs,
                 verbose=verbose,
+                caller="meta",
             )
         else:
             self.meta_llm = None
@@ -198,6 +299,7 @@ class EvolutionRunner:
                 model_names=evo_config.novelty_llm_models,
                 **evo_config.novelty_llm_kwargs,
                 verbose=verbose,
+                caller="novelty",
             )
         else:
             self.novelty_llm = None
@@ -209,6 +311,9 @@ class EvolutionRunner:
             patch_types=evo_config.patch_types,
             patch_type_probs=evo_config.patch_type_probs,
             use_text_feedback=evo_config.use_text_feedback,
+            context_budget=evo_config.prompt_context_budget,
+            prompt_layout=evo_config.prompt_layout,
+            code_encoding=evo_config.prompt_code_encoding,
         )
 
         # Initialize MetaSummarizer for meta-recommendations
@@ -217,6 +322,8 @@ class EvolutionRunner:
             language=evo_config.language,
             use_text_feedback=evo_config.use_text_feedback,
             max_recommendations=evo_config.meta_max_recommendations,
+            summary_token_budget=evo_config.meta_summary_token_budget,
+            journal_compact_every=evo_config.meta_journal_compact_every,
         )
 
         # Initialize NoveltyJudge for novelty assessment
@@ -225,6 +332,7 @@ class EvolutionRunner:
             language=evo_config.language,
             similarity_threshold=evo_config.code_embed_sim_threshold,
             max_novelty_attempts=evo_config.max_novelty_attempts,
+            lexical_threshold=evo_config.lexical_dup_threshold,
         )
 
         # Initialize rich console for formatted output
@@ -248,7 +356,13 @@ class EvolutionRunner:
 
         # Queue for managing parallel jobs
         self.running_jobs: List[RunningJob] = []
+        # Candidates held back to be submitted together as one job array
+        self.unsubmitted_jobs: List[RunningJob] = []
         self.best_program_id: Optional[str] = None
+        # Program whose metadata receives the cost of the running meta update
+        self.meta_trigger_id: Optional[str] = None
+        # Base program per island for the relative prompt code encoding
+        self.island_bases: Dict[Optional[int], Program] = {}
         self.next_generation_to_submit = 0
 
         if resuming_run:
@@ -338,17 +452,26 @@ class EvolutionRunner:
                             f"{self.completed_generations}/{target_gens}"
                         )
 
+                # Publish finished background meta updates
+                if self.evo_config.meta_background:
+                    self._poll_meta_update()
+
                 # Check if we've completed all generations
                 if self.completed_generations >= target_gens:
                     logger.info("All generations completed, exiting...")
                     break
 
-                # Submit new jobs to fill the queue (only if we have capacity)
-                if (
-                    len(self.running_jobs) < max_jobs
-                    and self.next_generation_to_submit < target_gens
-                ):
-                    self._submit_new_job()
+                # Submit new jobs to fill the queue (only if we have capacity
+                # and the circuit is not open for every patch model)
+                if self._has_capacity(max_jobs, target_gens):
+                    if self.llm.is_available():
+                        self._submit_new_job()
+                    elif self.verbose:
+                        logger.info("All LLM endpoints ejected; waiting for jobs.")
+                self._submit_job_array(
+                    self._has_capacity(max_jobs, target_gens)
+                    and self.llm.is_available()
+                )
 
                 # Wait a bit before checking again
                 time.sleep(2)
@@ -356,13 +479,20 @@ class EvolutionRunner:
             # All jobs are now handled by the main loop above
 
         # Perform final meta summary for any remaining unprocessed programs
+        self._poll_meta_update(wait=True)
         best_program = self.db.get_best_program()
+        self._load_meta_summaries()
         self.meta_summarizer.perform_final_summary(str(self.results_dir), best_program)
+        self.db.store_meta_summaries(self.meta_summarizer.drain_program_summaries())
 
         # Save final meta memory state
         self._save_meta_memory()
 
         self.db.print_summary()
+        if self.embedding is not None and self.embedding.batch_stats():
+            logger.info(f"Embedding batching: {self.embedding.batch_stats()}")
+        if self.embedding is not None and self.embedding.cache_stats():
+            logger.info(f"Embedding cache: {self.embedding.cache_stats()}")
         logger.info(f"Evolution completed! {self.completed_generations} generations")
         logger.info("=" * 80)
         end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -544,6 +674,13 @@ class EvolutionRunner:
                 "patch_description": patch_description,
                 "stdout_log": stdout_log,
                 "stderr_log": stderr_log,
+                "resource_usage": (results or {}).get("resource_usage"),
+                "log_paths": (results or {}).get("log_paths"),
+                "error_summary": (results or {}).get("error_summary"),
+                "llm_usage": merge_usage(
+                    self._drain_llm_usage(self.llm),
+                    private_metrics.get("llm_usage"),
+                ),
             },
         )
 
@@ -559,40 +696,106 @@ class EvolutionRunner:
         self.meta_summarizer.add_evaluated_program(db_program)
 
         # Check if we should update meta memory after adding this program
-        if self.meta_summarizer.should_update_meta(self.evo_config.meta_rec_interval):
-            logger.info(
-                f"Updating meta memory after processing "
-                f"{len(self.meta_summarizer.evaluated_since_last_meta)} programs..."
-            )
-            best_program = self.db.get_best_program()
-            updated_recs, meta_cost = self.meta_summarizer.update_meta_memory(
-                best_program
-            )
-            if updated_recs:
-                # Write meta output file for generation 0
-                self.meta_summarizer.write_meta_output(str(self.results_dir))
-                # Store meta cost for tracking
-                if meta_cost > 0:
-                    logger.info(
-                        f"Meta recommendation generation cost: ${meta_cost:.4f}"
-                    )
-                    # Add meta cost to this program's metadata (the one that triggered the update)
-                    if db_program.metadata is None:
-                        db_program.metadata = {}
-                    db_program.metadata["meta_cost"] = meta_cost
-                    # Update the program in the database with the new metadata
-                    import json
-
-                    metadata_json = json.dumps(db_program.metadata)
-                    self.db.cursor.execute(
-                        "UPDATE programs SET metadata = ? WHERE id = ?",
-                        (metadata_json, db_program.id),
-                    )
-                    self.db.conn.commit()
+        self._maybe_update_meta_memory(db_program)
 
         # Save meta memory state after each job completion
         self._save_meta_memory()
 
+    def _maybe_update_meta_memory(self, db_program: Program) -> None:
+        """Run a meta update if due; attribute its cost to `db_program`."""
+        if self.evo_config.meta_background:
+            self._poll_meta_update()
+            return
+        if not self.meta_summarizer.should_update_meta(
+            self.evo_config.meta_rec_interval
+        ):
+            return
+        logger.info(
+            f"Updating meta memory after processing "
+            f"{len(self.meta_summarizer.evaluated_since_last_meta)} programs..."
+        )
+        best_program = self.db.get_best_program()
+        self._load_meta_summaries()
+        updated_recs, meta_cost = self.meta_summarizer.update_meta_memory(
+            best_program
+        )
+        self._record_meta_update(db_program, updated_recs, meta_cost)
+
+    def _poll_meta_update(self, wait: bool = False) -> None:
+        """Harvest a finished background meta update, start the next if due.
+
+        The LLM calls run on the summarizer's worker thread; database and
+        file writes for a finished update happen here on the main thread.
+        The cost is attributed to the last program of the update's snapshot.
+        """
+        if wait:
+            result = self.meta_summarizer.wait_background_update()
+        else:
+            result = self.meta_summarizer.poll_background_update()
+        if result is not None:
+            trigger_id, self.meta_trigger_id = self.meta_trigger_id, None
+            trigger = self.db.get(trigger_id) if trigger_id else None
+            self._record_meta_update(trigger, *result)
+            self._save_meta_memory()
+        if wait or self.meta_summarizer.is_updating():
+            return
+        if not self.meta_summarizer.should_update_meta(
+            self.evo_config.meta_rec_interval
+        ):
+            return
+        trigger_id = self.meta_summarizer.evaluated_since_last_meta[-1].id
+        self._load_meta_summaries()
+        if self.meta_summarizer.start_background_update(self.db.get_best_program()):
+            self.meta_trigger_id = trigger_id
+
+    def _load_meta_summaries(self) -> None:
+        """Reuse step-1 summaries stored in the DB, e.g. before a restart."""
+        pending = [p.id for p in self.meta_summarizer.evaluated_since_last_meta]
+        if pending:
+            self.meta_summarizer.add_program_summaries(
+                self.db.get_meta_summaries(pending)
+            )
+
+    def _record_meta_update(
+        self,
+        db_program: Optional[Program],
+        updated_recs: Optional[str],
+        meta_cost: float,
+    ) -> None:
+        # Persist new step-1 summaries, also those of failed updates
+        self.db.store_meta_summaries(self.meta_summarizer.drain_program_summaries())
+        meta_usage = self._drain_llm_usage(self.meta_llm)
+        if updated_recs:
+            # Write meta output file using accumulated program count
+            self.meta_summarizer.write_meta_output(str(self.results_dir))
+        if db_program is None:
+            return
+        if meta_cost > 0 or meta_usage:
+            if meta_cost > 0:
+                logger.info(f"Meta recommendation generation cost: ${meta_cost:.4f}")
+            # Add meta cost/usage to the program that triggered the update
+            if db_program.metadata is None:
+                db_program.metadata = {}
+            db_program.metadata["meta_cost"] = meta_cost
+            db_program.metadata["llm_usage"] = merge_usage(
+                db_program.metadata.get("llm_usage") or {}, meta_usage
+            )
+            # Update the program in the database with the new metadata
+            metadata_json = json.dumps(db_program.metadata)
+            self.db.cursor.execute(
+                "UPDATE programs SET metadata = ? WHERE id = ?",
+                (metadata_json, db_program.id),
+            )
+            self.db.conn.commit()
+
+    def _drain_llm_usage(self, *clients: Optional[LLMClient]) -> dict:
+        """Collect and reset the per-caller usage counters of LLM clients."""
+        usage: dict = {}
+        for client in clients:
+            if client is not None:
+                merge_usage(usage, client.usage.drain())
+        return usage
+
     def _update_completed_generations(self):
         """
         Update the count of completed generations from the database.
@@ -645,9 +848,13 @@ class EvolutionRunner:
             # Initial program already copied in setup_initial_program
         else:
             api_costs = 0
+            patch_llm_calls = 0
             embed_cost = 0
             novelty_cost = 0.0
             novelty_checks_performed = 0
+            lexical_rejections = 0
+            lexical_metadata = {}
+            code_embedding = []
             # Loop over novelty attempts
             for nov_attempt in range(self.evo_config.max_novelty_attempts):
                 # Loop over patch resamples - including parents
@@ -676,6 +883,9 @@ class EvolutionRunner:
                         resample_attempt=resample + 1,
                     )
                     api_costs += meta_patch_data["api_costs"]
+                    # LLM calls of all resamples, for the success-per-call rate
+                    patch_llm_calls += meta_patch_data["patch_llm_calls"]
+                    meta_patch_data["patch_llm_calls"] = patch_llm_calls
                     if (
                         meta_patch_data["error_attempt"] is None
                         and num_applied_attempt > 0
@@ -683,6 +893,23 @@ class EvolutionRunner:
                         meta_patch_data["api_costs"] = api_costs
                         break
 
+                # A candidate that failed validation is not worth an
+                # embedding or novelty check: it is recorded as incorrect
+                if meta_patch_data.get("validation_errors"):
+                    break
+
+                # Cheap lexical (MinHash/LSH) check first: duplicates are
+                # resampled without paying for an embedding or LLM check
+                is_duplicate, lexical_metadata = (
+                    self.novelty_judge.check_lexical_duplicate(
+                        exec_fname, parent_program, self.db
+                    )
+                )
+                if is_duplicate:
+                    lexical_rejections += 1
+                    if nov_attempt < self.evo_config.max_novelty_attempts - 1:
+                        continue
+
                 # Get the code embedding for the evaluated code
                 code_embedding, e_cost = self.get_code_embedding(exec_fname)
                 embed_cost += e_cost
@@ -736,8 +963,32 @@ class EvolutionRunner:
             meta_patch_data["novelty_cost"] = novelty_cost
             meta_patch_data["novelty_explanation"] = novelty_explanation
 
-        # Submit the job asynchronously
-        job_id = self.scheduler.submit_async(exec_fname, results_dir)
+        if current_gen > 0 and lexical_rejections > 0:
+            meta_patch_data["lexical_rejections"] = lexical_rejections
+            meta_patch_data.update(lexical_metadata)
+
+        # LLM usage of all patch / novelty calls made for this candidate
+        meta_patch_data["llm_usage"] = self._drain_llm_usage(
+            self.llm, self.novelty_llm
+        )
+
+        # Submit the job asynchronously, unless the final candidate failed
+        # validation and would only waste an evaluation slot
+        invalid_results = None
+        if meta_patch_data.get("validation_errors"):
+            invalid_results = self._invalid_candidate_results(
+                meta_patch_data["validation_errors"]
+            )
+            job_id = None
+            exec_fname = self._invalid_program_path(exec_fname)
+            logger.info(
+                f"Generation {current_gen}: candidate failed validation, "
+                "recording it without evaluation."
+            )
+        elif self.scheduler.array_batch_size > 1:
+            job_id = None  # Submitted later with other candidates
+        else:
+            job_id = self.scheduler.submit_async(exec_fname, results_dir)
 
         # Add to running jobs queue
         running_job = RunningJob(
@@ -754,8 +1005,12 @@ class EvolutionRunner:
             code_embedding=code_embedding,
             embed_cost=embed_cost,
             novelty_cost=novelty_cost,
+            results=invalid_results,
         )
-        self.running_jobs.append(running_job)
+        if job_id is None and invalid_results is None:
+            self.unsubmitted_jobs.append(running_job)
+        else:
+            self.running_jobs.append(running_job)
 
         if self.verbose:
             logger.info(
@@ -763,13 +1018,44 @@ class EvolutionRunner:
                 f"queue size: {len(self.running_jobs)}"
             )
 
+    def _has_capacity(self, max_jobs: int, target_gens: int) -> bool:
+        """Whether another candidate can be generated and submitted."""
+        return (
+            len(self.running_jobs) + len(self.unsubmitted_jobs) < max_jobs
+            and self.next_generation_to_submit < target_gens
+            # Local jobs also need free cores and memory on the host
+            and self.scheduler.has_capacity()
+        )
+
+    def _submit_job_array(self, can_grow: bool):
+        """Submit the held-back candidates as one job array once the batch is
+        full or no further candidate can join it."""
+        if not self.unsubmitted_jobs:
+            return
+        if can_grow and len(self.unsubmitted_jobs) < self.scheduler.array_batch_size:
+            return
+        jobs, self.unsubmitted_jobs = self.unsubmitted_jobs, []
+        job_ids = self.scheduler.submit_array(
+            [(job.exec_fname, job.results_dir) for job in jobs]
+        )
+        submit_time = time.time()
+        for job, job_id in zip(jobs, job_ids):
+            job.job_id = job_id
+            job.start_time = submit_time
+        self.running_jobs.extend(jobs)
+        if self.verbose:
+            logger.info(
+                f"Submitted {len(jobs)} candidates together, "
+                f"queue size: {len(self.running_jobs)}"
+            )
+
     def _check_completed_jobs(self) -> List[RunningJob]:
         """Check for completed jobs and return them."""
         completed = []
         still_running = []
 
         for job in self.running_jobs:
-            is_running = self.scheduler.check_job_status(job)
+            is_running = job.results is None and self.scheduler.check_job_status(job)
             if not is_running:
                 # Job completed
                 if self.verbose:
@@ -788,7 +1074,9 @@ class EvolutionRunner:
         rtime = end_time - job.start_time
 
         # Get job results
-        results = self.scheduler.get_job_results(job.job_id, job.results_dir)
+        results = job.results
+        if results is None:
+            results = self.scheduler.get_job_results(job.job_id, job.results_dir)
 
         # Read the evaluated code
         try:
@@ -845,44 +1133,24 @@ class EvolutionRunner:
                 "novelty_cost": n_cost,
                 "stdout_log": stdout_log,
                 "stderr_log": stderr_log,
+                "resource_usage": (results or {}).get("resource_usage"),
+                "log_paths": (results or {}).get("log_paths"),
+                "error_summary": (results or {}).get("error_summary"),
             },
         )
+        # Fold in LLM usage reported by the evaluator (e.g. an LLM judge)
+        if private_metrics.get("llm_usage"):
+            db_program.metadata["llm_usage"] = merge_usage(
+                db_program.metadata.get("llm_usage") or {},
+                private_metrics["llm_usage"],
+            )
         self.db.add(db_program, verbose=True)
 
         # Add the evaluated program to meta memory tracking
         self.meta_summarizer.add_evaluated_program(db_program)
 
         # Check if we should update meta memory after adding this program
-        if self.meta_summarizer.should_update_meta(self.evo_config.meta_rec_interval):
-            logger.info(
-                f"Updating meta memory after processing "
-                f"{len(self.meta_summarizer.evaluated_since_last_meta)} programs..."
-            )
-            best_program = self.db.get_best_program()
-            updated_recs, meta_cost = self.meta_summarizer.update_meta_memory(
-                best_program
-            )
-            if updated_recs:
-                # Write meta output file using accumulated program count
-                self.meta_summarizer.write_meta_output(str(self.results_dir))
-                # Store meta cost for tracking
-                if meta_cost > 0:
-                    logger.info(
-                        f"Meta recommendation generation cost: ${meta_cost:.4f}"
-                    )
-                    # Add meta cost to this program's metadata (the one that triggered the update)
-                    if db_program.metadata is None:
-                        db_program.metadata = {}
-                    db_program.metadata["meta_cost"] = meta_cost
-                    # Update the program in the database with the new metadata
-                    import json
-
-                    metadata_json = json.dumps(db_program.metadata)
-                    self.db.cursor.execute(
-                        "UPDATE programs SET metadata = ? WHERE id = ?",
-                        (metadata_json, db_program.id),
-                    )
-                    self.db.conn.commit()
+        self._maybe_update_meta_memory(db_program)
 
         if self.llm_selection is not None:
             if "model_name" not in db_program.metadata:
@@ -973,15 +1241,17 @@ class EvolutionRunner:
                 f"Edit Cycle {generation} -> {generation + 1}, "
                 f"Max Patch Attempts: {max_patch_attempts}"
             )
-        # Get current meta recommendations
-        meta_recs, _, _ = self.meta_summarizer.get_current()
+        # Get the latest published meta recommendations
+        meta_recs, meta_version = self.meta_summarizer.get_recommendations()
         # Construct edit / code change message
         patch_sys, patch_msg, patch_type = self.prompt_sampler.sample(
             parent=parent_program,
             archive_inspirations=archive_programs,
             top_k_inspirations=top_k_programs,
             meta_recommendations=meta_recs,
+            base=self._island_base(parent_program),
         )
+        prompt_stats = self.prompt_sampler.last_prompt_stats
 
         if patch_type in ["full", "cross"]:
             apply_patch = apply_full_patch
@@ -993,7 +1263,15 @@ class EvolutionRunner:
         else:
             raise ValueError(f"Invalid patch type: {patch_type}")
 
+        # Structured mode constrains the response to the edit JSON schema
+        response_format = None
+        if self.evo_config.patch_output_mode == "structured":
+            patch_sys += STRUCTURED_SYS_FORMATS[patch_type]
+            response_format = patch_response_format(patch_type)
+
         total_costs = 0
+        num_llm_calls = 0
+        patch_repairs: List[str] = []
         msg_history = []
         llm_kwargs = self.llm.get_kwargs()
         if self.llm_selection is not None:
@@ -1010,15 +1288,60 @@ class EvolutionRunner:
         patch_txt_attempt = None
         patch_path = None
         diff_summary = {}
+        validation_errors: Optional[List[str]] = None
+        num_validation_failures = 0
+
+        # Same island, same endpoint: its prompt cache holds the island's
+        # recommendations and inspirations
+        session_key = None
+        if self.evo_config.prompt_layout == "prefix_stable":
+            session_key = f"island-{parent_program.island_idx}"
 
         for patch_attempt in range(max_patch_attempts):
-            response = self.llm.query(
-                msg=patch_msg,
-                system_msg=patch_sys,
-                msg_history=msg_history,
-                llm_kwargs=llm_kwargs,
-            )
+            validation_errors = None
+            circuit_open_models: List[str] = []
+            while True:
+                response = self.llm.query(
+                    msg=patch_msg,
+                    system_msg=patch_sys,
+                    msg_history=msg_history,
+                    llm_kwargs=llm_kwargs,
+                    response_format=response_format,
+                    session_key=session_key,
+                )
+                if response is not None or not isinstance(
+                    self.llm.last_error, CircuitOpenError
+                ):
+                    break
+                # Endpoint(s) of this model are down: fail fast and retry
+                # this attempt with another model
+                failed_model = llm_kwargs["model_name"]
+                circuit_open_models.append(failed_model)
+                available = [
+                    m
+                    for m in self.llm.model_names
+                    if m not in circuit_open_models
+                    and get_endpoint_pool().is_available(m)
+                ]
+                if not available:
+                    break
+                llm_kwargs = self.llm.get_kwargs(exclude_models=circuit_open_models)
+                if self.llm_selection is not None:
+                    self.llm_selection.update_submitted(llm_kwargs["model_name"])
+                logger.info(
+                    f"  PATCH ATTEMPT {patch_attempt + 1}/{max_patch_attempts}: "
+                    f"circuit open for {failed_model}, switching to "
+                    f"{llm_kwargs['model_name']}."
+                )
             # print(response.content)
+            if response is None and isinstance(self.llm.last_error, CircuitOpenError):
+                error_attempt = f"Circuit open for {llm_kwargs['model_name']}."
+                logger.warning(
+                    f"  PATCH ATTEMPT {patch_attempt + 1}/{max_patch_attempts} "
+                    "ABORTED: no LLM endpoint available."
+                )
+                break
+            num_llm_calls += 1
             if response is None or response.content is None:
                 if self.verbose:
                     logger.info(
@@ -1042,14 +1365,23 @@ class EvolutionRunner:
                     break
 
             total_costs += response.cost  # Acc. cost
+            patch_content = response.content
+            patch_repairs = []
+            if self.evo_config.patch_repair:
+                # Fix near-miss formats locally instead of another round trip
+                patch_content, patch_repairs = repair_patch_text(
+                    patch_content, patch_type, self.evo_config.language
+                )
+                if patch_repairs and self.verbose:
+                    logger.info(f"  Repaired patch format: {patch_repairs}")
             patch_name = extract_between(
-                response.content,
+                patch_content,
                 "<NAME>",
                 "</NAME>",
                 False,
             )
             patch_description = extract_between(
-                response.content,
+                patch_content,
                 "<DESCRIPTION>",
                 "</DESCRIPTION>",
                 False,
@@ -1057,7 +1389,7 @@ class EvolutionRunner:
 
             # Apply the code patch (diff/full rewrite)
             (
-                _,
+                patched_code,
                 num_applied_attempt,
                 output_path_attempt,
                 error_attempt,
@@ -1065,17 +1397,40 @@ class EvolutionRunner:
                 patch_path,
             ) = apply_patch(
                 original_str=parent_program.code,
-                patch_str=response.content,
+                patch_str=patch_content,
                 patch_dir=f"{self.results_dir}/{FOLDER_PREFIX}_{generation}",
                 language=self.evo_config.language,
                 verbose=False,
+                diff_context=self.evo_config.patch_diff_context,
+                artifacts=self.evo_config.patch_artifacts,
             )
 
+            if (
+                error_attempt is None
+                and num_applied_attempt > 0
+                and self.evo_config.patch_validation
+            ):
+                validation_errors = validate_program(
+                    patched_code,
+                    self.evo_config.language,
+                    original=parent_program.code,
+                )
+                if validation_errors:
+                    num_validation_failures += 1
+                    error_attempt = (
+                        "The edit was applied, but the resulting program is "
+                        "invalid:\n" + "\n".join(validation_errors)
+                    )
+                    # Never leave a known-broken candidate to be evaluated,
+                    # but keep its code for the record
+                    if output_path_attempt is not None:
+                        Path(output_path_attempt).replace(
+                            self._invalid_program_path(output_path_attempt)
+                        )
+
             if error_attempt is None and num_applied_attempt > 0:
-                if patch_path:  # Ensure patch_path is not None
-                    diff_summary = summarize_diff(
-                        str(patch_path)
-                    )  # Convert Path to str
+                if patch_txt_attempt:
+                    diff_summary = summarize_diff_text(patch_txt_attempt)
                 if self.verbose:
                     logger.info(
                         f"  PATCH ATTEMPT {patch_attempt + 1}/{max_patch_attempts} SUCCESS. "
@@ -1107,6 +1462,19 @@ class EvolutionRunner:
                     # error_attempt is already set from apply_patch or default
                     pass
 
+        self.patch_stats["llm_calls"] += num_llm_calls
+        if code_diff is not None:
+            self.patch_stats["successes"] += 1
+            if set(patch_repairs) - {"structured"}:
+                self.patch_stats["repaired"] += 1
+        if self.verbose and self.patch_stats["llm_calls"] > 0:
+            logger.info(
+                "  Patch success rate: "
+                f"{self.patch_stats['successes']}/{self.patch_stats['llm_calls']} "
+                "per LLM call "
+                f"({self.patch_stats['repaired']} repaired locally)."
+            )
+
         # Only consider the diff summary for the original source file
         original_filename = f"original.{self.lang_ext}"
         if original_filename in diff_summary:
@@ -1122,6 +1490,13 @@ class EvolutionRunner:
             "novelty_attempt": novelty_attempt,
             "resample_attempt": resample_attempt,
             "patch_attempt": patch_attempt + 1,
+            "patch_output_mode": self.evo_config.patch_output_mode,
+            "meta_version": meta_version,
+            "prompt_stats": prompt_stats,
+            "patch_llm_calls": num_llm_calls,
+            "patch_repairs": patch_repairs,
+            "validation_failures": num_validation_failures,
+            "validation_errors": validation_errors,
             **llm_kwargs,
             "llm_result": response.to_dict() if response else None,
             "diff_summary": diff_summary,
@@ -1131,6 +1506,22 @@ class EvolutionRunner:
         # Delete generation from meta_edit_data
         return code_diff, meta_edit_data, num_applied_attempt
 
+    @staticmethod
+    def _invalid_program_path(exec_fname: str) -> str:
+        """Where a candidate that failed validation is kept (main.invalid.py)."""
+        path = Path(exec_fname)
+        return str(path.with_name(f"{path.stem}.invalid{path.suffix}"))
+
+    def _invalid_candidate_results(self, validation_errors: List[str]) -> dict:
+        """Evaluation results of a candidate rejected by validation."""
+        feedback = "Program failed validation:\n" + "\n".join(validation_errors)
+        return {
+            "correct": {"correct": False, "error": feedback},
+            "metrics": {"combined_score": 0.0, "text_feedback": feedback},
+            "stdout_log": "",
+            "stderr_log": feedback,
+        }
+
     def get_code_embedding(self, exec_fname: str) -> tuple[List[float], float]:
         """Get the embedding of the code."""
         # Read the evaluated code
@@ -1276,6 +1667,23 @@ class EvolutionRunner:
 
         self.console.print(table)
 
+    def _island_base(self, parent: Program) -> Optional[Program]:
+        """Shared base of the parent's island for relative code encoding.
+
+        The base is kept while the parent's diff against it stays below half
+        the parent's size, then the parent becomes the new base. A stable
+        base also keeps the prompt prefix stable for the island.
+        """
+        if self.evo_config.prompt_code_encoding != "relative":
+            return None
+        base = self.island_bases.get(parent.island_idx)
+        if base is None or len(make_relative_diff(base.code, parent.code)) > (
+            len(parent.code) // 2
+        ):
+            base = parent
+            self.island_bases[parent.island_idx] = base
+        return base
+
     def _save_meta_memory(self) -> None:
         """Save the meta memory state to disk."""
         meta_memory_path = Path(self.results_dir) / "meta_memory.json"
@@ -2,10 +2,15 @@ from typing import List, Optional, Tuple
 import numpy as np
 from shinka.database import Program
 from shinka.prompts import (
-    construct_eval_history_msg,
+    count_tokens,
+    fit_inspirations,
+    join_eval_history,
+    FragmentCache,
     perf_str,
     format_text_feedback_section,
+    error_summary,
     BASE_SYSTEM_MSG,
+    RELATIVE_BASE_MSG,
     DIFF_SYS_FORMAT,
     DIFF_ITER_MSG,
     FULL_ITER_MSG,
@@ -15,10 +20,16 @@ from shinka.prompts import (
     get_cross_component,
 )
 from shinka.prompts.prompts_init import INIT_SYSTEM_MSG, INIT_USER_MSG
+from shinka.edit.relative import CODE_ENCODINGS, encode_relative
 import logging
 
 logger = logging.getLogger(__name__)
 
+# "prefix_stable" orders every prompt from most to least stable part (task
+# and format, meta recommendations, sorted inspirations, parent) so that the
+# server's prompt cache can reuse the longest possible prefix.
+PROMPT_LAYOUTS = ("default", "prefix_stable")
+
 
 class PromptSampler:
     def __init__(
@@ -28,6 +39,9 @@ class PromptSampler:
         patch_types: Optional[List[str]] = None,
         patch_type_probs: Optional[List[float]] = None,
         use_text_feedback: bool = False,
+        context_budget: Optional[int] = None,
+        prompt_layout: str = "default",
+        code_encoding: str = "full",
     ):
         if patch_types is None:
             patch_types = ["diff"]
@@ -46,6 +60,22 @@ class PromptSampler:
             )
         # Whether to use text feedback in the prompt
         self.use_text_feedback = use_text_feedback
+        # Max. prompt tokens (system + user); inspirations are redacted or
+        # dropped to fit. None means no limit.
+        self.context_budget = context_budget
+        self.fragment_cache = FragmentCache()
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(
+                f"Unknown prompt layout '{prompt_layout}'. Choose from {PROMPT_LAYOUTS}"
+            )
+        self.prompt_layout = prompt_layout
+        # "relative": programs are sent as diffs against a per-island base
+        if code_encoding not in CODE_ENCODINGS:
+            raise ValueError(
+                f"Unknown code encoding '{code_encoding}'. Choose from {CODE_ENCODINGS}"
+            )
+        self.code_encoding = code_encoding
+        self.last_prompt_stats: dict = {}
 
     def initial_program_prompt(self) -> Tuple[str, str]:
         """Generate the prompt for the initial program."""
@@ -68,11 +98,28 @@ class PromptSampler:
         archive_inspirations: List[Program],
         top_k_inspirations: List[Program],
         meta_recommendations: Optional[str] = None,
+        base: Optional[Program] = None,
     ) -> Tuple[str, str, str]:
+        """Sample a patch type and build its (system, user) prompt.
+
+        With the "relative" code encoding and an island `base` program, the
+        base is sent once and the parent and inspirations as diffs against it.
+        """
+        if self.code_encoding != "relative":
+            base = None
         if self.task_sys_msg is None:
             sys_msg = BASE_SYSTEM_MSG
         else:
             sys_msg = self.task_sys_msg
+        prefix_stable = self.prompt_layout == "prefix_stable"
+        if prefix_stable:
+            # Canonical order: oldest inspirations first, ties by id
+            archive_inspirations = sorted(
+                archive_inspirations, key=lambda p: (p.generation, p.id)
+            )
+            top_k_inspirations = sorted(
+                top_k_inspirations, key=lambda p: (p.generation, p.id)
+            )
 
         # Sample coding type
         # Filter out crossover if no inspirations
@@ -95,42 +142,42 @@ class PromptSampler:
         if patch_type == "diff":
             sys_msg += DIFF_SYS_FORMAT
         elif patch_type == "full":
-            # Randomly sample from different full rewrite variants
-            full_variant_idx = np.random.randint(0, len(FULL_SYS_FORMATS))
+            # Randomly sample from different full rewrite variants (a fixed
+            # one keeps the system prompt cacheable)
+            full_variant_idx = (
+                0 if prefix_stable else np.random.randint(0, len(FULL_SYS_FORMATS))
+            )
             selected_format = FULL_SYS_FORMATS[full_variant_idx]
             sys_msg += selected_format
         elif patch_type == "cross":
             sys_msg += CROSS_SYS_FORMAT
 
-        if len(archive_inspirations) > 0:
-            eval_history_msg = construct_eval_history_msg(
-                archive_inspirations,
-                language=self.language,
-                include_text_feedback=self.use_text_feedback,
-            )
-        else:
-            eval_history_msg = ""
-
-        # Add top-k inspirations
-        # TODO(RobertTLange): Check if order needs inversion
-        if len(top_k_inspirations) > 0:
-            eval_history_msg += construct_eval_history_msg(
-                top_k_inspirations,
-                language=self.language,
-                include_text_feedback=self.use_text_feedback,
+        # Current program, in full or as a diff against the island base
+        code_language, code_content = self.language, parent.code
+        base_msg = ""
+        if base is not None:
+            base_msg = RELATIVE_BASE_MSG.format(
+                language=self.language, base_code=base.code
             )
+            parent_diff = encode_relative(base.code, parent.code)
+            if parent_diff is not None:
+                code_language = "diff"
+                code_content = (
+                    parent_diff
+                    or "# No changes: identical to the island base program."
+                )
 
         # Format text feedback section for current program
         text_feedback_section = ""
         if self.use_text_feedback:
             text_feedback_section = "\n" + format_text_feedback_section(
-                parent.text_feedback
+                parent.text_feedback, errors=error_summary(parent)
             )
 
         if patch_type == "diff":
             iter_msg = DIFF_ITER_MSG.format(
-                language=self.language,
-                code_content=parent.code,
+                language=code_language,
+                code_content=code_content,
                 performance_metrics=perf_str(
                     parent.combined_score, parent.public_metrics
                 ),
@@ -138,8 +185,8 @@ class PromptSampler:
             )
         elif patch_type == "full":
             iter_msg = FULL_ITER_MSG.format(
-                language=self.language,
-                code_content=parent.code,
+                language=code_language,
+                code_content=code_content,
                 performance_metrics=perf_str(
                     parent.combined_score, parent.public_metrics
                 ),
@@ -147,8 +194,8 @@ class PromptSampler:
             )
         elif patch_type == "cross":
             iter_msg = CROSS_ITER_MSG.format(
-                language=self.language,
-                code_content=parent.code,
+                language=code_language,
+                code_content=code_content,
                 performance_metrics=perf_str(
                     parent.combined_score, parent.public_metrics
                 ),
@@ -158,6 +205,7 @@ class PromptSampler:
                 archive_inspirations,
                 top_k_inspirations,
                 language=self.language,
+                base=base,
             )
         elif patch_type == "paper":
             raise NotImplementedError("Paper edit not implemented.")
@@ -174,8 +222,76 @@ class PromptSampler:
             )
             sum_rec_msg += f"\n{meta_recommendations}"
 
+        eval_history_msg = self._eval_history_msg(
+            archive_inspirations,
+            top_k_inspirations,
+            fixed_tokens=count_tokens(sys_msg)
+            + count_tokens(sum_rec_msg)
+            + count_tokens(base_msg)
+            + count_tokens(iter_msg),
+            base=base,
+        )
+        if prefix_stable:
+            # Recommendations change once per meta update, inspirations and
+            # parent with every sample: keep them out of the system prompt
+            user_msg = sum_rec_msg.lstrip() + "\n\n" if sum_rec_msg else ""
+            return (
+                sys_msg,
+                user_msg + base_msg + eval_history_msg + "\n" + iter_msg,
+                patch_type,
+            )
         return (
             sys_msg + sum_rec_msg,
-            eval_history_msg + "\n" + iter_msg,
+            base_msg + eval_history_msg + "\n" + iter_msg,
             patch_type,
         )
+
+    def _eval_history_msg(
+        self,
+        archive_inspirations: List[Program],
+        top_k_inspirations: List[Program],
+        fixed_tokens: int,
+        base: Optional[Program] = None,
+    ) -> str:
+        """Inspiration history fitted to what is left of the context budget.
+
+        Rendered fragments are memoized per program; the final prompt size is
+        recorded in `last_prompt_stats`.
+        """
+        budget = None
+        if self.context_budget is not None:
+            budget = max(0, self.context_budget - fixed_tokens)
+        programs = list(archive_inspirations) + list(top_k_inspirations)
+        fragments, stats = fit_inspirations(
+            programs,
+            budget,
+            language=self.language,
+            include_text_feedback=self.use_text_feedback,
+            cache=self.fragment_cache,
+            base=base,
+        )
+
+        # Archive and top-k inspirations are listed as separate groups
+        eval_history_msg = ""
+        num_archive = len(archive_inspirations)
+        for group in (fragments[:num_archive], fragments[num_archive:]):
+            kept = [f.text for f in group if f is not None]
+            if kept:
+                eval_history_msg += join_eval_history(kept)
+
+        inspiration_tokens = sum(f.tokens for f in fragments if f is not None)
+        self.last_prompt_stats = {
+            "prompt_tokens": fixed_tokens + inspiration_tokens,
+            "inspiration_tokens": inspiration_tokens,
+            "num_inspirations": len(programs) - stats["num_dropped"],
+            "code_encoding": "relative" if base is not None else "full",
+            **stats,
+        }
+        if stats["num_redacted"] or stats["num_dropped"]:
+            logger.info(
+                f"Prompt budget {self.context_budget}: redacted "
+                f"{stats['num_redacted']} and dropped {stats['num_dropped']} of "
+                f"{len(programs)} inspirations (~{fixed_tokens + inspiration_tokens} "
+                "tokens)"
+            )
+        return eval_history_msg
@@ -1,21 +1,42 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from shinka.database import Program
-from shinka.llm import LLMClient
+from shinka.llm import LLMClient, QueryResult
 from shinka.prompts import (
     construct_individual_program_msg,
     META_STEP1_SYSTEM_MSG,
     META_STEP1_USER_MSG,
     META_STEP2_SYSTEM_MSG,
     META_STEP2_USER_MSG,
+    META_REDUCE_SYSTEM_MSG,
+    META_REDUCE_USER_MSG,
     META_STEP3_SYSTEM_MSG,
     META_STEP3_USER_MSG,
 )
 
 logger = logging.getLogger(__name__)
 
+# Reduce rounds before the joined summaries are truncated to the budget
+MAX_REDUCE_LEVELS = 4
+# Concurrent meta LLM queries of one batch
+MAX_META_QUERY_THREADS = 8
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "\n[... truncated ...]"
+
 
 class MetaSummarizer:
     """Handles meta-level summarization and recommendation generation."""
@@ -26,11 +47,17 @@ class MetaSummarizer:
         language: str = "python",
         use_text_feedback: bool = False,
         max_recommendations: int = 5,
+        summary_token_budget: Optional[int] = 8000,
+        journal_compact_every: int = 100,
     ):
         self.meta_llm_client = meta_llm_client
         self.language = language
         self.use_text_feedback = use_text_feedback
         self.max_recommendations = max_recommendations
+        # Max. tokens of program summaries in the step-2 prompt (None: no cap)
+        self.summary_token_budget = summary_token_budget
+        # Journal events between full snapshots of the meta state
+        self.journal_compact_every = journal_compact_every
 
         # Meta state
         self.meta_summary = None
@@ -44,6 +71,26 @@ class MetaSummarizer:
         # Track the accumulated count of programs processed in meta updates
         self.total_programs_processed = 0
 
+        # Background updates: the worker analyzes a snapshot of the pending
+        # programs and publishes its results under `_lock`, bumping
+        # `meta_version`; programs evaluated meanwhile wait for the next one
+        self.meta_version = 0
+        self._lock = threading.RLock()
+        self._worker: Optional[threading.Thread] = None
+        self._in_flight: List[Program] = []
+        self._worker_result: Optional[Tuple[Optional[str], float]] = None
+
+        # Step-1 summaries by program id, reused until the program has been
+        # part of a published update; new ones await `drain_program_summaries`
+        self.program_summaries: Dict[str, str] = {}
+        self._unsaved_summaries: Dict[str, str] = {}
+
+        # Append-only journal of meta events; `_journal_seq` numbers the
+        # events, snapshots record the last one they include
+        self._journal_seq = 0
+        self._journal_size = 0
+        self._journal_buffer: List[dict] = []
+
     def add_evaluated_program(self, program: Program) -> None:
         """Add newly evaluated program to the tracking list."""
         logger.debug(
@@ -53,7 +100,15 @@ class MetaSummarizer:
 
         # Track ALL evaluated programs (both correct and incorrect)
         # for meta learning
-        self.evaluated_since_last_meta.append(program)
+        try:
+            program_data = program.to_dict()
+        except Exception as e:
+            logger.warning(f"Failed to serialize program {program.id}: {e}")
+            program_data = None
+        with self._lock:
+            self.evaluated_since_last_meta.append(program)
+            if program_data is not None:
+                self._record_event("program_added", program=program_data)
         logger.info(
             f"Added program {program.id} to meta memory tracking "
             f"(correct={program.correct}, "
@@ -94,35 +149,178 @@ class MetaSummarizer:
             logger.warning("No meta LLM client configured")
             return None, 0.0
 
-        # Use recently evaluated programs for memory scratchpad
-        programs_to_analyze = (
-            self.evaluated_since_last_meta if self.evaluated_since_last_meta else []
-        )
+        with self._lock:
+            # Use recently evaluated programs for memory scratchpad
+            programs_to_analyze = self.evaluated_since_last_meta
+            self.evaluated_since_last_meta = []
+            self._in_flight = programs_to_analyze
 
         if len(programs_to_analyze) == 0:
             logger.info("No programs evaluated since last meta query, skipping")
             return None, 0.0
 
+        return self._update_from_snapshot(programs_to_analyze, best_program)
+
+    def start_background_update(self, best_program: Optional[Program] = None) -> bool:
+        """Run the meta update for the pending programs on a worker thread.
+
+        Returns False if there is nothing to analyze or an update is already
+        running; programs evaluated in the meantime are coalesced into the
+        next update. Collect the outcome with `poll_background_update`.
+        """
+        if not self.meta_llm_client:
+            return False
+        with self._lock:
+            if self.is_updating() or not self.evaluated_since_last_meta:
+                return False
+            snapshot = self.evaluated_since_last_meta
+            self.evaluated_since_last_meta = []
+            self._in_flight = snapshot
+            self._worker = threading.Thread(
+                target=self._background_update,
+                args=(snapshot, best_program),
+                name="meta-summarizer",
+                daemon=True,
+            )
+            self._worker.start()
+        logger.info(f"Started background meta update for {len(snapshot)} programs")
+        return True
+
+    def _background_update(
+        self, snapshot: List[Program], best_program: Optional[Program]
+    ) -> None:
+        result = self._update_from_snapshot(snapshot, best_program)
+        with self._lock:
+            self._worker_result = result
+
+    def is_updating(self) -> bool:
+        """Whether a background meta update is in flight."""
+        return self._worker is not None and self._worker.is_alive()
+
+    def poll_background_update(self) -> Optional[Tuple[Optional[str], float]]:
+        """(updated_recommendations, cost) of a finished background update.
+
+        Returns None while the update is running or if there is none; each
+        result is returned once.
+        """
+        with self._lock:
+            if self._worker is None or self._worker.is_alive():
+                return None
+            self._worker = None
+            result, self._worker_result = self._worker_result, None
+        return result if result is not None else (None, 0.0)
+
+    def wait_background_update(
+        self, timeout: Optional[float] = None
+    ) -> Optional[Tuple[Optional[str], float]]:
+        """Block until the in-flight update (if any) finishes and return it."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        return self.poll_background_update()
+
+    def _update_from_snapshot(
+        self, programs_to_analyze: List[Program], best_program: Optional[Program]
+    ) -> Tuple[Optional[str], float]:
+        """Analyze `programs_to_analyze` and publish the results atomically.
+
+        On failure the programs are put back at the front of the pending list.
+        """
+        summaries, insights, recommendations, total_meta_cost = self._analyze(
+            programs_to_analyze, best_program
+        )
+        with self._lock:
+            self._in_flight = []
+            if recommendations is None:
+                self.evaluated_since_last_meta = (
+                    programs_to_analyze + self.evaluated_since_last_meta
+                )
+                return None, total_meta_cost
+
+            # Update internal state
+            # Concatenate new individual summaries to existing ones
+            if self.meta_summary:
+                self.meta_summary += "\n\n" + summaries
+            else:
+                self.meta_summary = summaries
+
+            self.meta_scratch_pad = insights
+            self.meta_recommendations = recommendations
+            self.meta_version += 1
+
+            # Store the newly generated recommendations in history immediately
+            if recommendations and isinstance(recommendations, str):
+                self.meta_recommendations_history.append(recommendations)
+                logger.debug(
+                    f"Added new recommendations to history "
+                    f"(total: {len(self.meta_recommendations_history)})"
+                )
+
+            for program in programs_to_analyze:
+                self.program_summaries.pop(program.id, None)
+
+            # Only programs added AFTER this snapshot remain "unprocessed"
+            num_processed = len(programs_to_analyze)
+            self.total_programs_processed += num_processed
+
+            self._record_event(
+                "update_applied",
+                program_ids=[p.id for p in programs_to_analyze],
+                meta_summary=summaries,
+                meta_scratch_pad=insights,
+                total_programs_processed=self.total_programs_processed,
+            )
+            self._record_event(
+                "recommendations_published",
+                meta_recommendations=recommendations,
+                meta_version=self.meta_version,
+            )
+        logger.info(
+            f"Processed {num_processed} programs from meta memory "
+            f"(total processed: {self.total_programs_processed}, "
+            f"meta version: {self.meta_version})"
+        )
+
+        return (
+            (recommendations if isinstance(recommendations, str) else None),
+            total_meta_cost,
+        )
+
+    def _analyze(
+        self, programs_to_analyze: List[Program], best_program: Optional[Program]
+    ) -> Tuple[Optional[str], Optional[str], Optional[str], float]:
+        """Run the 3 LLM steps without touching the published state.
+
+        Returns (summaries, insights, recommendations, cost); the texts are
+        None if any step failed.
+        """
         total_meta_cost = 0.0
+        failed = (None, None, None)
 
         try:
             # Step 1: Create individual program summaries
-            individual_summaries, step1_cost = self._step1_individual_summaries(
+            program_summaries, step1_cost = self._step1_individual_summaries(
                 programs_to_analyze
             )
             total_meta_cost += step1_cost
-            if not individual_summaries:
+            if not program_summaries:
                 logger.error("Step 1 failed - no individual summaries generated")
-                return None, total_meta_cost
+                return (*failed, total_meta_cost)
+            individual_summaries = "\n\n".join(program_summaries)
 
-            # Step 2: Generate global insights scratchpad
+            # Step 2: Condense summaries to the prompt budget, then generate
+            # the global insights scratchpad
+            reduced_summaries, reduce_cost = self._reduce_summaries(
+                program_summaries
+            )
+            total_meta_cost += reduce_cost
             global_insights, step2_cost = self._step2_global_insights(
-                individual_summaries, best_program
+                reduced_summaries, best_program
             )
             total_meta_cost += step2_cost
             if not global_insights:
                 logger.error("Step 2 failed - no global insights generated")
-                return None, total_meta_cost
+                return (*failed, total_meta_cost)
 
             # Step 3: Generate recommendations based on insights
             recommendations, step3_cost = self._step3_generate_recommendations(
@@ -131,56 +329,21 @@ class MetaSummarizer:
             total_meta_cost += step3_cost
             if not recommendations:
                 logger.error("Step 3 failed - no recommendations generated")
-                return None, total_meta_cost
-
-            # Update internal state
-            # Concatenate new individual summaries to existing ones
-            if self.meta_summary:
-                self.meta_summary += "\n\n" + individual_summaries
-            else:
-                self.meta_summary = individual_summaries
-
-            self.meta_scratch_pad = global_insights
-            self.meta_recommendations = recommendations
-
-            # Store the newly generated recommendations in history immediately
-            if recommendations and isinstance(recommendations, str):
-                self.meta_recommendations_history.append(recommendations)
-                logger.debug(
-                    f"Added new recommendations to history "
-                    f"(total: {len(self.meta_recommendations_history)})"
-                )
+                return (*failed, total_meta_cost)
 
             logger.info(
                 f"==> Meta-analysis completed successfully with 3-step process (total cost: ${total_meta_cost:.4f})"
             )
         except Exception as e:
             logger.error(f"Failed to complete 3-step meta-analysis: {e}")
-            return None, total_meta_cost
-
-        # Clear the evaluated programs list immediately after processing
-        # This ensures that only programs added AFTER this meta update
-        # will be saved as "unprocessed" programs
-        num_processed = len(self.evaluated_since_last_meta)
-        self.total_programs_processed += num_processed
-        self.evaluated_since_last_meta = []
-        logger.info(
-            f"Processed and cleared {num_processed} programs from meta memory "
-            f"(total processed: {self.total_programs_processed})"
-        )
+            return (*failed, total_meta_cost)
 
-        return (
-            (
-                self.meta_recommendations
-                if isinstance(self.meta_recommendations, str)
-                else None
-            ),
-            total_meta_cost,
-        )
+        return individual_summaries, global_insights, recommendations, total_meta_cost
 
     def get_unprocessed_program_count(self) -> int:
         """Get the count of unprocessed programs awaiting meta analysis."""
-        return len(self.evaluated_since_last_meta)
+        with self._lock:
+            return len(self._in_flight) + len(self.evaluated_since_last_meta)
 
     def get_recommendations_history_count(self) -> int:
         """Get the count of previous recommendations stored in history."""
@@ -198,6 +361,8 @@ class MetaSummarizer:
             logger.info("No meta LLM client configured, skipping final summary")
             return False
 
+        # Let an in-flight background update publish first
+        self.wait_background_update()
         unprocessed_count = len(self.evaluated_since_last_meta)
         if unprocessed_count == 0:
             logger.info("No unprocessed programs for final summary")
@@ -217,79 +382,176 @@ class MetaSummarizer:
             logger.warning("Final meta summary failed to generate recommendations")
             return False
 
+    def add_program_summaries(self, summaries: Dict[str, str]) -> None:
+        """Reuse step-1 summaries computed earlier (e.g. loaded from the DB)."""
+        with self._lock:
+            self.program_summaries.update(summaries)
+
+    def drain_program_summaries(self) -> Dict[str, str]:
+        """Return the step-1 summaries computed since the last call."""
+        with self._lock:
+            summaries, self._unsaved_summaries = self._unsaved_summaries, {}
+        return summaries
+
     def _step1_individual_summaries(
         self, programs_to_analyze: List[Program]
-    ) -> Tuple[Optional[str], float]:
-        """Step 1: Create individual summaries for each program using batch queries."""
+    ) -> Tuple[List[str], float]:
+        """Step 1: Summarize each program (batch query), reusing known ones."""
         if not programs_to_analyze:
             logger.warning("No programs to analyze in Step 1")
-            return None, 0.0
+            return [], 0.0
+
+        with self._lock:
+            known = dict(self.program_summaries)
+        missing = [p for p in programs_to_analyze if p.id not in known]
 
         # Create individual program messages for batch processing
-        user_messages, generation_ids, patch_names, correct_programs = [], [], [], []
-        for program in programs_to_analyze:
+        user_messages = []
+        for program in missing:
             individual_program_msg = construct_individual_program_msg(
                 program,
                 language=self.language,
                 include_text_feedback=self.use_text_feedback,
             )
-            generation_ids.append(program.generation)
-            patch_names.append(program.metadata["patch_name"])
-            correct_programs.append(program.correct)
             user_msg = META_STEP1_USER_MSG.replace(
                 "{individual_program_msg}", individual_program_msg
             )
             user_messages.append(user_msg)
 
-        # Use batch query to process all programs
         num_programs = len(programs_to_analyze)
-        logger.info(f"==> Step 1 - Processing {num_programs} programs with batch query")
-        responses = self.meta_llm_client.batch_kwargs_query(
-            num_samples=num_programs,
-            msg=user_messages,
-            system_msg=META_STEP1_SYSTEM_MSG,
+        new_summaries: Dict[str, str] = {}
+        total_cost = 0.0
+        if missing:
+            # Use batch query to process all programs without a summary
+            logger.info(
+                f"==> Step 1 - Processing {len(missing)}/{num_programs} programs "
+                f"with batch query ({num_programs - len(missing)} cached)"
+            )
+            responses = self._batch_query(user_messages, META_STEP1_SYSTEM_MSG)
+            if not any(responses):
+                logger.error("Step 1: Failed to get responses from meta LLM client")
+
+            for program, response in zip(missing, responses):
+                if response and response.content:
+                    program_summary = response.content.strip()
+                    program_summary += "\n**Program Identifier:** "
+                    program_summary += f"Generation {program.generation} - Patch Name {program.metadata['patch_name']} - Correct Program: {program.correct}"
+                    new_summaries[program.id] = program_summary
+                    total_cost += response.cost or 0.0
+                else:
+                    logger.warning(f"Step 1: Empty response for program {program.id}")
+
+            with self._lock:
+                self.program_summaries.update(new_summaries)
+                self._unsaved_summaries.update(new_summaries)
+        known.update(new_summaries)
+
+        # Sort summaries by generation
+        summarized = sorted(
+            (p for p in programs_to_analyze if p.id in known),
+            key=lambda p: p.generation,
         )
+        combined_summaries = [known[p.id] for p in summarized]
 
-        if not responses:
-            logger.error("Step 1: Failed to get responses from meta LLM client")
-            return None, 0.0
+        if not combined_summaries:
+            logger.error("Step 1: No valid summaries generated")
+            return [], total_cost
 
-        # Filter out None responses and combine summaries
-        valid_responses = [r for r in responses if r is not None]
-        if not valid_responses:
-            logger.error("Step 1: All batch responses were None")
-            return None, 0.0
+        logger.info(
+            f"==> Step 1 - {len(combined_summaries)}/{num_programs} "
+            f"individual summaries available (cost: ${total_cost:.4f})"
+        )
+        return combined_summaries, total_cost
 
-        # Combine all individual summaries
-        combined_summaries = []
-        total_cost = 0.0
-        for i, response in enumerate(valid_responses):
-            if response and response.content:
-                program_summary = response.content.strip()
-                program_summary += "\n**Program Identifier:** "
-                program_summary += f"Generation {generation_ids[i]} - Patch Name {patch_names[i]} - Correct Program: {correct_programs[i]}"
-                combined_summaries.append(program_summary)
-                total_cost += response.cost or 0.0
-            else:
-                logger.warning(f"Step 1: Empty response for program {i}")
+    def _batch_query(
+        self, user_messages: List[str], system_msg: str
+    ) -> List[Optional[QueryResult]]:
+        """Query all messages concurrently, one result (or None) per message.
 
-        # Sort combined_summaries by generation (using generation_ids)
-        # Zip together summaries and their generation, sort, then extract summaries
-        summaries_with_gen = list(zip(generation_ids, combined_summaries))
-        summaries_with_gen.sort(key=lambda x: x[0])
-        combined_summaries = [summary for _, summary in summaries_with_gen]
+        Uses threads rather than `LLMClient.batch_kwargs_query`: this may run
+        in the background worker, and forking a process pool from a thread
+        while others hold locks can deadlock the children.
+        """
+        if not user_messages:
+            return []
+        num_threads = min(len(user_messages), MAX_META_QUERY_THREADS)
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            return list(
+                executor.map(
+                    lambda msg: self.meta_llm_client.query(
+                        msg=msg, system_msg=system_msg
+                    ),
+                    user_messages,
+                )
+            )
 
-        if not combined_summaries:
-            logger.error("Step 1: No valid summaries generated")
-            return None, total_cost
+    def _reduce_summaries(self, summaries: List[str]) -> Tuple[str, float]:
+        """Hierarchically condense summaries to `summary_token_budget` tokens.
 
-        # Join all summaries with double newlines
-        final_summary = "\n\n".join(combined_summaries)
+        Summaries are grouped into consecutive batches that each fit the
+        budget; every batch is condensed by one LLM call, all batches of a
+        level in parallel, until the result fits. Latency grows with the
+        number of levels (logarithmic in the number of programs) rather than
+        with the prompt size.
+        """
+        budget = self.summary_token_budget
+        joined = "\n\n".join(summaries)
+        if budget is None or _estimate_tokens(joined) <= budget:
+            return joined, 0.0
+
+        total_cost = 0.0
+        level = 0
+        # Any single summary above the budget is cut to fit a batch
+        summaries = [_truncate_to_tokens(s, budget) for s in summaries]
+        while len(summaries) > 1 and level < MAX_REDUCE_LEVELS:
+            if _estimate_tokens("\n\n".join(summaries)) <= budget:
+                break
+            level += 1
+            groups: List[List[str]] = [[]]
+            group_tokens = 0
+            for summary in summaries:
+                tokens = _estimate_tokens(summary)
+                if groups[-1] and group_tokens + tokens > budget:
+                    groups.append([])
+                    group_tokens = 0
+                groups[-1].append(summary)
+                group_tokens += tokens
+            if len(groups) == len(summaries):
+                # Every summary fills a batch on its own: condense in pairs
+                groups = [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+            # Leave headroom so the next level fits in a single batch
+            max_words = max(100, int(0.75 * budget * 0.75 / len(groups)))
+            user_messages = [
+                META_REDUCE_USER_MSG.replace(
+                    "{individual_summaries}", "\n\n".join(group)
+                ).replace("{max_words}", str(max_words))
+                for group in groups
+            ]
+            logger.info(
+                f"==> Step 2 - Reduce level {level}: condensing "
+                f"{len(summaries)} summaries in {len(groups)} batches"
+            )
+            responses = self._batch_query(user_messages, META_REDUCE_SYSTEM_MSG)
+            reduced = []
+            for group, response in zip(groups, responses):
+                if response and response.content:
+                    reduced.append(response.content.strip())
+                    total_cost += response.cost or 0.0
+                else:
+                    # Keep the batch, cut to its share of the budget
+                    reduced.append(
+                        _truncate_to_tokens(
+                            "\n\n".join(group), budget // len(groups)
+                        )
+                    )
+            summaries = reduced
+
+        joined = _truncate_to_tokens("\n\n".join(summaries), budget)
         logger.info(
-            f"==> Step 1 - {len(combined_summaries)}/{num_programs} "
-            f"individual summaries generated (cost: ${total_cost:.4f})"
+            f"==> Step 2 - Summaries reduced to ~{_estimate_tokens(joined)} tokens "
+            f"in {level} levels (cost: ${total_cost:.4f})"
         )
-        return final_summary, total_cost
+        return joined, total_cost
 
     def _step2_global_insights(
         self, individual_summaries: str, best_program: Optional[Program] = None
@@ -375,15 +637,20 @@ class MetaSummarizer:
         self,
     ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """Get current meta recommendations without updating."""
-        recommendations = (
-            self.meta_recommendations
-            if isinstance(self.meta_recommendations, str)
-            else None
-        )
-        summary = self.meta_summary if isinstance(self.meta_summary, str) else None
-        scratch_pad = (
-            self.meta_scratch_pad if isinstance(self.meta_scratch_pad, str) else None
-        )
+        with self._lock:
+            recommendations = (
+                self.meta_recommendations
+                if isinstance(self.meta_recommendations, str)
+                else None
+            )
+            summary = (
+                self.meta_summary if isinstance(self.meta_summary, str) else None
+            )
+            scratch_pad = (
+                self.meta_scratch_pad
+                if isinstance(self.meta_scratch_pad, str)
+                else None
+            )
 
         # Debug logging
         logger.debug(
@@ -402,6 +669,16 @@ class MetaSummarizer:
 
         return (recommendations, summary, scratch_pad)
 
+    def get_recommendations(self) -> Tuple[Optional[str], int]:
+        """Current recommendations and the meta version they belong to."""
+        with self._lock:
+            recommendations = (
+                self.meta_recommendations
+                if isinstance(self.meta_recommendations, str)
+                else None
+            )
+            return recommendations, self.meta_version
+
     def _build_previous_context(self) -> str:
         """Build context string from previous meta state."""
         context_parts = []
@@ -429,7 +706,48 @@ class MetaSummarizer:
             return 0
         return len([line for line in text.split("\n") if line.strip().startswith("•")])
 
+    def _record_event(self, event: str, **data) -> None:
+        """Buffer a journal event; call with `_lock` held."""
+        self._journal_seq += 1
+        self._journal_buffer.append({"seq": self._journal_seq, "event": event, **data})
+
+    @staticmethod
+    def _journal_path(filepath: str) -> Path:
+        return Path(filepath).with_suffix(".journal.jsonl")
+
     def save_meta_state(self, filepath: str) -> None:
+        """Persist the meta state changes since the last save.
+
+        New events are appended to the journal next to `filepath`, so a save
+        costs O(events) rather than O(state). Every `journal_compact_every`
+        events (and on the first save) the full state is written to
+        `filepath` as a snapshot and the journal is restarted.
+        """
+        journal_path = self._journal_path(filepath)
+        with self._lock:
+            events, self._journal_buffer = self._journal_buffer, []
+        if events:
+            try:
+                journal_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(journal_path, "a", encoding="utf-8") as f:
+                    for event in events:
+                        f.write(json.dumps(event, default=str) + "\n")
+                self._journal_size += len(events)
+            except Exception as e:
+                logger.error(f"Failed to append to meta journal {journal_path}: {e}")
+                # Fall back to a full snapshot so nothing is lost
+                self._journal_size = self.journal_compact_every
+
+        if (
+            self._journal_size >= self.journal_compact_every
+            or not Path(filepath).exists()
+        ):
+            if self._write_snapshot(filepath):
+                # Everything journaled so far is part of the snapshot
+                journal_path.unlink(missing_ok=True)
+                self._journal_size = 0
+
+    def _write_snapshot(self, filepath: str) -> bool:
         """Save the meta state to a file.
 
         Only saves:
@@ -441,7 +759,23 @@ class MetaSummarizer:
             unprocessed_programs_data = []
             failed_serializations = 0
 
-            for i, prog in enumerate(self.evaluated_since_last_meta):
+            # In-flight programs count as unprocessed until their update
+            # is published, so a crash mid-update does not lose them
+            with self._lock:
+                pending = self._in_flight + self.evaluated_since_last_meta
+                meta_state = {
+                    "meta_summary": self.meta_summary,
+                    "meta_scratch_pad": self.meta_scratch_pad,
+                    "meta_recommendations": self.meta_recommendations,
+                    "meta_recommendations_history": list(
+                        self.meta_recommendations_history
+                    ),
+                    "total_programs_meta_processed": self.total_programs_processed,
+                    "meta_version": self.meta_version,
+                    "journal_seq": self._journal_seq,
+                }
+
+            for i, prog in enumerate(pending):
                 try:
                     prog_dict = prog.to_dict()
                     unprocessed_programs_data.append(prog_dict)
@@ -452,11 +786,7 @@ class MetaSummarizer:
 
             meta_data = {
                 "unprocessed_programs": unprocessed_programs_data,
-                "meta_summary": self.meta_summary,
-                "meta_scratch_pad": self.meta_scratch_pad,
-                "meta_recommendations": self.meta_recommendations,
-                "meta_recommendations_history": (self.meta_recommendations_history),
-                "total_programs_meta_processed": self.total_programs_processed,
+                **meta_state,
             }
 
             # Ensure directory exists
@@ -509,6 +839,7 @@ class MetaSummarizer:
                 logger.warning(
                     f"Failed to serialize {failed_serializations} programs during save"
                 )
+            return True
         except Exception as e:
             logger.error(f"Failed to save meta state to {filepath}: {e}")
             import traceback
@@ -521,8 +852,73 @@ class MetaSummarizer:
                     temp_filepath.unlink()
                 except Exception:
                     pass
+            return False
 
     def load_meta_state(self, filepath: str) -> bool:
+        """Load the snapshot at `filepath` and replay the journal after it."""
+        loaded = self._load_snapshot(filepath)
+        replayed = self._replay_journal(self._journal_path(filepath))
+        return loaded or replayed > 0
+
+    def _replay_journal(self, journal_path: Path) -> int:
+        """Apply journal events newer than the loaded snapshot."""
+        if not journal_path.exists():
+            return 0
+        snapshot_seq = self._journal_seq
+        applied = 0
+        with open(journal_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        for line_no, line in enumerate(lines, 1):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-append
+                logger.warning(f"Skipping corrupt meta journal line {line_no}")
+                continue
+            if event.get("seq", 0) <= snapshot_seq:
+                continue
+            kind = event.get("event")
+            if kind == "program_added":
+                try:
+                    program = Program.from_dict(event["program"])
+                except Exception as e:
+                    logger.warning(f"Failed to restore journaled program: {e}")
+                    continue
+                self.evaluated_since_last_meta.append(program)
+            elif kind == "update_applied":
+                processed = set(event.get("program_ids", []))
+                self.evaluated_since_last_meta = [
+                    p for p in self.evaluated_since_last_meta if p.id not in processed
+                ]
+                summaries = event.get("meta_summary")
+                if summaries:
+                    if self.meta_summary:
+                        self.meta_summary += "\n\n" + summaries
+                    else:
+                        self.meta_summary = summaries
+                self.meta_scratch_pad = event.get("meta_scratch_pad")
+                self.total_programs_processed = event.get(
+                    "total_programs_processed", self.total_programs_processed
+                )
+            elif kind == "recommendations_published":
+                recommendations = event.get("meta_recommendations")
+                self.meta_recommendations = recommendations
+                if recommendations and isinstance(recommendations, str):
+                    self.meta_recommendations_history.append(recommendations)
+                self.meta_version = event.get("meta_version", self.meta_version)
+            else:
+                logger.warning(f"Unknown meta journal event: {kind}")
+                continue
+            self._journal_seq = max(self._journal_seq, event["seq"])
+            applied += 1
+        self._journal_size = len(lines)
+        logger.info(
+            f"Replayed {applied} meta journal events from {journal_path} "
+            f"({len(self.evaluated_since_last_meta)} unprocessed programs)"
+        )
+        return applied
+
+    def _load_snapshot(self, filepath: str) -> bool:
         """Load the meta state from a file."""
         filepath_obj = Path(filepath)
         if not filepath_obj.exists():
@@ -626,6 +1022,10 @@ class MetaSummarizer:
             self.total_programs_processed = meta_data.get(
                 "total_programs_meta_processed", 0
             )
+            self.meta_version = meta_data.get(
+                "meta_version", len(self.meta_recommendations_history)
+            )
+            self._journal_seq = meta_data.get("journal_seq", 0)
 
             # Debug logging for meta recommendations
             if self.meta_recommendations:
@@ -14,6 +14,7 @@ from .parents import CombinedParentSelector
 from .inspirations import CombinedContextSelector
 from .islands import CombinedIslandManager
 from .display import DatabaseDisplay
+from .lsh import MinHashLSHIndex
 from shinka.llm.embedding import EmbeddingClient
 
 logger = logging.getLogger(__name__)
@@ -85,6 +86,11 @@ class DatabaseConfig:
     # Embedding model name
     embedding_model: str = "text-embedding-3-small"
 
+    # MinHash/LSH lexical duplicate index
+    lsh_num_perm: int = 64
+    lsh_num_bands: int = 16
+    lsh_shingle_size: int = 5
+
 
 def db_retry(max_retries=5, initial_delay=0.1, backoff_factor=2):
     """
@@ -277,6 +283,13 @@ class ProgramDatabase:
         # Initialize island manager (will be set after db connection)
         self.island_manager: Optional[CombinedIslandManager] = None
 
+        # Lexical duplicate index, synced lazily with the programs table
+        self.lsh_index = MinHashLSHIndex(
+            num_perm=self.config.lsh_num_perm,
+            num_bands=self.config.lsh_num_bands,
+            shingle_size=self.config.lsh_shingle_size,
+        )
+
         db_path_str = getattr(self.config, "db_path", None)
 
         if db_path_str:
@@ -416,6 +429,32 @@ class ProgramDatabase:
             """
         )
 
+        # Memoized LLM novelty verdicts: (candidate code hash, neighbor id)
+        self.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS novelty_verdicts (
+                candidate_hash TEXT NOT NULL,
+                neighbor_id TEXT NOT NULL,
+                is_novel BOOLEAN NOT NULL,
+                explanation TEXT,
+                cost REAL DEFAULT 0.0,
+                timestamp REAL NOT NULL,
+                PRIMARY KEY (candidate_hash, neighbor_id)
+            )
+            """
+        )
+
+        # Step-1 meta summaries, computed once per program
+        self.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS meta_summaries (
+                program_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            )
+            """
+        )
+
         self.conn.commit()
 
         # Run any necessary migrations
@@ -647,6 +686,7 @@ class ProgramDatabase:
             raise
 
         self._update_archive(program)
+        self.lsh_index.add(program.id, program.code, program.language)
 
         # Update best program tracking
         self._update_best_program(program)
@@ -1576,6 +1616,179 @@ class ProgramDatabase:
         )
         return similarity_scores
 
+    def _sync_lsh_index(self) -> None:
+        """Index programs inserted outside `add` (island copies, resumes)."""
+        if not self.cursor:
+            raise ConnectionError("DB not connected.")
+        if self._count_programs_in_db() == len(self.lsh_index):
+            return
+        self.cursor.execute("SELECT id FROM programs")
+        missing = [
+            row["id"]
+            for row in self.cursor.fetchall()
+            if row["id"] not in self.lsh_index
+        ]
+        for i in range(0, len(missing), 500):
+            chunk = missing[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self.cursor.execute(
+                "SELECT id, code, language FROM programs "
+                f"WHERE id IN ({placeholders})",
+                chunk,
+            )
+            for row in self.cursor.fetchall():
+                self.lsh_index.add(row["id"], row["code"], row["language"])
+
+    @db_retry()
+    def find_lexical_duplicates(
+        self,
+        code: str,
+        island_idx: Optional[int] = None,
+        threshold: float = 0.9,
+        language: str = "python",
+    ) -> List[Tuple[str, float, bool]]:
+        """
+        Find exact and near-duplicates of `code` via the MinHash/LSH index,
+        without embeddings.
+
+        Args:
+            code: The code to look up
+            island_idx: Only consider programs currently in this island
+            threshold: Min. estimated Jaccard similarity of token shingles
+            language: Language of the code (for comment stripping)
+
+        Returns:
+            List of (program_id, similarity, is_exact), most similar first
+        """
+        self._sync_lsh_index()
+        matches = self.lsh_index.query(code, threshold=threshold, language=language)
+        if not matches or island_idx is None:
+            return matches
+        ids = [m[0] for m in matches]
+        placeholders = ",".join("?" * len(ids))
+        self.cursor.execute(
+            "SELECT id FROM programs "
+            f"WHERE island_idx = ? AND id IN ({placeholders})",
+            [island_idx, *ids],
+        )
+        in_island = {row["id"] for row in self.cursor.fetchall()}
+        return [m for m in matches if m[0] in in_island]
+
+    @db_retry()
+    def get_top_similar_programs(
+        self,
+        code_embedding: List[float],
+        island_idx: int,
+        top_k: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Get the top-k most similar programs in the specified island in a
+        single scan.
+
+        Args:
+            code_embedding: The embedding to compare against
+            island_idx: The island index to constrain the search to
+            top_k: Number of neighbors to return (None returns all)
+
+        Returns:
+            List of (program_id, similarity), most similar first
+        """
+        if not self.cursor:
+            raise ConnectionError("DB not connected.")
+        if not code_embedding:
+            return []
+
+        self.cursor.execute(
+            """
+            SELECT id, embedding FROM programs
+            WHERE island_idx = ? AND embedding IS NOT NULL AND embedding != '[]'
+            """,
+            (island_idx,),
+        )
+        neighbors = []
+        for row in self.cursor.fetchall():
+            try:
+                embedding = json.loads(row["embedding"])
+            except json.JSONDecodeError:
+                logger.warning(f"Could not decode embedding for program {row['id']}")
+                continue
+            if embedding:
+                neighbors.append(
+                    (row["id"], self._cosine_similarity(code_embedding, embedding))
+                )
+        neighbors.sort(key=lambda n: n[1], reverse=True)
+        return neighbors if top_k is None else neighbors[:top_k]
+
+    @db_retry()
+    def get_novelty_verdict(
+        self, candidate_hash: str, neighbor_id: str
+    ) -> Optional[Tuple[bool, str, float]]:
+        """Memoized (is_novel, explanation, cost) for a candidate/neighbor pair."""
+        if not self.cursor:
+            raise ConnectionError("DB not connected.")
+        self.cursor.execute(
+            "SELECT is_novel, explanation, cost FROM novelty_verdicts "
+            "WHERE candidate_hash = ? AND neighbor_id = ?",
+            (candidate_hash, neighbor_id),
+        )
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return bool(row["is_novel"]), row["explanation"] or "", row["cost"] or 0.0
+
+    @db_retry()
+    def store_novelty_verdict(
+        self,
+        candidate_hash: str,
+        neighbor_id: str,
+        is_novel: bool,
+        explanation: str,
+        cost: float,
+    ) -> None:
+        if self.read_only:
+            return
+        if not self.cursor or not self.conn:
+            raise ConnectionError("DB not connected.")
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO novelty_verdicts "
+            "(candidate_hash, neighbor_id, is_novel, explanation, cost, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (candidate_hash, neighbor_id, is_novel, explanation, cost, time.time()),
+        )
+        self.conn.commit()
+
+    @db_retry()
+    def get_meta_summaries(self, program_ids: List[str]) -> Dict[str, str]:
+        """Stored step-1 meta summaries for the given programs."""
+        if not self.cursor:
+            raise ConnectionError("DB not connected.")
+        summaries: Dict[str, str] = {}
+        for i in range(0, len(program_ids), 500):
+            chunk = program_ids[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self.cursor.execute(
+                "SELECT program_id, summary FROM meta_summaries "
+                f"WHERE program_id IN ({placeholders})",
+                chunk,
+            )
+            for row in self.cursor.fetchall():
+                summaries[row["program_id"]] = row["summary"]
+        return summaries
+
+    @db_retry()
+    def store_meta_summaries(self, summaries: Dict[str, str]) -> None:
+        if self.read_only or not summaries:
+            return
+        if not self.cursor or not self.conn:
+            raise ConnectionError("DB not connected.")
+        now = time.time()
+        self.cursor.executemany(
+            "INSERT OR REPLACE INTO meta_summaries (program_id, summary, timestamp) "
+            "VALUES (?, ?, ?)",
+            [(pid, summary, now) for pid, summary in summaries.items()],
+        )
+        self.conn.commit()
+
     @db_retry()
     def get_most_similar_program(
         self, code_embedding: List[float], island_idx: int
@@ -8,6 +8,7 @@ import rich  # type: ignore
 from rich.columns import Columns as RichColumns  # type: ignore
 from rich.console import Console as RichConsole  # type: ignore
 from rich.table import Table as RichTable  # type: ignore
+from shinka.llm.usage import merge_usage, summarize_usage
 
 logger = logging.getLogger(__name__)
 
@@ -151,6 +152,43 @@ class DatabaseDisplay:
         )
         _console.print(table)
 
+    def _llm_usage_table(self, usage_rows: list) -> RichTable:
+        """Per caller/model LLM usage: volume, latency, throughput and cost."""
+        table = RichTable(
+            title="[bold blue]LLM Usage & Throughput[/bold blue]",
+            border_style="blue",
+            box=rich.box.ROUNDED,
+            width=120,  # Match program summary table width
+        )
+        table.add_column("Caller", style="cyan bold", width=8)
+        table.add_column("Model", style="white", width=22, overflow="ellipsis")
+        table.add_column("Calls", justify="right", style="green")
+        table.add_column("Fail", justify="right", style="red")
+        table.add_column("Tok In", justify="right", style="yellow")
+        table.add_column("Tok Out", justify="right", style="yellow")
+        table.add_column("Avg Lat", justify="right", style="magenta")
+        table.add_column("TTFT", justify="right", style="magenta")
+        table.add_column("Tok/s", justify="right", style="bold green")
+        table.add_column("Cost", justify="right", style="green")
+
+        def fmt(x, spec, suffix=""):
+            return f"{x:{spec}}{suffix}" if x is not None else "[dim]-[/dim]"
+
+        for row in usage_rows:
+            table.add_row(
+                row["caller"],
+                row["model"],
+                str(row["calls"]),
+                str(row["failures"]),
+                str(row["input_tokens"]),
+                str(row["output_tokens"]),
+                fmt(row["avg_latency"], ".2f", "s"),
+                fmt(row["avg_ttft"], ".2f", "s"),
+                fmt(row["tokens_per_second"], ".1f"),
+                f"${row['cost']:.4f}",
+            )
+        return table
+
     def print_summary(self, console: Optional[RichConsole] = None) -> None:
         """Print a summary of the database contents to the terminal."""
         if not self.cursor or not self.conn:
@@ -165,6 +203,10 @@ class DatabaseDisplay:
         total_novelty_cost = 0
         total_meta_cost = 0
         total_compute_time = 0
+        llm_usage: dict = {}
+        patch_llm_calls = 0
+        patch_successes = 0
+        patch_repaired = 0
         avg_score = 0.0
         best_score = 0.0  # Initialize best_score
         num_with_scores = 0
@@ -185,6 +227,16 @@ class DatabaseDisplay:
                         total_meta_cost += float(metadata["meta_cost"])
                     if "compute_time" in metadata:
                         total_compute_time += float(metadata["compute_time"])
+                    if metadata.get("llm_usage"):
+                        merge_usage(llm_usage, metadata["llm_usage"])
+                    if metadata.get("patch_llm_calls"):
+                        patch_llm_calls += int(metadata["patch_llm_calls"])
+                        if metadata.get("error_attempt") is None:
+                            patch_successes += 1
+                        if set(metadata.get("patch_repairs") or []) - {
+                            "structured"
+                        }:
+                            patch_repaired += 1
 
                 if row["combined_score"] is not None:
                     score = float(row["combined_score"])
@@ -327,6 +379,36 @@ class DatabaseDisplay:
                 avg_cost = total_cost / total_programs
                 cost_table.add_row("Avg $/Program", f"${avg_cost:.2f}")
 
+        # LLM call volume and throughput across all callers
+        usage_rows = summarize_usage(llm_usage)
+        if usage_rows:
+            total_calls = sum(r["calls"] for r in usage_rows)
+            total_out = sum(r["output_tokens"] for r in usage_rows)
+            total_in = sum(r["input_tokens"] for r in usage_rows)
+            cost_table.add_row("LLM Calls", f"{total_calls}")
+            cost_table.add_row("LLM Tokens In/Out", f"{total_in} / {total_out}")
+            decode_time = sum(
+                s["decode_time"] for models in llm_usage.values()
+                for s in models.values()
+            )
+            if decode_time > 0:
+                cost_table.add_row("LLM Avg Tok/s", f"{total_out / decode_time:.1f}")
+            total_retries = sum(r["retries"] for r in usage_rows)
+            if total_retries > 0:
+                retry_time = sum(r["retry_time"] for r in usage_rows)
+                cost_table.add_row(
+                    "LLM Retries", f"{total_retries} ({retry_time:.0f}s)"
+                )
+
+        if patch_llm_calls > 0:
+            cost_table.add_row(
+                "Patch Success/Call",
+                f"{patch_successes}/{patch_llm_calls} "
+                f"({patch_successes / patch_llm_calls * 100:.0f}%)",
+            )
+            if patch_repaired > 0:
+                cost_table.add_row("Patches Repaired", f"{patch_repaired}")
+
         # Add compute time if available
         if total_compute_time > 0:
             hours = int(total_compute_time // 3600)
@@ -350,6 +432,9 @@ class DatabaseDisplay:
 
         _console.print(RichColumns(tables_to_display))
 
+        if usage_rows:
+            _console.print(self._llm_usage_table(usage_rows))
+
         # Table 4: Top Performing Programs (Modified to show best performers)
         highlight_table = RichTable(
             title="[bold green]Top 10 Best Performing Programs[/bold green]",
@@ -0,0 +1,163 @@
+import hashlib
+import io
+import re
+import threading
+import tokenize
+import zlib
+from typing import Dict, List, Set, Tuple
+import numpy as np
+from shinka.edit.apply_diff import redact_immutable
+
+# Mersenne prime 2^31 - 1 keeps a * x + b within uint64 for 32-bit hashes
+_PRIME = np.uint64((1 << 31) - 1)
+
+_TOKEN_RE = re.compile(r"[A-Za-z_]\w*|\d+(?:\.\d+)?|[^\s\w]")
+_C_COMMENT_RE = re.compile(r"//[^\n]*|/\*(?:.|\n)*?\*/")
+
+
+def _strip_py_comments(text: str) -> str:
+    """Drop Python comments, leaving `#` inside string literals intact.
+
+    Falls back to the raw text if it does not tokenize.
+    """
+    lines = text.splitlines(keepends=True)
+    try:
+        comments = [
+            tok.start
+            for tok in tokenize.generate_tokens(io.StringIO(text).readline)
+            if tok.type == tokenize.COMMENT
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return text
+    for row, col in comments:
+        line = lines[row - 1]
+        newline = line[len(line.rstrip("\r\n")) :]
+        lines[row - 1] = line[:col] + newline
+    return "".join(lines)
+
+
+def normalize_code_tokens(code: str, language: str = "python") -> List[str]:
+    """Tokens of the EVOLVE blocks without comments or layout.
+
+    String literals are kept: for text-valued programs they are the content.
+    """
+    text = redact_immutable(code, no_state=True) or code
+    if language == "python":
+        text = _strip_py_comments(text)
+    elif language in ["cpp", "cuda", "rust", "swift"]:
+        text = _C_COMMENT_RE.sub(" ", text)
+    return _TOKEN_RE.findall(text)
+
+
+def code_fingerprint(tokens: List[str]) -> str:
+    """Exact-duplicate key, insensitive to whitespace and comments."""
+    return hashlib.sha256(" ".join(tokens).encode("utf-8")).hexdigest()
+
+
+class MinHashLSHIndex:
+    """MinHash signatures with banded LSH over token shingles.
+
+    Candidates sharing at least one band bucket are verified with the
+    signature-estimated Jaccard similarity. With 64 permutations in 16 bands
+    of 4 rows, pairs above ~0.6 Jaccard collide with high probability.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        num_bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        if num_perm % num_bands != 0:
+            raise ValueError("num_perm must be divisible by num_bands")
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._buckets: List[Dict[bytes, Set[str]]] = [
+            {} for _ in range(num_bands)
+        ]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._fingerprints: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._signatures
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        k = self.shingle_size
+        if len(tokens) <= k:
+            shingles = [" ".join(tokens)]
+        else:
+            shingles = [
+                " ".join(tokens[i : i + k]) for i in range(len(tokens) - k + 1)
+            ]
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in set(shingles)), dtype=np.uint64
+        )
+        hashes = hashes % _PRIME
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def _bands(self, sig: np.ndarray) -> List[bytes]:
+        return [
+            sig[i * self.rows : (i + 1) * self.rows].tobytes()
+            for i in range(self.num_bands)
+        ]
+
+    def add(
+        self,
+        program_id: str,
+        code: str,
+        language: str = "python",
+    ) -> None:
+        tokens = normalize_code_tokens(code, language)
+        sig = self.signature(tokens)
+        fingerprint = code_fingerprint(tokens)
+        with self._lock:
+            if program_id in self._signatures:
+                return
+            self._signatures[program_id] = sig
+            self._fingerprints.setdefault(fingerprint, set()).add(program_id)
+            for band, key in zip(self._buckets, self._bands(sig)):
+                band.setdefault(key, set()).add(program_id)
+
+    def query(
+        self,
+        code: str,
+        threshold: float = 0.0,
+        language: str = "python",
+    ) -> List[Tuple[str, float, bool]]:
+        """Indexed programs similar to `code`, most similar first.
+
+        Returns `(program_id, estimated_jaccard, is_exact)` tuples with an
+        estimate of at least `threshold`; exact duplicates (same normalized
+        tokens) come first with similarity 1.0. A threshold of 1.0 or more
+        returns exact duplicates only.
+        """
+        tokens = normalize_code_tokens(code, language)
+        sig = self.signature(tokens)
+        fingerprint = code_fingerprint(tokens)
+        with self._lock:
+            exact = set(self._fingerprints.get(fingerprint, set()))
+            candidates: Set[str] = set()
+            if threshold < 1.0:
+                for band, key in zip(self._buckets, self._bands(sig)):
+                    candidates |= band.get(key, set())
+            results = []
+            for pid in candidates | exact:
+                if pid in exact:
+                    results.append((pid, 1.0, True))
+                    continue
+                sim = float(np.mean(self._signatures[pid] == sig))
+                if sim >= threshold:
+                    results.append((pid, sim, False))
+        results.sort(key=lambda r: (r[2], r[1]), reverse=True)
+        return results
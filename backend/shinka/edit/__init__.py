@@ -1,10 +1,41 @@
-from .apply_diff import apply_diff_patch, redact_immutable
+from .apply_diff import (
+    PATCH_ARTIFACTS,
+    apply_diff_patch,
+    make_git_diff,
+    redact_immutable,
+)
 from .apply_full import apply_full_patch
-from .summary import summarize_diff
+from .summary import summarize_diff, summarize_diff_text
+from .relative import (
+    CODE_ENCODINGS,
+    apply_unified_diff,
+    encode_relative,
+    make_relative_diff,
+)
+from .validate import register_validator, validate_program
+from .structured import (
+    PATCH_OUTPUT_MODES,
+    patch_output_model,
+    patch_response_format,
+    repair_patch_text,
+)
 
 __all__ = [
     "redact_immutable",
     "apply_diff_patch",
     "apply_full_patch",
+    "make_git_diff",
+    "PATCH_ARTIFACTS",
     "summarize_diff",
+    "summarize_diff_text",
+    "CODE_ENCODINGS",
+    "apply_unified_diff",
+    "encode_relative",
+    "make_relative_diff",
+    "PATCH_OUTPUT_MODES",
+    "patch_output_model",
+    "patch_response_format",
+    "repair_patch_text",
+    "register_validator",
+    "validate_program",
 ]
@@ -1,8 +1,12 @@
+import bisect
+import heapq
+import itertools
 import re
+from collections import Counter, defaultdict
 from pathlib import Path
 import difflib
 import logging
-from typing import Union, Optional, List, Tuple
+from typing import Dict, Union, Optional, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +19,52 @@ PATCH_PATTERN = re.compile(
 EVOLVE_START = re.compile(r"(?:#|//|)?\s*EVOLVE-BLOCK-START")
 EVOLVE_END = re.compile(r"(?:#|//|)?\s*EVOLVE-BLOCK-END")
 
+_MARKER = "EVOLVE-BLOCK"
+_MARKER_REACH = len("EVOLVE-BLOCK-START") - 1
+# Text directly before an END marker that its match may extend over
+_MARKER_GAP = re.compile(r"/?\s*")
+# Max. number of candidate windows scored when a SEARCH block is not found
+_MAX_FUZZY_WINDOWS = 64
+# Edits a line index absorbs before it is rebuilt
+_MAX_INDEX_SHIFTS = 64
+
+# What a successful patch leaves in its generation directory: "all" keeps the
+# raw patch, the original, the patched program and `edit.diff`; "code" only
+# the patched program that gets evaluated (the diff is still returned).
+PATCH_ARTIFACTS = ("all", "code")
+
+
+def _marker_spans(text: str, marker: str) -> list[tuple[int, int]]:
+    """
+    Spans of EVOLVE_START / EVOLVE_END matches for `marker`. The literal is
+    located with str.find and the optional prefix is matched backwards, which
+    gives the same spans as the regexes without trying them at every offset.
+    """
+    spans = []
+    prev_end = 0
+    pos = text.find(marker)
+    while pos != -1:
+        start = pos
+        while start > prev_end and text[start - 1].isspace():
+            start -= 1
+        if start - 2 >= prev_end and text.startswith("//", start - 2):
+            start -= 2
+        elif start > prev_end and text[start - 1] == "#":
+            start -= 1
+        prev_end = pos + len(marker)
+        spans.append((start, prev_end))
+        pos = text.find(marker, prev_end)
+    return spans
+
 
 def _mutable_ranges(text: str) -> list[tuple[int, int]]:
     """Return index ranges that are legal to edit."""
     spans, stack = [], []
-    for m in EVOLVE_START.finditer(text):
-        stack.append(m.end())  # mutable starts *after* the START line
-    for m in EVOLVE_END.finditer(text):
+    for _, end in _marker_spans(text, "EVOLVE-BLOCK-START"):
+        stack.append(end)  # mutable starts *after* the START line
+    for start, _ in _marker_spans(text, "EVOLVE-BLOCK-END"):
         if stack:
-            start = stack.pop()
-            spans.append((start, m.start()))  # mutable ends *before* END line
+            spans.append((stack.pop(), start))  # mutable ends *before* END line
     return spans
 
 
@@ -33,12 +73,125 @@ def _inside(span: tuple[int, int], ranges: list[tuple[int, int]]) -> bool:
     return any(span[0] >= a and span[1] <= b for a, b in ranges)
 
 
+def _splice(
+    text: str, ranges: list[tuple[int, int]], start: int, end: int, replacement: str
+) -> tuple[str, list[tuple[int, int]]]:
+    """
+    Replace text[start:end] and carry the mutable ranges over to the result.
+    Ranges behind the edit are shifted; the text is only rescanned if the edit
+    touches an EVOLVE marker or a range boundary, where a marker could match
+    differently afterwards.
+    """
+    new_text = text[:start] + replacement + text[end:]
+    reach = _MARKER_REACH
+    new_end = start + len(replacement)
+    if (
+        _MARKER in text[max(0, start - reach) : end + reach]
+        or _MARKER in new_text[max(0, start - reach) : new_end + reach]
+    ):
+        return new_text, _mutable_ranges(new_text)
+    for a, b in ranges:
+        if start <= a <= end or start <= b <= end:
+            return new_text, _mutable_ranges(new_text)
+        if b > end and _MARKER_GAP.match(text, end).end() >= b:
+            return new_text, _mutable_ranges(new_text)
+    delta = new_end - end
+    shifted = [
+        (a + delta if a > end else a, b + delta if b > end else b)
+        for a, b in ranges
+    ]
+    return new_text, shifted
+
+
+class _LineIndex:
+    """
+    Lines of a text and a hash index from stripped line content to line
+    numbers. Edits update only the lines they touch; line numbers in the
+    hash index are shifted lazily when they are looked up.
+    """
+
+    def __init__(self, text: str):
+        self._build(text)
+
+    def _build(self, text: str) -> None:
+        self.text = text
+        self.lines = text.split("\n")
+        self._starts: Optional[List[int]] = None
+        # Edits as (first line, end line, line delta), in order
+        self._shifts: List[Tuple[int, int, int]] = []
+        # Stripped content -> (line number, number of edits it predates)
+        self.by_content: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, key in enumerate(map(str.strip, self.lines)):
+            if key:
+                self.by_content[key].append((i, 0))
+
+    def lookup(self, key: str) -> List[int]:
+        """Line numbers (0-based) of the lines whose stripped content is key."""
+        found = set()
+        for line, epoch in self.by_content.get(key, ()):
+            for first, end, delta in self._shifts[epoch:]:
+                if line >= end:
+                    line += delta
+                elif line >= first:
+                    break  # rewritten by a later edit, re-indexed from there
+            else:
+                found.add(line)
+        return sorted(found)
+
+    def splice(self, start: int, end: int, replacement: str) -> None:
+        """Replace text[start:end] and re-index the lines it touches."""
+        text = self.text
+        first = text.count("\n", 0, start)
+        last = first + text.count("\n", start, end) + 1
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", end)
+        if line_end == -1:
+            line_end = len(text)
+        new_lines = (text[line_start:start] + replacement + text[end:line_end]).split(
+            "\n"
+        )
+        self.text = text[:start] + replacement + text[end:]
+        if len(self._shifts) >= _MAX_INDEX_SHIFTS:
+            self._build(self.text)
+            return
+        self.lines[first:last] = new_lines
+        self._starts = None
+        self._shifts.append((first, last, len(new_lines) - (last - first)))
+        epoch = len(self._shifts)
+        for i, line in enumerate(new_lines, first):
+            key = line.strip()
+            if key:
+                self.by_content[key].append((i, epoch))
+
+    @property
+    def starts(self) -> List[int]:
+        """Character position of the start of each line."""
+        if self._starts is None:
+            lengths = (len(line) + 1 for line in self.lines)
+            self._starts = [0, *itertools.accumulate(lengths)][:-1]
+        return self._starts
+
+    def position(self, line_num: int) -> int:
+        """Character position of the start of a line (1-based)."""
+        if line_num < 1 or line_num > len(self.lines):
+            return 0
+        return self.starts[line_num - 1]
+
+    def line_num(self, char_pos: int) -> int:
+        """Line number (1-based) of a character position."""
+        if char_pos < 0:
+            return 1
+        return bisect.bisect_right(self.starts, char_pos)
+
+
 def _strip_trailing_whitespace(text: str) -> str:
     """Strip trailing whitespace from each line in the text."""
     return "\n".join(line.rstrip() for line in text.splitlines())
 
 
-def _find_indented_match(search_text: str, original_text: str) -> tuple[str, int]:
+def _find_indented_match(
+    search_text: str, original_text: str, index: Optional[_LineIndex] = None
+) -> tuple[str, int]:
     """
     Try to find search_text in original_text, and if not found, try to find
     it with proper indentation. Returns (matched_text, position) or ("", -1).
@@ -52,7 +205,15 @@ def _find_indented_match(search_text: str, original_text: str) -> tuple[str, int
     if pos != -1:
         return search_text, pos
 
-    # If not found, try to find the first line with different indentation
+    if index is None:
+        index = _LineIndex(original_text)
+    return _find_reindented_match(search_text, original_text, index)
+
+
+def _find_reindented_match(
+    search_text: str, original_text: str, index: _LineIndex
+) -> tuple[str, int]:
+    """Find search_text re-indented like a line matching its first line."""
     search_lines = search_text.splitlines()
     if not search_lines:
         return "", -1
@@ -61,36 +222,37 @@ def _find_indented_match(search_text: str, original_text: str) -> tuple[str, int
     if not first_search_line:
         return "", -1
 
-    # Look for the first line in the original text
-    original_lines = original_text.splitlines()
-    for i, line in enumerate(original_lines):
-        if line.strip() == first_search_line:
-            # Found a potential match, get its indentation
-            line_indent = len(line) - len(line.lstrip())
-            indent_str = line[:line_indent]
-
-            # Apply this indentation to all lines in search_text
-            indented_search_lines = []
-            for j, search_line in enumerate(search_lines):
-                if j == 0:
-                    # First line: use the found indentation
-                    indented_search_lines.append(indent_str + search_line.strip())
-                else:
-                    # Other lines: preserve relative indentation
-                    search_line_indent = len(search_line) - len(search_line.lstrip())
-                    if search_line.strip():  # Non-empty line
-                        indented_search_lines.append(
-                            indent_str + " " * search_line_indent + search_line.strip()
-                        )
-                    else:  # Empty line
-                        indented_search_lines.append("")
-
-            indented_search = "\n".join(indented_search_lines)
-
-            # Check if this indented version exists in original
-            indented_pos = original_text.find(indented_search)
-            if indented_pos != -1:
-                return indented_search, indented_pos
+    # Candidate lines come from the index; each indentation is tried once
+    tried = set()
+    for i in index.lookup(first_search_line):
+        line = index.lines[i]
+        indent_str = line[: len(line) - len(line.lstrip())]
+        if indent_str in tried:
+            continue
+        tried.add(indent_str)
+
+        # Apply this indentation to all lines in search_text
+        indented_search_lines = []
+        for j, search_line in enumerate(search_lines):
+            if j == 0:
+                # First line: use the found indentation
+                indented_search_lines.append(indent_str + search_line.strip())
+            else:
+                # Other lines: preserve relative indentation
+                search_line_indent = len(search_line) - len(search_line.lstrip())
+                if search_line.strip():  # Non-empty line
+                    indented_search_lines.append(
+                        indent_str + " " * search_line_indent + search_line.strip()
+                    )
+                else:  # Empty line
+                    indented_search_lines.append("")
+
+        indented_search = "\n".join(indented_search_lines)
+
+        # Check if this indented version exists in original
+        indented_pos = original_text.find(indented_search)
+        if indented_pos != -1:
+            return indented_search, indented_pos
 
     return "", -1
 
@@ -158,61 +320,116 @@ class PatchError(RuntimeError):
 
 
 def _find_similar_lines(
-    search_line: str, original_text: str, max_suggestions: int = 3
+    search_line: str,
+    original_text: str,
+    max_suggestions: int = 3,
+    index: Optional[_LineIndex] = None,
 ) -> List[Tuple[str, int]]:
     """Find similar lines in the original text for suggestions."""
-    import difflib
-
     search_line_clean = search_line.strip()
     if not search_line_clean:
         return []
 
-    original_lines = original_text.splitlines()
-    similarities = []
+    if index is None:
+        index = _LineIndex(original_text)
 
-    for i, line in enumerate(original_lines):
-        line_clean = line.strip()
-        if not line_clean:
+    # Upper bounds of each distinct line's ratio (as in quick_ratio), so that
+    # the full ratio is only computed for lines that can still make the top
+    search_counts = Counter(search_line_clean)
+    bounds = []
+    for line_clean in index.by_content:
+        total = len(search_line_clean) + len(line_clean)
+        if 2.0 * min(len(search_line_clean), len(line_clean)) / total <= 0.6:
             continue
+        common = sum(min(n, line_clean.count(c)) for c, n in search_counts.items())
+        if 2.0 * common / total > 0.6:
+            bounds.append((2.0 * common / total, line_clean))
+    bounds.sort(key=lambda x: -x[0])
 
+    similarities = []
+    top: List[float] = []  # min-heap of the best max_suggestions ratios
+    for bound, line_clean in bounds:
+        if len(top) >= max_suggestions and bound < top[0]:
+            break
         # Calculate similarity ratio
         ratio = difflib.SequenceMatcher(None, search_line_clean, line_clean).ratio()
         if ratio > 0.6:  # Only suggest lines with >60% similarity
-            similarities.append((line, i + 1, ratio))
-
-    # Sort by similarity and return top suggestions
-    similarities.sort(key=lambda x: x[2], reverse=True)
+            for i in index.lookup(line_clean):
+                similarities.append((index.lines[i], i + 1, ratio))
+                heapq.heappush(top, ratio)
+                if len(top) > max_suggestions:
+                    heapq.heappop(top)
+
+    # Sort by similarity (then position) and return top suggestions
+    similarities.sort(key=lambda x: (-x[2], x[1]))
     return [(line, line_num) for line, line_num, _ in similarities[:max_suggestions]]
 
 
 def _find_best_match_with_diff(
-    search_text: str, original_text: str
+    search_text: str,
+    original_text: str,
+    index: Optional[_LineIndex] = None,
+    similar_lines: Optional[List[Tuple[str, int]]] = None,
 ) -> Optional[Tuple[str, int, List[str]]]:
-    """Find the best matching block and return a diff comparison."""
-    import difflib
-
+    """
+    Find the best matching block and return a diff comparison. Only windows
+    anchored on lines shared with the search block (ignoring indentation) and
+    their direct neighbors are scored, or, if there are no shared lines,
+    windows starting at lines similar to its first line.
+    """
     search_lines = search_text.strip().splitlines()
     if not search_lines:
         return None
 
-    original_lines = original_text.splitlines()
+    if index is None:
+        index = _LineIndex(original_text)
+    original_lines = index.lines
     search_len = len(search_lines)
+    last_start = len(original_lines) - search_len
+
+    # Window start -> number of search lines found verbatim at their offset
+    anchors: Dict[int, int] = {}
+    for j, search_line in enumerate(search_lines):
+        for i in index.lookup(search_line.strip()):
+            if 0 <= i - j <= last_start:
+                anchors[i - j] = anchors.get(i - j, 0) + 1
+    if not anchors:
+        if similar_lines is None:
+            similar_lines = _find_similar_lines(
+                search_lines[0], original_text, _MAX_FUZZY_WINDOWS, index
+            )
+        for _, line_num in similar_lines:
+            if line_num - 1 <= last_start:
+                anchors[line_num - 1] = 1
+    best_anchored = sorted(anchors, key=lambda s: -anchors[s])[:_MAX_FUZZY_WINDOWS]
+    # Neighboring windows tolerate a line missing from or added to the block
+    candidates = {
+        s + shift
+        for s in best_anchored
+        for shift in (-1, 0, 1)
+        if 0 <= s + shift <= last_start
+    }
 
     best_match = None
-    best_ratio = 0.0
+    best_ratio = 0.7  # Require >70% similarity
     best_start_line = 0
+    search_block = "\n".join(search_lines)
 
     # Look for the best matching block of the same length
-    for i in range(len(original_lines) - search_len + 1):
+    for i in sorted(candidates):
         candidate_lines = original_lines[i : i + search_len]
 
         # Calculate similarity for the entire block
         candidate_text = "\n".join(candidate_lines)
-        search_block = "\n".join(search_lines)
-
-        ratio = difflib.SequenceMatcher(None, search_block, candidate_text).ratio()
+        matcher = difflib.SequenceMatcher(None, search_block, candidate_text)
+        if (
+            matcher.real_quick_ratio() <= best_ratio
+            or matcher.quick_ratio() <= best_ratio
+        ):
+            continue
+        ratio = matcher.ratio()
 
-        if ratio > best_ratio and ratio > 0.7:  # Require >70% similarity
+        if ratio > best_ratio:
             best_ratio = ratio
             best_match = candidate_lines
             best_start_line = i + 1
@@ -272,35 +489,11 @@ def _get_context_lines(
     return context, start_line + 1
 
 
-def _get_line_position(text: str, line_num: int) -> int:
-    """Get character position of the start of a specific line number (1-based)."""
-    lines = text.splitlines(keepends=True)
-    if line_num < 1 or line_num > len(lines):
-        return 0
-
-    char_pos = 0
-    for i in range(line_num - 1):
-        char_pos += len(lines[i])
-    return char_pos
-
-
-def _char_to_line_num(text: str, char_pos: int) -> int:
-    """Convert character position to line number (1-based)."""
-    if char_pos < 0:
-        return 1
-
-    lines = text.splitlines(keepends=True)
-    current_pos = 0
-    for i, line in enumerate(lines):
-        if current_pos + len(line) > char_pos:
-            return i + 1
-        current_pos += len(line)
-
-    return len(lines) if lines else 1
-
-
 def _create_search_not_found_error(
-    search_text: str, original_text: str, mutable_ranges: List[Tuple[int, int]]
+    search_text: str,
+    original_text: str,
+    mutable_ranges: List[Tuple[int, int]],
+    index: Optional[_LineIndex] = None,
 ) -> str:
     """Create a detailed error message when search text is not found."""
     search_lines = search_text.strip().splitlines()
@@ -308,9 +501,14 @@ def _create_search_not_found_error(
         return "Empty search text provided"
 
     first_line = search_lines[0].strip()
+    if index is None:
+        index = _LineIndex(original_text)
 
-    # Find similar lines for suggestions
-    similar_lines = _find_similar_lines(first_line, original_text)
+    # Find similar lines for suggestions (and fuzzy matching below)
+    similar_candidates = _find_similar_lines(
+        first_line, original_text, _MAX_FUZZY_WINDOWS, index
+    )
+    similar_lines = similar_candidates[:3]
 
     error_parts = [
         "SEARCH text not found in editable regions",
@@ -340,13 +538,15 @@ def _create_search_not_found_error(
         )
 
     # Try to find the best matching block and show a diff
-    best_match_result = _find_best_match_with_diff(search_text, original_text)
+    best_match_result = _find_best_match_with_diff(
+        search_text, original_text, index, similar_candidates
+    )
 
     if best_match_result:
         best_match, start_line, diff_lines = best_match_result
 
         # Check if the match is in an editable region
-        match_start_pos = _get_line_position(original_text, start_line)
+        match_start_pos = index.position(start_line)
         match_text = "\n".join(best_match)
         match_span = (match_start_pos, match_start_pos + len(match_text))
         in_editable = _inside(match_span, mutable_ranges)
@@ -387,7 +587,7 @@ def _create_search_not_found_error(
         )
         for line, line_num in similar_lines:
             # Show if it's in an editable region or not
-            line_pos = _get_line_position(original_text, line_num)
+            line_pos = index.position(line_num)
             span = (line_pos, line_pos + len(line))
             in_editable = _inside(span, mutable_ranges)
             region_status = "✓ editable" if in_editable else "✗ immutable"
@@ -404,8 +604,8 @@ def _create_search_not_found_error(
         )
         for i, (start, end) in enumerate(mutable_ranges[:2]):  # Show max 2 regions
             # Convert char positions to line numbers for display
-            start_line = _char_to_line_num(original_text, start)
-            end_line = _char_to_line_num(original_text, end)
+            start_line = index.line_num(start)
+            end_line = index.line_num(end)
 
             error_parts.append(f"  Region {i + 1} (lines {start_line}-{end_line}):")
 
@@ -568,11 +768,14 @@ def apply_search_replace(
 ) -> tuple[str, int]:
     """
     Apply SEARCH/REPLACE blocks but **only** inside EVOLVE regions.
-    Mutable ranges are recalculated after each replacement to account for
-    text changes.
+    Mutable ranges are scanned once and shifted after each replacement to
+    account for text changes. Blocks without an exact match are looked up
+    in a line index of the text, built on first use and updated by each edit.
     """
     new_text = original
     num_applied = 0
+    mutable = _mutable_ranges(new_text)
+    index: Optional[_LineIndex] = None
     for block in PATCH_PATTERN.finditer(patch_text):
         search, replace = block.group(1), block.group(2)
         # Clean EVOLVE markers from search and replace text if present
@@ -583,9 +786,6 @@ def apply_search_replace(
         search = _strip_trailing_whitespace(search)
         replace = _strip_trailing_whitespace(replace)
 
-        # Recalculate mutable ranges based on current text state
-        mutable = _mutable_ranges(new_text)
-
         # ── insertions ───────────────────────────────────────────────────────
         if not search.strip():  # empty SEARCH  → insertion
             # Safe strategy: append inside the final mutable span.
@@ -593,17 +793,23 @@ def apply_search_replace(
                 msg = _create_no_evolve_block_error(new_text, "insertion")
                 raise PatchError(msg)
             a, b = mutable[-1]
-            new_text = new_text[:b] + replace + new_text[b:]
+            new_text, mutable = _splice(new_text, mutable, b, b, replace)
+            if index is not None:
+                index.splice(b, b, replace)
             num_applied += 1
             continue
 
         # ── replacements ────────────────────────────────────────────────────
         # Try to find the search text, with indentation correction if needed
-        matched_search, pos = _find_indented_match(search, new_text)
+        matched_search, pos = search, new_text.find(search)
+        if pos == -1:
+            if index is None:
+                index = _LineIndex(new_text)
+            matched_search, pos = _find_reindented_match(search, new_text, index)
 
         if pos == -1:
             if strict:
-                msg = _create_search_not_found_error(search, new_text, mutable)
+                msg = _create_search_not_found_error(search, new_text, mutable, index)
                 raise PatchError(msg)
             continue
 
@@ -623,20 +829,22 @@ def apply_search_replace(
                 replace = _apply_indentation_to_replace(replace, indent_str)
                 logger.debug("Applied indentation correction to search/replace block")
 
-        new_text = new_text.replace(matched_search, replace, 1)
+        # pos is the first occurrence, as with str.replace(..., 1)
+        new_text, mutable = _splice(new_text, mutable, span[0], span[1], replace)
+        if index is not None:
+            index.splice(span[0], span[1], replace)
         num_applied += 1
     return new_text, num_applied
 
 
-def write_git_diff(
+def make_git_diff(
     original: str,
     updated: str,
     filename: str,
-    out_path: Union[str, Path],
-    context: int = 9999,
-) -> Path:
+    context: int = 3,
+) -> str:
     """
-    Save a unified-diff (Git patch) of *filename* to *out_path*.
+    Unified diff (Git patch) of *filename* as a string.
 
     Parameters
     ----------
@@ -646,8 +854,6 @@ def write_git_diff(
         Post-patch file contents.
     filename : str
         Path shown inside the diff headers.
-    out_path : Union[str, Path]
-        Where to write the `.patch` file.
     context : int, default 3
         Number of unchanged context lines to include (-U).
     """
@@ -658,11 +864,71 @@ def write_git_diff(
         tofile=f"b/{filename}",
         n=context,
     )
+    return "".join(patch_lines)
+
+
+def write_git_diff(
+    original: str,
+    updated: str,
+    filename: str,
+    out_path: Union[str, Path],
+    context: int = 3,
+) -> Path:
+    """
+    Save a unified-diff (Git patch) of *filename* to *out_path*.
+
+    Parameters
+    ----------
+    original : str
+        Pre-patch file contents.
+    updated : str
+        Post-patch file contents.
+    filename : str
+        Path shown inside the diff headers.
+    out_path : Union[str, Path]
+        Where to write the `.patch` file.
+    context : int, default 3
+        Number of unchanged context lines to include (-U).
+    """
     out_path = Path(out_path)
-    out_path.write_text("".join(patch_lines), encoding="utf-8")
+    out_path.write_text(
+        make_git_diff(original, updated, filename, context=context), encoding="utf-8"
+    )
     return out_path
 
 
+def write_patch_artifacts(
+    patch_dir: Path,
+    original: str,
+    updated: str,
+    suffix: str,
+    patch_txt: str,
+    artifacts: str = "all",
+) -> tuple[Path, Optional[Path]]:
+    """
+    Write the patched program and, with the "all" artifact policy, the
+    original backup and `edit.diff` to *patch_dir*. Returns the path of the
+    patched program and of the diff (None if it was not written).
+    """
+    if artifacts not in PATCH_ARTIFACTS:
+        raise ValueError(
+            f"Unknown patch artifact policy '{artifacts}'. Choose from "
+            f"{PATCH_ARTIFACTS}"
+        )
+    # Write the updated file
+    output_path = patch_dir / f"main{suffix}"
+    output_path.write_text(updated, "utf-8")
+    if artifacts != "all":
+        return output_path, None
+
+    # Store the original string as a backup file
+    backup_path = patch_dir / f"original{suffix}"
+    backup_path.write_text(original, "utf-8")
+    diff_path = patch_dir / "edit.diff"
+    diff_path.write_text(patch_txt, "utf-8")
+    return output_path, diff_path
+
+
 def apply_diff_patch(
     patch_str: str,
     original_str: Optional[str] = None,
@@ -670,12 +936,15 @@ def apply_diff_patch(
     original_path: Optional[Union[str, Path]] = None,
     language: str = "python",
     verbose: bool = True,
+    diff_context: int = 3,
+    artifacts: str = "all",
 ) -> tuple[str, int, Optional[Path], Optional[str], Optional[str], Optional[Path]]:
     """
     Apply SEARCH/REPLACE blocks to old string and optionally emit a `.patch`.
     Returns the updated string, number of patches applied, path to the new
-    file (if patch_dir is specified), and an error message string if an
-    error occurred (otherwise None).
+    file (if patch_dir is specified), an error message string if an error
+    occurred (otherwise None), the diff text with `diff_context` lines of
+    context and the path of `edit.diff` (if written, see PATCH_ARTIFACTS).
     """
     if original_str is None and original_path is None:
         raise ValueError("Either original_str or original_path must be provided")
@@ -710,9 +979,10 @@ def apply_diff_patch(
     if patch_dir is not None:
         patch_dir = Path(patch_dir)
         patch_dir.mkdir(parents=True, exist_ok=True)
-        # Store the raw search/replace blocks
-        patch_path = patch_dir / "search_replace.txt"
-        patch_path.write_text(patch_str, "utf-8")
+        if artifacts == "all":
+            # Store the raw search/replace blocks
+            patch_path = patch_dir / "search_replace.txt"
+            patch_path.write_text(patch_str, "utf-8")
 
     try:
         # Apply the patch
@@ -739,35 +1009,24 @@ def apply_diff_patch(
     else:
         raise ValueError(f"Language {language} not supported")
 
-    # If successful, proceed to write files if patch_dir is specified
+    # The diff is kept in memory; it is only written out as an artifact
+    patch_txt = make_git_diff(
+        original, updated_content, filename=f"original{suffix}", context=diff_context
+    )
+    diff_path = None
     if patch_dir is not None:
-        # Store the original string as a backup file
-        backup_path = patch_dir / f"original{suffix}"
-        backup_path.write_text(original, "utf-8")
-
-        # Write the updated file
-        output_path = patch_dir / f"main{suffix}"
-        output_path.write_text(updated_content, "utf-8")
-
-        # Write the git diff if requested
-        write_git_diff(
-            original,
-            updated_content,
-            filename=backup_path.name,
-            out_path=patch_dir / "edit.diff",
+        output_path, diff_path = write_patch_artifacts(
+            patch_dir, original, updated_content, suffix, patch_txt, artifacts
         )
-        patch_txt = (patch_dir / "edit.diff").read_text("utf-8")
-        # Print the patch file
-        if verbose:
-            logger.debug(f"Patch file written to: {patch_dir / 'edit.diff'}")
-            logger.debug(f"Patch file content:\n{patch_txt}")
-        return (
-            updated_content,
-            num_applied,
-            output_path,
-            error_message,
-            patch_txt,
-            patch_dir / "edit.diff",
-        )
-    else:
-        return (updated_content, num_applied, None, error_message, None, None)
+        if verbose and diff_path is not None:
+            logger.debug(f"Patch file written to: {diff_path}")
+    if verbose:
+        logger.debug(f"Patch file content:\n{patch_txt}")
+    return (
+        updated_content,
+        num_applied,
+        output_path,
+        error_message,
+        patch_txt,
+        diff_path,
+    )
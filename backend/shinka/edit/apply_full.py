@@ -1,6 +1,12 @@
 from pathlib import Path
 from typing import Optional, Union
-from .apply_diff import write_git_diff, _mutable_ranges, EVOLVE_START, EVOLVE_END
+from .apply_diff import (
+    make_git_diff,
+    write_patch_artifacts,
+    _mutable_ranges,
+    EVOLVE_START,
+    EVOLVE_END,
+)
 from shinka.llm import extract_between
 import logging
 
@@ -14,6 +20,8 @@ def apply_full_patch(
     original_path: Optional[Union[str, Path]] = None,
     language: str = "python",
     verbose: bool = True,
+    diff_context: int = 3,
+    artifacts: str = "all",
 ) -> tuple[str, int, Optional[Path], Optional[str], Optional[str], Optional[Path]]:
     if original_str is None and original_path is None:
         raise ValueError("Either original_str or original_path must be provided")
@@ -53,9 +61,10 @@ def apply_full_patch(
     if patch_dir is not None:
         patch_dir = Path(patch_dir)
         patch_dir.mkdir(parents=True, exist_ok=True)
-        # Store the raw patch content
-        patch_path = patch_dir / "rewrite.txt"
-        patch_path.write_text(patch_code, "utf-8")
+        if artifacts == "all":
+            # Store the raw patch content
+            patch_path = patch_dir / "rewrite.txt"
+            patch_path.write_text(patch_code, "utf-8")
 
     try:
         # Get mutable ranges from original content
@@ -271,36 +280,24 @@ def apply_full_patch(
     else:
         raise ValueError(f"Language {language} not supported")
 
-    # If successful, proceed to write files if patch_dir is specified
+    # The diff is kept in memory; it is only written out as an artifact
+    patch_txt = make_git_diff(
+        original, updated_content, filename=f"original{suffix}", context=diff_context
+    )
+    diff_path = None
     if patch_dir is not None:
-        # Store the original string as a backup file
-        backup_path = patch_dir / f"original{suffix}"
-        backup_path.write_text(original, "utf-8")
-
-        # Write the updated file
-        output_path = patch_dir / f"main{suffix}"
-        output_path.write_text(updated_content, "utf-8")
-
-        # Write the git diff if requested
-        diff_path = patch_dir / "edit.diff"
-        write_git_diff(
-            original,
-            updated_content,
-            filename=backup_path.name,
-            out_path=diff_path,
+        output_path, diff_path = write_patch_artifacts(
+            patch_dir, original, updated_content, suffix, patch_txt, artifacts
         )
-        patch_txt = diff_path.read_text("utf-8")
-        # Print the patch file
-        if verbose:
+        if verbose and diff_path is not None:
             logger.info(f"Patch file written to: {diff_path}")
-            logger.info(f"Patch file content:\n{patch_txt}")
-        return (
-            updated_content,
-            num_applied,
-            output_path,
-            error_message,
-            patch_txt,
-            diff_path,
-        )
-    else:
-        return updated_content, num_applied, None, error_message, None, None
+    if verbose:
+        logger.info(f"Patch file content:\n{patch_txt}")
+    return (
+        updated_content,
+        num_applied,
+        output_path,
+        error_message,
+        patch_txt,
+        diff_path,
+    )
@@ -25,6 +25,8 @@ async def apply_patch_async(
     language: str = "python",
     patch_type: str = "diff",
     verbose: bool = False,
+    diff_context: int = 3,
+    artifacts: str = "all",
 ) -> Tuple[
     Optional[str], int, Optional[str], Optional[str], Optional[str], Optional[Path]
 ]:
@@ -37,6 +39,8 @@ async def apply_patch_async(
         language: Programming language
         patch_type: Type of patch (diff, full, cross)
         verbose: Enable verbose logging
+        diff_context: Context lines of the returned diff
+        artifacts: Patch artifact policy (see PATCH_ARTIFACTS)
 
     Returns:
         Tuple of (modified_code, num_applied, output_path, error_msg, patch_txt, patch_path)
@@ -68,6 +72,8 @@ async def apply_patch_async(
                 patch_dir=patch_dir,
                 language=language,
                 verbose=verbose,
+                diff_context=diff_context,
+                artifacts=artifacts,
             ),
         )
 
@@ -296,14 +302,16 @@ async def copy_file_async(src_path: str, dst_path: str) -> bool:
 
 
 async def get_code_embedding_async(
-    exec_fname: str, embedding_client, max_chars: int = 10000
+    exec_fname: str, embedding_client
 ) -> Tuple[Optional[list], float]:
     """Async code embedding generation.
 
+    Long files are not truncated; the embedding client splits them into
+    chunks and pools the chunk embeddings (see `EmbeddingClient.chunk_chars`).
+
     Args:
         exec_fname: Path to code file
         embedding_client: Embedding client instance
-        max_chars: Maximum characters to embed
 
     Returns:
         Tuple of (embedding_vector, cost)
@@ -314,10 +322,6 @@ async def get_code_embedding_async(
         if not code_content:
             return None, 0.0
 
-        # Truncate if too long
-        if len(code_content) > max_chars:
-            code_content = code_content[:max_chars]
-
         # Generate embedding in thread pool
         loop = asyncio.get_event_loop()
 
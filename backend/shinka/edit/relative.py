@@ -0,0 +1,91 @@
+import difflib
+import re
+from typing import List, Optional
+from .apply_diff import PatchError
+
+CODE_ENCODINGS = ("full", "relative")
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def make_relative_diff(base: str, code: str, context: int = 2) -> str:
+    """Unified diff turning `base` into `code` (empty if identical)."""
+    diff = difflib.unified_diff(
+        base.splitlines(keepends=True),
+        code.splitlines(keepends=True),
+        fromfile="base",
+        tofile="program",
+        n=context,
+    )
+    lines = []
+    for line in diff:
+        if not line.endswith("\n"):
+            # Keep the diff line-based; apply_unified_diff restores the ending
+            line += "\n\\ No newline at end of file\n"
+        lines.append(line)
+    return "".join(lines)
+
+
+def apply_unified_diff(base: str, diff: str) -> str:
+    """Reconstruct the full text from `base` and a unified diff against it.
+
+    Context and removed lines must match `base` exactly, otherwise a
+    `PatchError` is raised.
+    """
+    if not diff.strip():
+        return base
+    base_lines = base.splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0
+    diff_lines = diff.splitlines(keepends=True)
+    i = 0
+    while i < len(diff_lines):
+        match = _HUNK_RE.match(diff_lines[i])
+        i += 1
+        if match is None:
+            continue  # file headers
+        start = int(match.group(1)) - (0 if match.group(2) == "0" else 1)
+        if start < pos or start > len(base_lines):
+            raise PatchError(f"Hunk at base line {start + 1} is out of order")
+        out.extend(base_lines[pos:start])
+        pos = start
+        prev_tag = ""
+        while i < len(diff_lines) and not diff_lines[i].startswith("@@"):
+            line = diff_lines[i]
+            i += 1
+            tag, text = line[:1], line[1:]
+            if tag == "\\":
+                # "No newline at end of file" refers to the previous line
+                if prev_tag == "+" and out and out[-1].endswith("\n"):
+                    out[-1] = out[-1][:-1]
+                continue
+            prev_tag = tag
+            if tag in (" ", "-"):
+                expected = base_lines[pos] if pos < len(base_lines) else None
+                if expected is None or expected.rstrip("\n") != text.rstrip("\n"):
+                    raise PatchError(f"Diff does not match the base at line {pos + 1}")
+                if tag == " ":
+                    out.append(expected)
+                pos += 1
+            elif tag == "+":
+                out.append(text)
+            else:
+                raise PatchError(f"Malformed diff line: {line!r}")
+    out.extend(base_lines[pos:])
+    return "".join(out)
+
+
+def encode_relative(base: str, code: str, context: int = 2) -> Optional[str]:
+    """Diff of `code` against `base` if it is smaller and round-trips.
+
+    Returns None when the full text should be sent instead.
+    """
+    diff = make_relative_diff(base, code, context=context)
+    if len(diff) >= len(code):
+        return None
+    try:
+        if apply_unified_diff(base, diff) != code:
+            return None
+    except PatchError:
+        return None
+    return diff
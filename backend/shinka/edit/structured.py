@@ -0,0 +1,259 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, Field, ValidationError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+PATCH_OUTPUT_MODES = ("text", "structured")
+
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER_MARKER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+
+# Near-miss markers: wrong number of chevrons, missing space, lowercase
+_SEARCH_LINE = re.compile(r"^\s*<{5,9}\s*search\s*$", re.IGNORECASE)
+_DIVIDER_LINE = re.compile(r"^\s*={5,9}\s*$")
+_REPLACE_LINE = re.compile(r"^\s*>{5,9}\s*replace\s*$", re.IGNORECASE)
+_FENCE_LINE = re.compile(r"^\s*```[\w+\-.]*\s*$")
+_FENCE_OPEN = re.compile(r"```([\w+\-.]*)[ \t]*\n")
+
+# Fence tags models commonly use instead of the configured language
+LANGUAGE_ALIASES = {
+    "python": ("py", "python3", "python"),
+    "cpp": ("c++", "cc", "cxx", "cpp"),
+    "cuda": ("cu", "cuda", "c++", "cpp"),
+    "rust": ("rs", "rust"),
+    "swift": ("swift",),
+    "json": ("json", "json5"),
+    "json5": ("json5", "json"),
+}
+
+
+class SearchReplaceEdit(BaseModel):
+    search: str = Field(description="Exact text to find, copied verbatim.")
+    replace: str = Field(description="Replacement text.")
+
+
+class DiffPatchOutput(BaseModel):
+    name: str = Field(description="Short snake_case name of the edit.")
+    description: str = Field(description="Description and rationale of the edit.")
+    edits: List[SearchReplaceEdit]
+
+
+class FullPatchOutput(BaseModel):
+    name: str = Field(description="Short snake_case name of the edit.")
+    description: str = Field(description="Description and rationale of the edit.")
+    code: str = Field(description="The complete rewritten file.")
+
+
+def patch_output_model(patch_type: str) -> Type[BaseModel]:
+    """Schema of a structured edit for the given patch type."""
+    if patch_type == "diff":
+        return DiffPatchOutput
+    if patch_type in ["full", "cross"]:
+        return FullPatchOutput
+    raise ValueError(f"No structured output schema for patch type {patch_type}")
+
+
+def patch_response_format(patch_type: str) -> Dict[str, Any]:
+    """`response_format` constraining the model to the edit schema.
+
+    Ollama (>= 0.5) turns the JSON schema into a sampling grammar, so the
+    response is always parseable JSON with the required fields.
+    """
+    model = patch_output_model(patch_type)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": model.model_json_schema(),
+            "strict": True,
+        },
+    }
+
+
+def _parse_json_object(content: str) -> Optional[dict]:
+    """Find the first JSON object in `content` (fenced or with extra text)."""
+    start = content.find("{")
+    while start != -1:
+        try:
+            obj, _ = json.JSONDecoder().raw_decode(content[start:])
+        except ValueError:
+            start = content.find("{", start + 1)
+            continue
+        return obj if isinstance(obj, dict) else None
+    return None
+
+
+def render_structured_patch(
+    output: BaseModel, language: str = "python"
+) -> str:
+    """Render a structured edit in the text format the patch appliers parse."""
+    parts = [
+        f"<NAME>\n{output.name.strip()}\n</NAME>",
+        f"<DESCRIPTION>\n{output.description.strip()}\n</DESCRIPTION>",
+    ]
+    if isinstance(output, DiffPatchOutput):
+        blocks = [
+            f"{SEARCH_MARKER}\n{e.search.rstrip(chr(10))}\n{DIVIDER_MARKER}\n"
+            f"{e.replace.rstrip(chr(10))}\n{REPLACE_MARKER}\n"
+            for e in output.edits
+        ]
+        parts.append("<DIFF>\n" + "\n".join(blocks) + "\n</DIFF>")
+    elif isinstance(output, FullPatchOutput):
+        code = _strip_fences(output.code)
+        parts.append(f"<CODE>\n```{language}\n{code.rstrip()}\n```\n</CODE>")
+    else:
+        raise ValueError(f"Unsupported structured output {type(output).__name__}")
+    return "\n\n".join(parts)
+
+
+def _strip_fences(code: str) -> str:
+    lines = code.strip("\n").splitlines()
+    if lines and _FENCE_LINE.match(lines[0]):
+        lines = lines[1:]
+    if lines and _FENCE_LINE.match(lines[-1]):
+        lines = lines[:-1]
+    return "\n".join(lines)
+
+
+def _repair_diff_text(content: str) -> Tuple[str, List[str]]:
+    """Normalize SEARCH/REPLACE markers and drop fences wrapping a block's
+    SEARCH or REPLACE text.
+
+    Only a fence right after a SEARCH / divider marker or right before a
+    divider / REPLACE marker is dropped; fences elsewhere may be part of the
+    program (e.g. markdown in a string). Line endings are kept.
+    """
+    repairs: List[str] = []
+    out: List[str] = []
+    state = None  # None | "search" | "replace"
+    after_marker = False  # Previous line opened a SEARCH or REPLACE section
+
+    def emit_marker(marker: str, ending: str = "\n") -> None:
+        if out and not out[-1].endswith(("\n", "\r")):
+            out[-1] += "\n"
+        out.append(marker + ending)
+
+    def closes_section(next_line: Optional[str]) -> bool:
+        if next_line is None:
+            return False
+        if state == "search":
+            return bool(_DIVIDER_LINE.match(next_line))
+        return bool(_REPLACE_LINE.match(next_line)) or next_line.strip().startswith(
+            "</DIFF>"
+        )
+
+    lines = content.splitlines(keepends=True)
+    for i, raw in enumerate(lines):
+        line = raw.rstrip("\r\n")
+        ending = raw[len(line) :]
+        stripped = line.strip()
+        if _SEARCH_LINE.match(line):
+            if state == "replace":
+                # Previous block was never closed
+                emit_marker(REPLACE_MARKER)
+                repairs.append("closed_block")
+            if stripped != SEARCH_MARKER:
+                repairs.append("search_marker")
+            emit_marker(SEARCH_MARKER, ending)
+            state = "search"
+            after_marker = True
+            continue
+        if state == "search" and _DIVIDER_LINE.match(line):
+            if stripped != DIVIDER_MARKER:
+                repairs.append("divider_marker")
+            emit_marker(DIVIDER_MARKER, ending)
+            state = "replace"
+            after_marker = True
+            continue
+        if state == "replace" and _REPLACE_LINE.match(line):
+            if stripped != REPLACE_MARKER:
+                repairs.append("replace_marker")
+            emit_marker(REPLACE_MARKER, ending)
+            state = None
+            after_marker = False
+            continue
+        if state == "replace" and stripped.startswith("</DIFF>"):
+            emit_marker(REPLACE_MARKER)
+            repairs.append("closed_block")
+            state = None
+        if state is not None and _FENCE_LINE.match(line):
+            next_line = lines[i + 1].rstrip("\r\n") if i + 1 < len(lines) else None
+            if after_marker or closes_section(next_line):
+                repairs.append("fence_in_block")
+                continue
+        after_marker = False
+        out.append(raw)
+    if state == "replace":
+        emit_marker(REPLACE_MARKER, "\n" if content.endswith("\n") else "")
+        repairs.append("closed_block")
+    return "".join(out), repairs
+
+
+def _repair_full_text(content: str, language: str) -> Tuple[str, List[str]]:
+    """Make sure the rewrite sits in a closed ```{language} fence."""
+    fence = f"```{language}"
+    aliases = LANGUAGE_ALIASES.get(language, (language,))
+    match = _FENCE_OPEN.search(content)
+    if match is not None:
+        tag = match.group(1)
+        if tag == language:
+            if content.count("```") % 2 == 0:
+                return content, []
+            return content.rstrip() + "\n```", ["closed_fence"]
+        if tag.lower() in aliases or tag == "":
+            repaired = content[: match.start()] + fence + "\n" + content[match.end() :]
+            if repaired.count("```") % 2 == 1:
+                repaired = repaired.rstrip() + "\n```"
+            return repaired, ["fence_language"]
+    code = re.search(r"<CODE>\s*(.*?)\s*(?:</CODE>|$)", content, re.DOTALL)
+    if code is not None and code.group(1).strip():
+        body = _strip_fences(code.group(1))
+        return (
+            content[: code.start()] + f"{fence}\n{body}\n```" + content[code.end() :],
+            ["code_tags"],
+        )
+    if "EVOLVE-BLOCK-START" in content and "```" not in content:
+        return f"{fence}\n{content.strip()}\n```", ["unfenced_code"]
+    return content, []
+
+
+def repair_patch_text(
+    content: str, patch_type: str, language: str = "python"
+) -> Tuple[str, List[str]]:
+    """Repair near-miss LLM edits locally instead of re-querying.
+
+    JSON edits (structured output mode, or models answering in JSON anyway)
+    are validated against the edit schema and rendered to the tagged text
+    format; text edits get their SEARCH/REPLACE markers or code fence fixed.
+    Returns the (possibly unchanged) text and the list of applied repairs.
+    """
+    repairs: List[str] = []
+    stripped = content.strip()
+    if stripped.startswith("{") or stripped.startswith("```json"):
+        data = _parse_json_object(stripped)
+        if data is not None:
+            try:
+                output = patch_output_model(patch_type).model_validate(data)
+            except ValidationError as e:
+                logger.debug(f"Structured edit failed schema validation: {e}")
+            else:
+                content = render_structured_patch(output, language)
+                repairs.append("structured")
+                if patch_type == "diff":
+                    # Drop fences models put inside the JSON strings
+                    content, fixed = _repair_diff_text(content)
+                    repairs.extend(fixed)
+                return content, repairs
+    if patch_type == "diff":
+        content, fixed = _repair_diff_text(content)
+    elif patch_type in ["full", "cross"]:
+        content, fixed = _repair_full_text(content, language)
+    else:
+        fixed = []
+    repairs.extend(fixed)
+    return content, repairs
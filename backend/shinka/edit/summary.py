@@ -6,10 +6,21 @@ logger = logging.getLogger(__name__)
 
 
 def summarize_diff(diff_file_path: str) -> dict:
-    summary = {}
     try:
         with open(diff_file_path, "r") as f:
-            patch = PatchSet(f)
+            diff_text = f.read()
+    except Exception as e:
+        logger.info(f"An unexpected error occurred while reading {diff_file_path}:")
+        logger.info(e)
+        return {}
+    return summarize_diff_text(diff_text, source=diff_file_path)
+
+
+def summarize_diff_text(diff_text: str, source: str = "diff") -> dict:
+    """Added/deleted/modified line counts per file of a unified diff."""
+    summary = {}
+    try:
+        patch = PatchSet(diff_text)
 
         for patched_file in patch:
             file_summary = {"added": 0, "deleted": 0, "modified": 0}
@@ -31,11 +42,11 @@ def summarize_diff(diff_file_path: str) -> dict:
 
             summary[patched_file.path] = file_summary
     except UnidiffParseError as e:
-        logger.info(f"Error parsing diff file {diff_file_path}:")
+        logger.info(f"Error parsing diff file {source}:")
         logger.info(e)
         # Return an empty summary or handle as per specific requirements
     except Exception as e:
-        logger.info(f"An unexpected error occurred while processing {diff_file_path}:")
+        logger.info(f"An unexpected error occurred while processing {source}:")
         logger.info(e)
         # Return an empty summary or handle as per specific requirements
 
@@ -0,0 +1,150 @@
+"""
+In-process checks of a patched program, run before it is submitted for
+evaluation. Validators are registered per language and never import or
+execute the program.
+"""
+
+import ast
+import logging
+from typing import Callable, Dict, List, Optional, Set
+from .apply_diff import EVOLVE_END, EVOLVE_START, _mutable_ranges
+
+logger = logging.getLogger(__name__)
+
+# (patched code, original code or None) -> problems found (empty if valid)
+Validator = Callable[[str, Optional[str]], List[str]]
+
+_VALIDATORS: Dict[str, List[Validator]] = {}
+
+
+def register_validator(language: str, validator: Optional[Validator] = None):
+    """Register a validator for `language` ("*" applies to all languages).
+
+    Can be used directly or as a decorator.
+    """
+
+    def register(fn: Validator) -> Validator:
+        _VALIDATORS.setdefault(language, []).append(fn)
+        return fn
+
+    if validator is not None:
+        return register(validator)
+    return register
+
+
+def validate_program(
+    code: str, language: str, original: Optional[str] = None
+) -> List[str]:
+    """Problems found by all validators registered for `language`."""
+    problems: List[str] = []
+    for validator in _VALIDATORS.get("*", []) + _VALIDATORS.get(language, []):
+        try:
+            problems.extend(validator(code, original))
+        except Exception as e:
+            # A broken validator must not reject the program
+            logger.warning(f"Validator {validator.__name__} failed: {e}")
+    return problems
+
+
+@register_validator("*")
+def check_evolve_markers(code: str, original: Optional[str] = None) -> List[str]:
+    """The patch must keep the EVOLVE-BLOCK markers of the original."""
+    starts = len(EVOLVE_START.findall(code))
+    ends = len(EVOLVE_END.findall(code))
+    if original is not None:
+        expected = (
+            len(EVOLVE_START.findall(original)),
+            len(EVOLVE_END.findall(original)),
+        )
+        if (starts, ends) != expected:
+            return [
+                f"EVOLVE-BLOCK markers changed: expected {expected[0]} START and "
+                f"{expected[1]} END markers, found {starts} and {ends}. Keep the "
+                "markers and the code outside of them unchanged."
+            ]
+    elif starts != ends:
+        return [f"Unbalanced EVOLVE-BLOCK markers: {starts} START, {ends} END."]
+    return []
+
+
+@register_validator("python")
+def check_python_syntax(code: str, original: Optional[str] = None) -> List[str]:
+    """Compile the program (parse plus symbol table checks)."""
+    try:
+        compile(code, "main.py", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        problem = f"{type(e).__name__}: {e.msg} (line {e.lineno})"
+        if e.text:
+            problem += f"\n    {e.text.rstrip()}"
+            if e.offset:
+                indent = len(e.text) - len(e.text.lstrip())
+                problem += "\n    " + " " * max(0, e.offset - 1 - indent) + "^"
+        return [problem]
+    except ValueError as e:  # e.g. null bytes
+        return [f"Invalid source: {e}"]
+    return []
+
+
+def _top_level_names(body: List[ast.stmt]) -> Set[str]:
+    """Names bound by module-level statements (including if/try bodies)."""
+    names: Set[str] = set()
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for sub in ast.walk(target):
+                    if isinstance(sub, ast.Name):
+                        names.add(sub.id)
+        elif isinstance(node, ast.If):
+            names |= _top_level_names(node.body) | _top_level_names(node.orelse)
+        elif isinstance(node, ast.Try):
+            names |= _top_level_names(node.body) | _top_level_names(node.orelse)
+            names |= _top_level_names(node.finalbody)
+            for handler in node.handlers:
+                names |= _top_level_names(handler.body)
+        elif isinstance(node, (ast.For, ast.While, ast.With)):
+            names |= _top_level_names(node.body)
+    return names
+
+
+@register_validator("python")
+def check_python_evolve_interface(
+    code: str, original: Optional[str] = None
+) -> List[str]:
+    """Names the fixed code uses from the EVOLVE blocks must still exist."""
+    if original is None:
+        return []
+    try:
+        original_tree = ast.parse(original)
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []  # reported by check_python_syntax
+    # EVOLVE blocks as (first, last) line numbers of their content
+    blocks = [
+        (original.count("\n", 0, a) + 1, original.count("\n", 0, b) + 1)
+        for a, b in _mutable_ranges(original)
+    ]
+
+    def in_block(node: ast.stmt) -> bool:
+        return any(first < node.lineno < last for first, last in blocks)
+
+    inside = [node for node in original_tree.body if in_block(node)]
+    outside = [node for node in original_tree.body if not in_block(node)]
+    used_outside = {
+        sub.id
+        for node in outside
+        for sub in ast.walk(node)
+        if isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load)
+    }
+    required = (_top_level_names(inside) - _top_level_names(outside)) & used_outside
+    missing = sorted(required - _top_level_names(tree.body))
+    return [
+        f"`{name}` is defined in the EVOLVE block and used by the code outside "
+        "it, but the patched program no longer defines it."
+        for name in missing
+    ]
@@ -1,12 +1,17 @@
 from .scheduler import JobScheduler, JobConfig
 from .scheduler import LocalJobConfig, SlurmDockerJobConfig, SlurmCondaJobConfig
+from .scheduler import LocalPoolJobConfig
 from .local import ProcessWithLogging
+from .pool import PoolJob, WorkerPool
 
 __all__ = [
     "JobScheduler",
     "JobConfig",
     "LocalJobConfig",
+    "LocalPoolJobConfig",
     "SlurmDockerJobConfig",
     "SlurmCondaJobConfig",
     "ProcessWithLogging",
+    "PoolJob",
+    "WorkerPool",
 ]
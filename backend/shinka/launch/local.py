@@ -1,27 +1,189 @@
+import selectors
 import subprocess
 import time
 import threading
 import os
 from pathlib import Path
-from typing import Optional, Tuple, TextIO
+from typing import Callable, Dict, List, Optional, Sequence, Set
 from shinka.utils import load_results, parse_time_to_seconds
+from .resources import usage_from_rusage
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# "pump": pipes are copied to the log files by one shared thread, and the
+# logs can be tailed while the job runs. "redirect": the job writes to its
+# log files directly; caps are applied once it finishes.
+LOG_MODES = ("pump", "redirect")
+
+
+def _truncation_note(max_bytes: int) -> bytes:
+    return f"\n[... log truncated at {max_bytes} bytes ...]\n".encode()
+
+
+def cap_log_file(path, max_bytes: Optional[int]) -> bool:
+    """Truncate a log file to `max_bytes`; returns whether it was truncated."""
+    if max_bytes is None:
+        return False
+    try:
+        if os.path.getsize(path) <= max_bytes:
+            return False
+        with open(path, "r+b") as f:
+            f.truncate(max_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(_truncation_note(max_bytes))
+        return True
+    except OSError as e:
+        logger.error(f"Could not cap log file {path}: {e}")
+        return False
+
+
+class _LogSink:
+    """One job pipe and the log file it is copied to (up to `max_bytes`)."""
+
+    def __init__(
+        self,
+        pipe,
+        path: Path,
+        max_bytes: Optional[int] = None,
+        verbose_prefix: Optional[str] = None,
+    ):
+        self.pipe = pipe
+        self.file = open(path, "wb")
+        self.max_bytes = max_bytes
+        self.verbose_prefix = verbose_prefix
+        self.written = 0
+        self.truncated = False
+        self.done = threading.Event()
+
+    def write(self, data: bytes):
+        if self.verbose_prefix:
+            text = data.decode("utf-8", errors="replace").rstrip()
+            logger.debug(f"{self.verbose_prefix}: {text}")
+        if self.truncated:
+            return  # Keep draining the pipe so the job never blocks
+        if self.max_bytes is not None and self.written + len(data) > self.max_bytes:
+            data = data[: self.max_bytes - self.written]
+            self.truncated = True
+            self.file.write(data + _truncation_note(self.max_bytes))
+        else:
+            self.file.write(data)
+        self.written += len(data)
+
+    def close(self):
+        for handle in (self.file, self.pipe):
+            try:
+                handle.close()
+            except Exception as e:
+                logger.error(f"Error closing log stream: {e}")
+        self.done.set()
+
+
+class LogPump:
+    """Copies the output pipes of all local jobs to their log files.
+
+    A single thread multiplexes every pipe with a selector and writes through
+    buffered files, which are flushed every `flush_interval` seconds instead of
+    after every line.
+    """
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pending: List[_LogSink] = []
+        self._thread: Optional[threading.Thread] = None
+        # Writing to this pipe wakes the thread up to register new sinks
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def add(self, sink: _LogSink):
+        with self._lock:
+            self._pending.append(sink)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="log-pump"
+                )
+                self._thread.start()
+        os.write(self._wake_w, b"\0")
+
+    def _run(self):
+        dirty: Set[_LogSink] = set()
+        last_flush = time.monotonic()
+        while True:
+            timeout = None
+            if dirty:
+                timeout = max(0.0, last_flush + self.flush_interval - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    self._register_pending()
+                    continue
+                sink: _LogSink = key.data
+                try:
+                    chunk = os.read(key.fd, 65536)
+                except OSError:
+                    chunk = b""
+                try:
+                    if chunk:
+                        sink.write(chunk)
+                        dirty.add(sink)
+                        continue
+                except Exception as e:
+                    logger.error(f"Error writing job log: {e}")
+                # EOF (or a broken log): the job closed its end of the pipe
+                self._selector.unregister(key.fd)
+                dirty.discard(sink)
+                sink.close()
+            if dirty and time.monotonic() - last_flush >= self.flush_interval:
+                for sink in dirty:
+                    try:
+                        sink.file.flush()
+                    except Exception as e:
+                        logger.error(f"Error flushing job log: {e}")
+                dirty.clear()
+                last_flush = time.monotonic()
+
+    def _register_pending(self):
+        os.read(self._wake_r, 4096)
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for sink in pending:
+            self._selector.register(sink.pipe.fileno(), selectors.EVENT_READ, sink)
+
+
+_log_pump: Optional[LogPump] = None
+_log_pump_lock = threading.Lock()
+
+
+def get_log_pump() -> LogPump:
+    """The log pump shared by all local jobs of this process."""
+    global _log_pump
+    with _log_pump_lock:
+        if _log_pump is None:
+            _log_pump = LogPump()
+        return _log_pump
+
+
 class ProcessWithLogging:
     """Wrapper for subprocess.Popen with real-time logging capabilities."""
 
     def __init__(
         self,
         process: subprocess.Popen,
-        log_files: Tuple[TextIO, TextIO],
-        log_threads: Tuple[threading.Thread, threading.Thread],
+        log_sinks: Sequence[_LogSink] = (),
+        log_paths: Sequence[Path] = (),
+        max_log_bytes: Optional[int] = None,
+        on_exit: Optional[Callable[[], None]] = None,
     ):
         self.process = process
-        self.log_files = log_files
-        self.log_threads = log_threads
+        self.log_sinks = log_sinks
+        self.log_paths = log_paths
+        self.max_log_bytes = max_log_bytes
+        # Called once when the process has exited (e.g. to free its cores)
+        self.on_exit = on_exit
+        # Peak RSS and CPU time, from wait4() when this wrapper reaps the job
+        self.resource_usage: Optional[Dict[str, float]] = None
 
     def __getattr__(self, name):
         """Delegate attribute access to the wrapped process."""
@@ -35,43 +197,67 @@ class ProcessWithLogging:
         """Return a detailed string representation."""
         return f"ProcessWithLogging(PID: {self.process.pid}, returncode: {self.process.returncode})"
 
-    def cleanup_logging(self):
-        """Clean up logging threads and files."""
-        # Wait for logging threads to finish
-        for thread in self.log_threads:
-            thread.join(timeout=1.0)
-
-        # Close log files
-        for file_handle in self.log_files:
-            try:
-                file_handle.close()
-            except Exception as e:
-                logger.error(f"Error closing log file: {e}")
-
+    def poll(self) -> Optional[int]:
+        if self.process.returncode is None:
+            self._reap(os.WNOHANG)
+        if self.process.returncode is not None:
+            self._exited()
+        return self.process.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while self.poll() is None:
+                if time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(self.process.args, timeout)
+                time.sleep(0.05)
+        elif self.process.returncode is None:
+            self._reap(0)
+        self._exited()
+        return self.process.returncode
+
+    def _reap(self, flags: int):
+        """Reap the process with wait4() to also get its resource usage."""
+        try:
+            pid, status, rusage = os.wait4(self.process.pid, flags)
+        except ChildProcessError:
+            # Already reaped (e.g. by Popen itself): no usage available
+            self.process.poll()
+            return
+        if pid == 0:
+            return
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        self.resource_usage = usage_from_rusage(rusage)
+
+    def _exited(self):
+        if self.on_exit is not None:
+            on_exit, self.on_exit = self.on_exit, None
+            on_exit()
 
-def _stream_output(pipe, file_handle, verbose_prefix=None):
-    """
-    Read from a pipe and write to a file handle in real-time.
-
-    Args:
-        pipe: The subprocess pipe to read from
-        file_handle: The file handle to write to
-        verbose_prefix: Optional prefix for verbose logging
-    """
-    try:
-        for line in iter(pipe.readline, ""):
-            if line:
-                file_handle.write(line)
-                file_handle.flush()  # Force immediate write to disk
-                if verbose_prefix:
-                    logger.debug(f"{verbose_prefix}: {line.strip()}")
-    except Exception as e:
-        logger.error(f"Error in stream output thread: {e}")
-    finally:
-        pipe.close()
-
-
-def submit(log_dir: str, cmd: list[str], verbose: bool = False):
+    def cleanup_logging(self):
+        """Wait for the job's logs to be written out, then apply size caps."""
+        for sink in self.log_sinks:
+            # The pump closes the log at EOF; a child that inherited the pipe
+            # can keep it open, so make sure the output so far is on disk
+            if not sink.done.wait(timeout=1.0):
+                try:
+                    sink.file.flush()
+                except Exception as e:
+                    logger.error(f"Error flushing log file: {e}")
+        if not self.log_sinks:
+            for path in self.log_paths:
+                cap_log_file(path, self.max_log_bytes)
+
+
+def submit(
+    log_dir: str,
+    cmd: list[str],
+    verbose: bool = False,
+    log_mode: str = "pump",
+    max_log_bytes: Optional[int] = None,
+    preexec_fn: Optional[Callable[[], None]] = None,
+    on_exit: Optional[Callable[[], None]] = None,
+):
     """
     Submits a command for local execution with real-time logging.
 
@@ -79,10 +265,16 @@ def submit(log_dir: str, cmd: list[str], verbose: bool = False):
         log_dir: The directory to store logs.
         cmd: The command and its arguments as a list of strings.
         verbose: Whether to enable verbose logging.
+        log_mode: "pump" or "redirect" (see `LOG_MODES`).
+        max_log_bytes: Optional size cap of each log file.
+        preexec_fn: Optional setup run in the child (see `limit_process`).
+        on_exit: Optional callback run once the process has exited.
 
     Returns:
         ProcessWithLogging: Wrapper containing the Popen object and logging.
     """
+    if log_mode not in LOG_MODES:
+        raise ValueError(f"Unknown log mode '{log_mode}'. Choose from {LOG_MODES}")
     log_dir_path = Path(log_dir)
     log_dir_path.mkdir(parents=True, exist_ok=True)
 
@@ -94,40 +286,45 @@ def submit(log_dir: str, cmd: list[str], verbose: bool = False):
     env["PYTHONUNBUFFERED"] = "1"  # Force Python to be unbuffered
     env["PYTHONIOENCODING"] = "utf-8"  # Ensure proper encoding
 
-    # Use PIPE to capture output and redirect to files in real-time
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,  # Line buffered
-        universal_newlines=True,
-        env=env,
-    )
-
-    # Open log files for writing with line buffering
-    stdout_file = open(stdout_path, "w", buffering=1)
-    stderr_file = open(stderr_path, "w", buffering=1)
-
-    # Start threads to stream output to files in real-time
-    stdout_thread = threading.Thread(
-        target=_stream_output,
-        args=(process.stdout, stdout_file, "STDOUT" if verbose else None),
-        daemon=True,
-    )
-    stderr_thread = threading.Thread(
-        target=_stream_output,
-        args=(process.stderr, stderr_file, "STDERR" if verbose else None),
-        daemon=True,
-    )
-
-    stdout_thread.start()
-    stderr_thread.start()
-
-    # Create wrapper with logging capabilities
-    wrapped_process = ProcessWithLogging(
-        process, (stdout_file, stderr_file), (stdout_thread, stderr_thread)
-    )
+    if log_mode == "redirect":
+        with open(stdout_path, "wb") as stdout_file, open(
+            stderr_path, "wb"
+        ) as stderr_file:
+            process = subprocess.Popen(
+                cmd,
+                stdout=stdout_file,
+                stderr=stderr_file,
+                env=env,
+                preexec_fn=preexec_fn,
+            )
+        wrapped_process = ProcessWithLogging(
+            process,
+            log_paths=(stdout_path, stderr_path),
+            max_log_bytes=max_log_bytes,
+            on_exit=on_exit,
+        )
+    else:
+        # Pipes are copied to the log files by the shared log pump
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            preexec_fn=preexec_fn,
+        )
+        sinks = tuple(
+            _LogSink(pipe, path, max_log_bytes, prefix if verbose else None)
+            for pipe, path, prefix in (
+                (process.stdout, stdout_path, "STDOUT"),
+                (process.stderr, stderr_path, "STDERR"),
+            )
+        )
+        pump = get_log_pump()
+        for sink in sinks:
+            pump.add(sink)
+        wrapped_process = ProcessWithLogging(
+            process, log_sinks=sinks, on_exit=on_exit
+        )
 
     if verbose:
         logger.info(f"Submitted local process with PID: {process.pid}")
@@ -0,0 +1,470 @@
+"""
+Warm evaluator pool for local jobs.
+
+Every worker is a long-lived interpreter (optionally inside a conda env) that
+imports the evaluation script once and then evaluates one candidate per
+request, so a job no longer pays for conda activation, Python startup and the
+evaluator's imports. Jobs keep the contract of `local.submit`: the evaluator
+writes its results to the job's results directory, and its output goes to
+job_log.out / job_log.err in the same directory.
+
+Workers and the pool talk over the worker's stdin/stdout, one JSON object per
+line. A worker that crashes or exceeds the job timeout is killed and replaced,
+and workers are recycled after `max_jobs_per_worker` jobs so that state leaked
+by evaluated programs does not pile up.
+"""
+
+import atexit
+import functools
+import importlib.util
+import json
+import os
+import queue
+import runpy
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+from .local import cap_log_file
+from .resources import ResourceManager, limit_process, process_usage
+
+logger = logging.getLogger(__name__)
+
+# Started with `python -c` so the worker module is not imported twice
+_WORKER_CODE = "from shinka.launch.pool import worker_main; worker_main()"
+
+
+class PoolJob:
+    """Handle of a job evaluated by a `WorkerPool`.
+
+    Mimics the parts of `subprocess.Popen` used by the scheduler (`pid`,
+    `returncode`, `poll`, `wait`, `kill`), so it can be tracked like a local
+    process.
+    """
+
+    def __init__(self, program_path: str, results_dir: str, args: List[str]):
+        self.program_path = program_path
+        self.results_dir = results_dir
+        self.args = args
+        self.pid: Optional[int] = None  # PID of the worker running the job
+        self.returncode: Optional[int] = None
+        # CPU time of the job and peak RSS of its worker so far
+        self.resource_usage: Optional[Dict[str, float]] = None
+        self.cancelled = False
+        self._worker: Optional["_Worker"] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def __str__(self):
+        return f"PoolJob(PID: {self.pid})"
+
+    def __repr__(self):
+        return f"PoolJob(PID: {self.pid}, returncode: {self.returncode})"
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        self._done.wait(timeout)
+        return self.returncode
+
+    def kill(self):
+        """Cancel a queued job, or kill the worker running it."""
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.cancelled = True
+            worker = self._worker
+        if worker is not None:
+            worker.kill()
+        else:
+            self._finish(-signal.SIGKILL)
+
+    def cleanup_logging(self):
+        """Nothing to clean up: the worker owns the job's log files."""
+
+    def _start(self, worker: "_Worker") -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._worker = worker
+            self.pid = worker.pid
+            return True
+
+    def _finish(self, returncode: int):
+        with self._lock:
+            self._worker = None
+            self.returncode = returncode
+        self._done.set()
+
+
+class _Worker:
+    """A worker process and its end of the line protocol."""
+
+    def __init__(
+        self,
+        cmd: List[str],
+        env: Dict[str, str],
+        preexec_fn: Optional[Callable[[], None]] = None,
+        on_exit: Optional[Callable[[], None]] = None,
+    ):
+        # Own process group: `conda run` does not forward signals to python
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            start_new_session=True,
+            preexec_fn=preexec_fn,
+        )
+        self.pid = self.process.pid
+        self.on_exit = on_exit
+        self.num_jobs = 0
+        self.exited = False  # stdout closed: the worker is gone
+        self._buffer = b""
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        try:
+            self.process.stdin.write(json.dumps(message).encode() + b"\n")
+            self.process.stdin.flush()
+            return True
+        except (BrokenPipeError, OSError):
+            return False
+
+    def read(self, timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Next message, or None on timeout or if the worker exited."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                self.exited = True
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def finish(self) -> int:
+        """Reap the (killed or exiting) worker and free its resources."""
+        returncode = self.process.wait()
+        if self.on_exit is not None:
+            on_exit, self.on_exit = self.on_exit, None
+            on_exit()
+        return returncode
+
+    def close(self):
+        """Let an idle worker exit (EOF on stdin), killing it if it hangs."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+        self.finish()
+
+
+class WorkerPool:
+    """Pool of warm evaluator processes serving jobs in submission order.
+
+    Args:
+        eval_program_path: Evaluation script; imported once per worker.
+        num_workers: Number of workers (and jobs evaluated in parallel).
+        conda_env: Optional conda env the workers run in.
+        timeout: Per-job timeout in seconds, counted from when a worker picks
+            the job up. None means no limit.
+        max_jobs_per_worker: Jobs after which a worker is replaced.
+        max_log_bytes: Optional size cap of each job log file.
+        resources: Optional manager handing out cores and memory; each worker
+            holds `cpus_per_worker` cores and `mem_bytes` while it lives.
+        cpus_per_worker: Cores each worker is pinned to (0: no pinning).
+        mem_bytes: Optional address-space cap (RLIMIT_AS) of each worker.
+        nice: Niceness of the workers.
+        verbose: Whether to log worker starts, crashes and recycling.
+    """
+
+    def __init__(
+        self,
+        eval_program_path: str,
+        num_workers: int = 2,
+        conda_env: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_jobs_per_worker: int = 50,
+        max_log_bytes: Optional[int] = None,
+        resources: Optional[ResourceManager] = None,
+        cpus_per_worker: int = 0,
+        mem_bytes: Optional[int] = None,
+        nice: int = 0,
+        verbose: bool = False,
+    ):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.eval_program_path = str(Path(eval_program_path).resolve())
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_log_bytes = max_log_bytes
+        self.resources = resources
+        self.cpus_per_worker = cpus_per_worker
+        self.mem_bytes = mem_bytes
+        self.nice = nice
+        self.verbose = verbose
+
+        self.cmd = ["python", "-c", _WORKER_CODE, self.eval_program_path]
+        if conda_env:
+            self.cmd = ["conda", "run", "--no-capture-output", "-n", conda_env]
+            self.cmd += ["python", "-c", _WORKER_CODE, self.eval_program_path]
+        self.env = os.environ.copy()
+        self.env["PYTHONUNBUFFERED"] = "1"
+        self.env["PYTHONIOENCODING"] = "utf-8"
+        # Workers import shinka from the same tree as this process
+        shinka_root = str(Path(__file__).resolve().parents[2])
+        self.env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (shinka_root, self.env.get("PYTHONPATH")) if p
+        )
+
+        self._queue: "queue.Queue[Optional[PoolJob]]" = queue.Queue()
+        self._workers: List[Optional[_Worker]] = [None] * num_workers
+        self._closed = False
+        self._startup_error = ""
+        # Each thread warms up its worker right away and then serves jobs
+        self._threads = [
+            threading.Thread(
+                target=self._serve, args=(i,), daemon=True, name=f"eval-pool-{i}"
+            )
+            for i in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(
+        self, program_path: str, results_dir: str, args: Optional[List[str]] = None
+    ) -> PoolJob:
+        """Queue a candidate for evaluation and return its handle."""
+        if self._closed:
+            raise RuntimeError("WorkerPool is shut down")
+        Path(results_dir).mkdir(parents=True, exist_ok=True)
+        job = PoolJob(program_path, results_dir, list(args or []))
+        self._queue.put(job)
+        if self.verbose:
+            logger.info(f"Queued {program_path} for the evaluator pool")
+        return job
+
+    def shutdown(self):
+        """Stop serving jobs and let the workers exit."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for worker in self._workers:
+            if worker is not None:
+                worker.kill()
+
+    def _spawn(self) -> Optional[_Worker]:
+        """Start a worker and wait until the evaluator is imported."""
+        cpus, on_exit = None, None
+        if self.resources is not None:
+            allocation = self.resources.allocate(self.cpus_per_worker, self.mem_bytes)
+            if allocation is None:
+                logger.warning("No free cores or memory for a worker; not pinned")
+            else:
+                cpus = allocation.cpus
+                on_exit = functools.partial(self.resources.release, allocation)
+        worker = _Worker(
+            self.cmd,
+            self.env,
+            preexec_fn=limit_process(cpus, self.mem_bytes, self.nice),
+            on_exit=on_exit,
+        )
+        ready = worker.read(self.timeout)
+        if ready is None or ready.get("error"):
+            error = (ready or {}).get("error", "worker exited during startup")
+            logger.error(f"Evaluator worker {worker.pid} failed to start: {error}")
+            worker.kill()
+            worker.finish()
+            self._startup_error = error
+            return None
+        if self.verbose:
+            logger.info(f"Evaluator worker {worker.pid} is ready")
+        return worker
+
+    def _serve(self, slot: int):
+        worker = None
+        while not self._closed:
+            if worker is None:
+                worker = self._workers[slot] = self._spawn()
+            job = self._queue.get()
+            if job is None:
+                break
+            if worker is None:
+                # Try again for this job before reporting the failure
+                worker = self._workers[slot] = self._spawn()
+            if worker is None:
+                _append_log(
+                    job, f"Evaluator worker failed to start:\n{self._startup_error}"
+                )
+                job._finish(1)
+                continue
+            worker = self._workers[slot] = self._run(worker, job)
+        if worker is not None:
+            worker.close()
+
+    def _run(self, worker: _Worker, job: PoolJob) -> Optional[_Worker]:
+        """Evaluate `job`; returns the worker if it can serve further jobs."""
+        if not job._start(worker):
+            return worker  # cancelled while queued
+        request = {
+            "program_path": job.program_path,
+            "results_dir": job.results_dir,
+            "args": job.args,
+        }
+        reply = worker.read(self.timeout) if worker.send(request) else None
+        if reply is None:
+            timed_out = not worker.exited
+            worker.kill()
+            returncode = worker.finish()
+            if job.cancelled:
+                reason = "Evaluation was cancelled."
+            elif timed_out:
+                reason = f"Evaluation exceeded the timeout of {self.timeout:.0f}s."
+            else:
+                reason = f"Evaluator worker crashed (exit code {returncode})."
+            _append_log(job, reason)
+            self._cap_logs(job)
+            job._finish(returncode)
+            if self.verbose:
+                logger.warning(f"{reason} Replacing worker {worker.pid}.")
+            return None
+
+        self._cap_logs(job)
+        job.resource_usage = reply.get("resource_usage")
+        job._finish(reply["returncode"])
+        worker.num_jobs += 1
+        if worker.num_jobs >= self.max_jobs_per_worker:
+            if self.verbose:
+                logger.info(
+                    f"Recycling evaluator worker {worker.pid} after "
+                    f"{worker.num_jobs} jobs"
+                )
+            worker.close()
+            return None
+        return worker
+
+    def _cap_logs(self, job: PoolJob):
+        for name in ("job_log.out", "job_log.err"):
+            cap_log_file(Path(job.results_dir) / name, self.max_log_bytes)
+
+
+def _append_log(job: PoolJob, message: str):
+    """Record a pool-side failure in the job's stderr log."""
+    try:
+        with open(Path(job.results_dir) / "job_log.err", "a") as f:
+            f.write(message + "\n")
+    except OSError as e:
+        logger.error(f"Could not write to the log of {job.program_path}: {e}")
+
+
+def _run_request(
+    evaluator: Any, eval_program_path: str, request: Dict[str, Any], idle_fds
+) -> int:
+    """Run the evaluator on one candidate, with output sent to its logs."""
+    results_dir = Path(request["results_dir"])
+    results_dir.mkdir(parents=True, exist_ok=True)
+    cwd, argv = os.getcwd(), sys.argv
+    sys.argv = [
+        eval_program_path,
+        "--program_path",
+        request["program_path"],
+        "--results_dir",
+        request["results_dir"],
+        *request["args"],
+    ]
+    returncode = 0
+    with open(results_dir / "job_log.out", "w") as out, open(
+        results_dir / "job_log.err", "w"
+    ) as err:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            if callable(getattr(evaluator, "main", None)):
+                evaluator.main()
+            else:
+                runpy.run_path(eval_program_path, run_name="__main__")
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                returncode = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(idle_fds[0], 1)
+            os.dup2(idle_fds[1], 2)
+            sys.argv = argv
+            os.chdir(cwd)
+    return returncode
+
+
+def worker_main():
+    """Entry point of a pool worker: import the evaluator, then serve jobs."""
+    eval_program_path = sys.argv[1]
+    # The protocol gets a private copy of stdout; stray prints between jobs
+    # go to /dev/null and errors to the inherited stderr
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    idle_fds = (os.open(os.devnull, os.O_WRONLY), os.dup(2))
+    os.dup2(idle_fds[0], 1)
+
+    # Same module search path as `python evaluate.py`
+    sys.path.insert(0, os.path.dirname(eval_program_path))
+    try:
+        spec = importlib.util.spec_from_file_location(
+            "shinka_evaluator", eval_program_path
+        )
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Could not load spec for {eval_program_path}")
+        evaluator = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(evaluator)
+    except BaseException:
+        protocol.write(json.dumps({"error": traceback.format_exc()}) + "\n")
+        return
+    protocol.write(json.dumps({"ready": True}) + "\n")
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        before = process_usage()
+        returncode = _run_request(evaluator, eval_program_path, request, idle_fds)
+        reply: Dict[str, Any] = {"returncode": returncode}
+        usage = process_usage()
+        if before is not None and usage is not None:
+            # CPU times of this job; the peak RSS is the worker's so far
+            for key in ("cpu_time", "user_time", "system_time"):
+                usage[key] -= before[key]
+            reply["resource_usage"] = usage
+        protocol.write(json.dumps(reply) + "\n")
@@ -0,0 +1,162 @@
+"""
+CPU and memory accounting for local jobs.
+
+`ResourceManager` packs jobs onto the cores this process may run on and keeps
+the sum of their memory caps within the host's memory, so the number of
+concurrent local jobs is bounded by what the machine can actually hold.
+`limit_process` builds the `preexec_fn` that applies an allocation (CPU
+affinity, RLIMIT_AS, niceness) in the child before it runs the job.
+"""
+
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import logging
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_MEM_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_mem(mem: Optional[str]) -> Optional[int]:
+    """Bytes of a memory size such as "512M" or "8G" (None stays None)."""
+    if mem is None:
+        return None
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", str(mem).upper())
+    if match is None:
+        raise ValueError(f"Invalid memory size '{mem}', expected e.g. '512M', '8G'")
+    return int(float(match.group(1)) * _MEM_UNITS[match.group(2)])
+
+
+def available_cpus() -> List[int]:
+    """Cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def total_memory() -> Optional[int]:
+    """Physical memory of the host in bytes, if it can be determined."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+@dataclass
+class Allocation:
+    """Cores and memory reserved for one job."""
+
+    cpus: List[int] = field(default_factory=list)
+    mem_bytes: Optional[int] = None
+
+
+class ResourceManager:
+    """Hands out cores and memory to local jobs.
+
+    Args:
+        cpus: Cores to pack jobs onto; defaults to this process's affinity.
+        mem_bytes: Memory budget for the jobs' caps; defaults to the host's
+            physical memory.
+    """
+
+    def __init__(
+        self, cpus: Optional[List[int]] = None, mem_bytes: Optional[int] = None
+    ):
+        self.cpus = sorted(cpus) if cpus is not None else available_cpus()
+        self.mem_bytes = mem_bytes if mem_bytes is not None else total_memory()
+        self._free = set(self.cpus)
+        self._mem_used = 0
+        self._lock = threading.Lock()
+
+    def can_allocate(
+        self, num_cpus: int = 0, mem_bytes: Optional[int] = None
+    ) -> bool:
+        with self._lock:
+            return self._pick(num_cpus, mem_bytes) is not None
+
+    def allocate(
+        self, num_cpus: int = 0, mem_bytes: Optional[int] = None
+    ) -> Optional[Allocation]:
+        """Reserve resources for a job, or None if they are not free."""
+        with self._lock:
+            cpus = self._pick(num_cpus, mem_bytes)
+            if cpus is None:
+                return None
+            self._free.difference_update(cpus)
+            self._mem_used += mem_bytes or 0
+            return Allocation(cpus=cpus, mem_bytes=mem_bytes)
+
+    def release(self, allocation: Allocation):
+        with self._lock:
+            self._free.update(allocation.cpus)
+            self._mem_used -= allocation.mem_bytes or 0
+
+    def _pick(self, num_cpus: int, mem_bytes: Optional[int]) -> Optional[List[int]]:
+        """Cores for a job: the first free run of adjacent cores if there is
+        one (shared caches), else the lowest free cores.
+
+        A job asking for more than the host has still runs, alone.
+        """
+        if mem_bytes and self.mem_bytes is not None and self._mem_used:
+            if self._mem_used + mem_bytes > self.mem_bytes:
+                return None
+        num_cpus = min(num_cpus, len(self.cpus))
+        if num_cpus <= 0:
+            return []
+        if len(self._free) < num_cpus:
+            return None
+        free = [cpu for cpu in self.cpus if cpu in self._free]
+        for start in range(len(free) - num_cpus + 1):
+            run = free[start : start + num_cpus]
+            if run[-1] - run[0] == num_cpus - 1:
+                return run
+        return free[:num_cpus]
+
+
+def limit_process(
+    cpus: Optional[List[int]] = None,
+    mem_bytes: Optional[int] = None,
+    nice: int = 0,
+) -> Optional[Callable[[], None]]:
+    """`preexec_fn` pinning a child to `cpus` and capping its address space
+    (RLIMIT_AS) and priority, or None if there is nothing to apply."""
+    if not cpus and not mem_bytes and not nice:
+        return None
+
+    def apply():
+        if cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        if mem_bytes and resource is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+        if nice:
+            os.nice(nice)
+
+    return apply
+
+
+def usage_from_rusage(rusage) -> Dict[str, float]:
+    """Peak RSS and CPU time of a finished job from its `wait4` rusage."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_bytes = rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "cpu_time": rusage.ru_utime + rusage.ru_stime,
+        "user_time": rusage.ru_utime,
+        "system_time": rusage.ru_stime,
+        "peak_rss_mb": rss_bytes / 1024**2,
+    }
+
+
+def process_usage() -> Optional[Dict[str, float]]:
+    """Usage of this process so far (None where `resource` is unavailable)."""
+    if resource is None:
+        return None
+    return usage_from_rusage(resource.getrusage(resource.RUSAGE_SELF))
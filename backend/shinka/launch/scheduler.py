@@ -1,14 +1,19 @@
 import logging
 import time
 import asyncio
+from functools import partial
 from dataclasses import dataclass, asdict, field
 from typing import Optional, Dict, Any, Tuple, Union, List
 from concurrent.futures import ThreadPoolExecutor
 from .local import submit as submit_local, monitor as monitor_local
 from .local import ProcessWithLogging
+from .pool import PoolJob, WorkerPool
+from .resources import ResourceManager, limit_process, parse_mem
 from .slurm import (
     submit_docker as submit_slurm_docker,
     submit_conda as submit_slurm_conda,
+    submit_docker_array as submit_slurm_docker_array,
+    submit_conda_array as submit_slurm_conda_array,
     monitor as monitor_slurm,
 )
 from shinka.utils import parse_time_to_seconds
@@ -35,6 +40,23 @@ class LocalJobConfig(JobConfig):
 
     time: Optional[str] = None
     conda_env: Optional[str] = None
+    # "pump" (logs can be tailed live) or "redirect" (straight to the files)
+    log_mode: str = "pump"
+    max_log_bytes: Optional[int] = None  # per log file; None means no cap
+    # Per-job resources: cores (pinned; jobs only start while enough cores
+    # and memory are free), address-space cap (RLIMIT_AS, e.g. "4G") and
+    # niceness. For local_pool they apply to each worker.
+    cpus_per_job: Optional[int] = None
+    mem_limit: Optional[str] = None
+    nice: int = 0
+
+
+@dataclass
+class LocalPoolJobConfig(LocalJobConfig):
+    """Configuration for local jobs run by a pool of warm evaluator workers"""
+
+    num_workers: int = 2
+    max_jobs_per_worker: int = 50
 
 
 @dataclass
@@ -49,6 +71,8 @@ class SlurmDockerJobConfig(JobConfig):
     cpus: int = 1
     gpus: int = 1
     mem: Optional[str] = "8G"
+    # Candidates submitted together as one job array (1: one sbatch each)
+    array_batch_size: int = 1
 
 
 @dataclass
@@ -62,6 +86,8 @@ class SlurmCondaJobConfig(JobConfig):
     cpus: int = 1
     gpus: int = 1
     mem: Optional[str] = "8G"
+    # Candidates submitted together as one job array (1: one sbatch each)
+    array_batch_size: int = 1
 
     def __post_init__(self):
         if self.modules is None:
@@ -74,6 +100,7 @@ class JobScheduler:
         job_type: str,
         config: Union[
             LocalJobConfig,
+            LocalPoolJobConfig,
             SlurmDockerJobConfig,
             SlurmCondaJobConfig,
         ],
@@ -85,16 +112,84 @@ class JobScheduler:
         self.verbose = verbose
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
 
+        self.pool: Optional[WorkerPool] = None
+        self.resources: Optional[ResourceManager] = None
+        self.job_mem: Optional[int] = None
+        if isinstance(self.config, LocalJobConfig):
+            self.job_mem = parse_mem(self.config.mem_limit)
+            if self.config.cpus_per_job or self.job_mem:
+                self.resources = ResourceManager()
         if self.job_type == "local":
             self.monitor = monitor_local
+        elif self.job_type == "local_pool":
+            assert isinstance(self.config, LocalPoolJobConfig)
+            self.monitor = monitor_local
+            self.pool = WorkerPool(
+                self.config.eval_program_path,
+                num_workers=self.config.num_workers,
+                conda_env=self.config.conda_env,
+                timeout=(
+                    parse_time_to_seconds(self.config.time)
+                    if self.config.time
+                    else None
+                ),
+                max_jobs_per_worker=self.config.max_jobs_per_worker,
+                max_log_bytes=self.config.max_log_bytes,
+                resources=self.resources,
+                cpus_per_worker=self.config.cpus_per_job or 0,
+                mem_bytes=self.job_mem,
+                nice=self.config.nice,
+                verbose=verbose,
+            )
         elif self.job_type in ["slurm_docker", "slurm_conda"]:
             self.monitor = monitor_slurm
         else:
             raise ValueError(
                 f"Unknown job type: {job_type}. "
-                f"Must be 'local', 'slurm_docker', or 'slurm_conda'"
+                f"Must be 'local', 'local_pool', 'slurm_docker', or 'slurm_conda'"
             )
 
+    def has_capacity(self) -> bool:
+        """Whether the host has the cores and memory for another local job."""
+        if self.resources is None or self.job_type != "local":
+            return True
+        assert isinstance(self.config, LocalJobConfig)
+        return self.resources.can_allocate(
+            self.config.cpus_per_job or 0, self.job_mem
+        )
+
+    def _submit_local(
+        self, cmd: List[str], results_dir_t: str
+    ) -> ProcessWithLogging:
+        """Start a local job within its share of cores and memory."""
+        assert isinstance(self.config, LocalJobConfig)
+        cpus, on_exit = None, None
+        if self.resources is not None:
+            allocation = self.resources.allocate(
+                self.config.cpus_per_job or 0, self.job_mem
+            )
+            if allocation is None:
+                logger.warning("No free cores or memory for a local job; not pinned")
+            else:
+                cpus = allocation.cpus
+                on_exit = partial(self.resources.release, allocation)
+        return submit_local(
+            results_dir_t,
+            cmd,
+            verbose=self.verbose,
+            log_mode=self.config.log_mode,
+            max_log_bytes=self.config.max_log_bytes,
+            preexec_fn=limit_process(cpus, self.job_mem, self.config.nice),
+            on_exit=on_exit,
+        )
+
+    @property
+    def array_batch_size(self) -> int:
+        """Number of candidates the runner may batch into `submit_array`."""
+        if isinstance(self.config, (SlurmDockerJobConfig, SlurmCondaJobConfig)):
+            return max(1, self.config.array_batch_size)
+        return 1
+
     def _build_command(self, exec_fname_t: str, results_dir_t: str) -> List[str]:
         # Docker requires workspace to be mounted
         if self.job_type == "slurm_docker":
@@ -136,27 +231,35 @@ class JobScheduler:
                     "--results_dir",
                     results_dir_t,
                 ]
-        if self.config.extra_cmd_args:
-            for k, v in self.config.extra_cmd_args.items():
-                # Handle boolean flags
-                if isinstance(v, bool):
-                    if v:  # Only append flag if True
-                        cmd.append(f"--{k}")
-                else:
-                    # For non-boolean values, append both flag and value
-                    cmd.extend([f"--{k}", str(v)])
-        return cmd
+        return cmd + self._extra_cmd_args()
+
+    def _extra_cmd_args(self) -> List[str]:
+        args: List[str] = []
+        for k, v in self.config.extra_cmd_args.items():
+            # Handle boolean flags
+            if isinstance(v, bool):
+                if v:  # Only append flag if True
+                    args.append(f"--{k}")
+            else:
+                # For non-boolean values, append both flag and value
+                args.extend([f"--{k}", str(v)])
+        return args
 
     def run(
         self, exec_fname_t: str, results_dir_t: str
     ) -> Tuple[Dict[str, Any], float]:
-        job_id: Union[str, ProcessWithLogging]
+        job_id: Union[str, ProcessWithLogging, PoolJob]
         cmd = self._build_command(exec_fname_t, results_dir_t)
         start_time = time.time()
 
-        if self.job_type == "local":
-            assert isinstance(self.config, LocalJobConfig)
-            job_id = submit_local(results_dir_t, cmd, verbose=self.verbose)
+        if self.job_type == "local_pool":
+            assert self.pool is not None
+            job_id = self.pool.submit(
+                exec_fname_t, results_dir_t, self._extra_cmd_args()
+            )
+            job_id.wait()
+        elif self.job_type == "local":
+            job_id = self._submit_local(cmd, results_dir_t)
         elif self.job_type == "slurm_docker":
             assert isinstance(self.config, SlurmDockerJobConfig)
             job_id = submit_slurm_docker(
@@ -193,6 +296,8 @@ class JobScheduler:
             results = monitor_slurm(job_id, results_dir_t)
         else:
             results = monitor_local(job_id, results_dir_t)
+            if results is not None and job_id.resource_usage:
+                results["resource_usage"] = job_id.resource_usage
 
         end_time = time.time()
         rtime = end_time - start_time
@@ -205,12 +310,14 @@ class JobScheduler:
 
     def submit_async(
         self, exec_fname_t: str, results_dir_t: str
-    ) -> Union[str, ProcessWithLogging]:
+    ) -> Union[str, ProcessWithLogging, PoolJob]:
         """Submit a job asynchronously and return the job ID or process."""
+        if self.job_type == "local_pool":
+            assert self.pool is not None
+            return self.pool.submit(exec_fname_t, results_dir_t, self._extra_cmd_args())
         cmd = self._build_command(exec_fname_t, results_dir_t)
         if self.job_type == "local":
-            assert isinstance(self.config, LocalJobConfig)
-            return submit_local(results_dir_t, cmd, verbose=self.verbose)
+            return self._submit_local(cmd, results_dir_t)
         elif self.job_type == "slurm_docker":
             assert isinstance(self.config, SlurmDockerJobConfig)
             return submit_slurm_docker(
@@ -242,15 +349,60 @@ class JobScheduler:
             )
         raise ValueError(f"Unknown job type: {self.job_type}")
 
+    def submit_array(
+        self, jobs: List[Tuple[str, str]]
+    ) -> List[Union[str, ProcessWithLogging, PoolJob]]:
+        """Submit several (exec_fname, results_dir) jobs at once.
+
+        SLURM jobs are submitted as one job array; other job types are
+        submitted one by one.
+        """
+        if len(jobs) < 2 or self.job_type not in ["slurm_docker", "slurm_conda"]:
+            return [self.submit_async(*job) for job in jobs]
+        log_dirs = [results_dir for _, results_dir in jobs]
+        cmds = [self._build_command(*job) for job in jobs]
+        if self.job_type == "slurm_docker":
+            assert isinstance(self.config, SlurmDockerJobConfig)
+            return submit_slurm_docker_array(
+                log_dirs,
+                cmds,
+                self.config.time,
+                self.config.partition,
+                self.config.cpus,
+                self.config.gpus,
+                self.config.mem,
+                self.config.docker_flags,
+                self.config.image,
+                image_tar_path=self.config.image_tar_path,
+                verbose=self.verbose,
+            )
+        assert isinstance(self.config, SlurmCondaJobConfig)
+        return submit_slurm_conda_array(
+            log_dirs,
+            cmds,
+            self.config.time,
+            self.config.partition,
+            self.config.cpus,
+            self.config.gpus,
+            self.config.mem,
+            self.config.conda_env,
+            self.config.modules,
+            verbose=self.verbose,
+        )
+
     def check_job_status(self, job) -> bool:
         """Check if job is running. Returns True if running, False if done."""
         if self.job_type in ["slurm_docker", "slurm_conda"]:
             from .slurm import get_job_status
 
             if isinstance(job.job_id, str):
+                # Answered from one cached squeue call for all jobs
                 status = get_job_status(job.job_id)
                 return status != ""
             return False  # Should not happen with slurm
+        elif isinstance(job.job_id, PoolJob):
+            # The pool enforces the timeout from when a worker picks the job up
+            return job.job_id.poll() is None
         else:
             if isinstance(job.job_id, ProcessWithLogging):
                 if (
@@ -298,26 +450,29 @@ class JobScheduler:
             return False
 
     def get_job_results(
-        self, job_id: Union[str, ProcessWithLogging], results_dir: str
+        self, job_id: Union[str, ProcessWithLogging, PoolJob], results_dir: str
     ) -> Optional[Dict[str, Any]]:
         """Get results from a completed job."""
         if self.job_type in ["slurm_docker", "slurm_conda"]:
             if isinstance(job_id, str):
                 return monitor_slurm(job_id, results_dir, verbose=self.verbose)
-        else:
-            if isinstance(job_id, ProcessWithLogging):
-                job_id.wait()
-                return monitor_local(
-                    job_id,
-                    results_dir,
-                    verbose=self.verbose,
-                    timeout=self.config.time,
-                )
+        elif isinstance(job_id, (ProcessWithLogging, PoolJob)):
+            job_id.wait()
+            results = monitor_local(
+                job_id,
+                results_dir,
+                verbose=self.verbose,
+                # The pool enforces its own timeout
+                timeout=None if isinstance(job_id, PoolJob) else self.config.time,
+            )
+            if results is not None and job_id.resource_usage:
+                results["resource_usage"] = job_id.resource_usage
+            return results
         return None
 
     async def submit_async_nonblocking(
         self, exec_fname_t: str, results_dir_t: str
-    ) -> Union[str, ProcessWithLogging]:
+    ) -> Union[str, ProcessWithLogging, PoolJob]:
         """Submit a job asynchronously without blocking the event loop."""
         loop = asyncio.get_event_loop()
 
@@ -332,7 +487,7 @@ class JobScheduler:
         return await loop.run_in_executor(self.executor, self.check_job_status, job)
 
     async def get_job_results_async(
-        self, job_id: Union[str, ProcessWithLogging], results_dir: str
+        self, job_id: Union[str, ProcessWithLogging, PoolJob], results_dir: str
     ) -> Optional[Dict[str, Any]]:
         """Async version of getting job results."""
         loop = asyncio.get_event_loop()
@@ -346,7 +501,9 @@ class JobScheduler:
         tasks = [self.check_job_status_async(job) for job in jobs]
         return await asyncio.gather(*tasks, return_exceptions=True)
 
-    async def cancel_job_async(self, job_id: Union[str, ProcessWithLogging]) -> bool:
+    async def cancel_job_async(
+        self, job_id: Union[str, ProcessWithLogging, PoolJob]
+    ) -> bool:
         """Cancel a running job asynchronously."""
         loop = asyncio.get_event_loop()
 
@@ -364,7 +521,7 @@ class JobScheduler:
                         return result.returncode == 0
                 else:
                     # For local jobs, kill the process
-                    if isinstance(job_id, ProcessWithLogging):
+                    if isinstance(job_id, (ProcessWithLogging, PoolJob)):
                         job_id.kill()
                         return True
                 return False
@@ -375,5 +532,7 @@ class JobScheduler:
         return await loop.run_in_executor(self.executor, cancel_job)
 
     def shutdown(self):
-        """Shutdown the thread pool executor."""
+        """Shutdown the thread pool executor and the evaluator pool."""
         self.executor.shutdown(wait=True)
+        if self.pool is not None:
+            self.pool.shutdown()
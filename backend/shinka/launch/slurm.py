@@ -1,5 +1,7 @@
+import getpass
 import json
 import os
+import shlex
 from pathlib import Path
 import subprocess
 import tempfile
@@ -7,7 +9,7 @@ import time
 import uuid
 import threading
 from shinka.utils import load_results
-from typing import Optional
+from typing import Dict, List, Optional, Set
 import logging
 
 logger = logging.getLogger(__name__)
@@ -78,8 +80,8 @@ def get_local_image(image_name):
 SBATCH_DOCKER_TEMPLATE = """\
 #!/bin/bash
 #SBATCH --job-name={job_name}
-#SBATCH --output={log_dir}/job_log.out
-#SBATCH --error={log_dir}/job_log.err
+#SBATCH --output={stdout_path}
+#SBATCH --error={stderr_path}
 #SBATCH --time={time}
 #SBATCH --partition={partition}
 #SBATCH --nodes=1
@@ -107,8 +109,8 @@ exit $?
 SBATCH_CONDA_TEMPLATE = """\
 #!/bin/bash
 #SBATCH --job-name={job_name}
-#SBATCH --output={log_dir}/job_log.out
-#SBATCH --error={log_dir}/job_log.err
+#SBATCH --output={stdout_path}
+#SBATCH --error={stderr_path}
 #SBATCH --time={time}
 #SBATCH --partition={partition}
 #SBATCH --nodes=1
@@ -136,6 +138,91 @@ exit $?
 """
 
 
+def _sbatch_params(mem: Optional[str], sbatch_kwargs: dict) -> str:
+    if mem is not None:
+        sbatch_kwargs["mem"] = mem
+    return "\n".join(f"#SBATCH --{k}={v}" for k, v in sbatch_kwargs.items())
+
+
+def _docker_load_command(image: str, image_tar_path: Optional[str]) -> str:
+    if image_tar_path:
+        return f"""
+if [ -f "{image_tar_path}" ]; then
+    echo "Loading image from {image_tar_path}..."
+    docker load < "{image_tar_path}"
+else
+    echo "Image tar file not found at {image_tar_path}, exiting."
+    exit 1
+fi
+"""
+    # Fallback to existing pull/cache logic
+    get_local_image(image)  # This function pulls and caches the image
+    image_file = f"{image.replace('/', '_').replace(':', '_')}.tar"
+    return f"""
+if [ -f "{DOCKER_CACHE_DIR}/{image_file}" ]; then
+    echo "Loading cached image..."
+    docker load < "{DOCKER_CACHE_DIR}/{image_file}"
+    if ! docker image inspect {image} >/dev/null 2>&1; then
+        echo "Failed to load cached image, pulling from registry..."
+        docker pull {image}
+    fi
+else
+    echo "Pulling image..."
+    docker pull {image}
+fi
+"""
+
+
+def _array_dispatch(log_dirs: List[str], cmds: List[List[str]]) -> str:
+    """Bash that selects the command and logs of the current array task.
+
+    The command is a bash array (run as `"${TASK_CMD[@]}"`) of quoted
+    arguments, so paths and values are passed through unexpanded.
+    """
+    lines = ['case "$SLURM_ARRAY_TASK_ID" in']
+    for i, (log_dir, cmd) in enumerate(zip(log_dirs, cmds)):
+        args = " ".join(shlex.quote(str(arg)) for arg in cmd)
+        lines.append(
+            f"    {i}) LOG_DIR={shlex.quote(log_dir)}; TASK_CMD=({args}) ;;"
+        )
+    lines += [
+        "esac",
+        'exec >"$LOG_DIR/job_log.out" 2>"$LOG_DIR/job_log.err"',
+    ]
+    return "\n".join(lines)
+
+
+def _array_log_paths(log_dirs: List[str], job_name: str):
+    """Slurm's own logs of an array (the tasks write to their log dirs)."""
+    array_dir = Path(os.path.commonpath(log_dirs)) / "slurm_arrays"
+    array_dir.mkdir(parents=True, exist_ok=True)
+    return f"{array_dir}/{job_name}_%a.out", f"{array_dir}/{job_name}_%a.err"
+
+
+def _sbatch(sbatch_script: str, kind: str) -> str:
+    """Submit a batch script and return the Slurm job id."""
+    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".sbatch") as f:
+        f.write(sbatch_script)
+        sbatch_path = f.name
+
+    try:
+        result = subprocess.run(
+            ["sbatch", sbatch_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+            text=True,
+        )
+    except subprocess.CalledProcessError as e:
+        err_msg = e.stderr.strip() if e.stderr else str(e)
+        logger.info(f"Error failed to submit {kind} job: {err_msg}")
+        logger.info(f"Failed sbatch script: {sbatch_script}")
+        raise
+
+    # Slurm replies: "Submitted batch job <jobid>"
+    return result.stdout.strip().split()[-1]
+
+
 def submit_docker(
     log_dir: str,
     cmd: list[str],
@@ -170,68 +257,71 @@ def submit_docker(
     log_dir = os.path.abspath(log_dir)
     os.makedirs(log_dir, exist_ok=True)
 
-    load_command = ""
-    if image_tar_path:
-        load_command = f"""
-if [ -f "{image_tar_path}" ]; then
-    echo "Loading image from {image_tar_path}..."
-    docker load < "{image_tar_path}"
-else
-    echo "Image tar file not found at {image_tar_path}, exiting."
-    exit 1
-fi
-"""
-    else:
-        # Fallback to existing pull/cache logic
-        get_local_image(image)  # This function pulls and caches the image
-        image_file = f"{image.replace('/', '_').replace(':', '_')}.tar"
-        load_command = f"""
-if [ -f "{DOCKER_CACHE_DIR}/{image_file}" ]; then
-    echo "Loading cached image..."
-    docker load < "{DOCKER_CACHE_DIR}/{image_file}"
-    if ! docker image inspect {image} >/dev/null 2>&1; then
-        echo "Failed to load cached image, pulling from registry..."
-        docker pull {image}
-    fi
-else
-    echo "Pulling image..."
-    docker pull {image}
-fi
-"""
-
-    if mem is not None:
-        sbatch_kwargs["mem"] = mem
-
-    additional_sbatch_params = ""
-    for k, v in sbatch_kwargs.items():
-        additional_sbatch_params += f"#SBATCH --{k}={v}"
-
     sbatch_script = SBATCH_DOCKER_TEMPLATE.format(
         job_name=job_name,
-        log_dir=log_dir,
+        stdout_path=f"{log_dir}/job_log.out",
+        stderr_path=f"{log_dir}/job_log.err",
         time=time,
         partition=partition,
         cpus=cpus,
         gpus=gpus,
-        additional_sbatch_params=additional_sbatch_params,
+        additional_sbatch_params=_sbatch_params(mem, sbatch_kwargs),
         docker_flags=docker_flags,
         image=image,
         cmd=" ".join(cmd),
-        load_command=load_command,
+        load_command=_docker_load_command(image, image_tar_path),
     )
+    job_id = _sbatch(sbatch_script, "Docker")
+    if verbose:
+        logger.info(f"Submitted Docker job {job_id}")
+    return job_id
 
-    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".sbatch") as f:
-        f.write(sbatch_script)
-        sbatch_path = f.name
 
-    result = subprocess.run(
-        ["sbatch", sbatch_path], stdout=subprocess.PIPE, check=True, text=True
+def submit_docker_array(
+    log_dirs: List[str],
+    cmds: List[List[str]],
+    time: str,
+    partition: str,
+    cpus: int,
+    gpus: int,
+    mem: Optional[str],
+    docker_flags: str,
+    image: str,
+    image_tar_path: Optional[str] = None,
+    verbose: bool = False,
+    **sbatch_kwargs,
+) -> List[str]:
+    """Submit several Docker jobs as one Slurm job array.
+
+    Returns the ids of the array tasks (`<array id>_<index>`), in order.
+    """
+    job_name = f"docker-{uuid.uuid4().hex[:6]}"
+    log_dirs = [os.path.abspath(log_dir) for log_dir in log_dirs]
+    for log_dir in log_dirs:
+        os.makedirs(log_dir, exist_ok=True)
+    stdout_path, stderr_path = _array_log_paths(log_dirs, job_name)
+
+    sbatch_kwargs["array"] = f"0-{len(cmds) - 1}"
+    sbatch_script = SBATCH_DOCKER_TEMPLATE.format(
+        job_name=job_name,
+        stdout_path=stdout_path,
+        stderr_path=stderr_path,
+        time=time,
+        partition=partition,
+        cpus=cpus,
+        gpus=gpus,
+        additional_sbatch_params=_sbatch_params(mem, sbatch_kwargs),
+        docker_flags=docker_flags,
+        image=image,
+        cmd='"${TASK_CMD[@]}"',
+        load_command=_array_dispatch(log_dirs, cmds)
+        + "\n"
+        + _docker_load_command(image, image_tar_path),
     )
-    # Slurm replies: "Submitted batch job <jobid>"
-    job_id = result.stdout.strip().split()[-1]
+    array_id = _sbatch(sbatch_script, "Docker array")
     if verbose:
-        logger.info(f"Submitted Docker job {job_id}")
-    return job_id
+        logger.info(f"Submitted Docker job array {array_id} ({len(cmds)} tasks)")
+    return [f"{array_id}_{i}" for i in range(len(cmds))]
 
 
 def submit_conda(
@@ -271,49 +361,70 @@ def submit_conda(
 
     module_load_commands = "\n".join([f"module load {module}" for module in modules])
 
-    if mem is not None:
-        sbatch_kwargs["mem"] = mem
-
-    additional_sbatch_params = ""
-    for k, v in sbatch_kwargs.items():
-        additional_sbatch_params += f"#SBATCH --{k}={v}"
-
     sbatch_script = SBATCH_CONDA_TEMPLATE.format(
         job_name=job_name,
-        log_dir=log_dir,
+        stdout_path=f"{log_dir}/job_log.out",
+        stderr_path=f"{log_dir}/job_log.err",
         time=time,
         partition=partition,
         cpus=cpus,
         gpus=gpus,
-        additional_sbatch_params=additional_sbatch_params,
+        additional_sbatch_params=_sbatch_params(mem, sbatch_kwargs),
         conda_env=conda_env,
         module_load_commands=module_load_commands,
         cmd=" ".join(cmd),
     )
+    job_id = _sbatch(sbatch_script, "Conda")
+    if verbose:
+        logger.info(f"Submitted Conda job {job_id}")
+    return job_id
 
-    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".sbatch") as f:
-        f.write(sbatch_script)
-        sbatch_path = f.name
 
-    try:
-        result = subprocess.run(
-            ["sbatch", sbatch_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-            text=True,
-        )
-    except subprocess.CalledProcessError as e:
-        err_msg = e.stderr.strip() if e.stderr else str(e)
-        logger.info(f"Error failed to submit Conda job: {err_msg}")
-        logger.info(f"Failed sbatch script: {sbatch_script}")
-        raise
+def submit_conda_array(
+    log_dirs: List[str],
+    cmds: List[List[str]],
+    time: str,
+    partition: str,
+    cpus: int,
+    gpus: int,
+    mem: Optional[str],
+    conda_env: str = "",
+    modules: Optional[list[str]] = None,
+    verbose: bool = False,
+    **sbatch_kwargs,
+) -> List[str]:
+    """Submit several Conda jobs as one Slurm job array.
 
-    # Slurm replies: "Submitted batch job <jobid>"
-    job_id = result.stdout.strip().split()[-1]
+    Returns the ids of the array tasks (`<array id>_<index>`), in order.
+    """
+    job_name = f"conda-{uuid.uuid4().hex[:6]}"
+    log_dirs = [os.path.abspath(log_dir) for log_dir in log_dirs]
+    for log_dir in log_dirs:
+        os.makedirs(log_dir, exist_ok=True)
+    stdout_path, stderr_path = _array_log_paths(log_dirs, job_name)
+
+    module_load_commands = "\n".join(
+        f"module load {module}" for module in modules or []
+    )
+
+    sbatch_kwargs["array"] = f"0-{len(cmds) - 1}"
+    sbatch_script = SBATCH_CONDA_TEMPLATE.format(
+        job_name=job_name,
+        stdout_path=stdout_path,
+        stderr_path=stderr_path,
+        time=time,
+        partition=partition,
+        cpus=cpus,
+        gpus=gpus,
+        additional_sbatch_params=_sbatch_params(mem, sbatch_kwargs),
+        conda_env=conda_env,
+        module_load_commands=module_load_commands,
+        cmd=_array_dispatch(log_dirs, cmds) + '\n"${TASK_CMD[@]}"',
+    )
+    array_id = _sbatch(sbatch_script, "Conda array")
     if verbose:
-        logger.info(f"Submitted Conda job {job_id}")
-    return job_id
+        logger.info(f"Submitted Conda job array {array_id} ({len(cmds)} tasks)")
+    return [f"{array_id}_{i}" for i in range(len(cmds))]
 
 
 def launch_local_subprocess(
@@ -419,6 +530,76 @@ def submit_local_conda(
     return job_id
 
 
+class SlurmStatusCache:
+    """Queue state of all tracked Slurm jobs from one `squeue` call.
+
+    `status` answers from a snapshot at most `ttl` seconds old, so a scheduler
+    tick that checks hundreds of jobs costs a single `squeue` call. A job is
+    done once it is missing from a snapshot taken after it was first seen.
+    """
+
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self.num_queries = 0
+        self._lock = threading.Lock()
+        self._first_seen: Dict[str, float] = {}
+        self._finished: Set[str] = set()
+        self._states: Optional[Dict[str, str]] = None  # None: squeue failed
+        self._snapshot_time = float("-inf")
+
+    def status(self, job_id: str) -> Optional[str]:
+        """Non-empty while queued or running, "" once done, None if unknown."""
+        with self._lock:
+            if job_id in self._finished:
+                return ""
+            now = time.monotonic()
+            self._first_seen.setdefault(job_id, now)
+            if now - self._snapshot_time > self.ttl:
+                self._refresh()
+            if self._states is None:
+                return None
+            state = self._states.get(job_id)
+            if state is not None:
+                return f"{job_id} {state}"
+            if self._first_seen[job_id] > self._snapshot_time:
+                return job_id  # Submitted after the snapshot was taken
+            self._finished.add(job_id)
+            del self._first_seen[job_id]
+            return ""
+
+    def _refresh(self):
+        self._snapshot_time = time.monotonic()
+        self.num_queries += 1
+        try:
+            # One line per job and per array task ("<id>_<index>")
+            result = subprocess.run(
+                [
+                    "squeue",
+                    "--noheader",
+                    "--array",
+                    "--user",
+                    getpass.getuser(),
+                    "--format",
+                    "%i %T",
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+        except (subprocess.CalledProcessError, OSError) as e:
+            logger.warning(f"squeue failed: {e}")
+            self._states = None
+            return
+        self._states = {}
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if parts:
+                self._states[parts[0]] = parts[1] if len(parts) > 1 else ""
+
+
+STATUS_CACHE = SlurmStatusCache()
+
+
 def get_job_status(job_id: str) -> Optional[str]:
     """Get status for Slurm or local jobs."""
     if job_id.startswith("local-"):
@@ -429,16 +610,7 @@ def get_job_status(job_id: str) -> Optional[str]:
         if proc and proc.poll() is None:
             return job_id
         return ""
-    try:
-        result = subprocess.run(
-            ["squeue", "-j", str(job_id), "--noheader"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError:
-        return None
+    return STATUS_CACHE.status(job_id)
 
 
 def monitor(job_id, results_dir=None, poll_interval=10, verbose: bool = False):
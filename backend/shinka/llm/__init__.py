@@ -1,6 +1,21 @@
 from .llm import LLMClient, extract_between
 from .embedding import EmbeddingClient
+from .embedding_batcher import EmbeddingBatcher
+from .local_embedding import HashingNgramEmbedder, LocalEmbeddingClient
+from .embedding_cache import (
+    EmbeddingCache,
+    get_embedding_cache,
+    configure_embedding_cache,
+)
 from .models import QueryResult
+from .router import (
+    Endpoint,
+    EndpointPool,
+    get_endpoint_pool,
+    configure_endpoint_pool,
+)
+from .usage import LLMUsage, merge_usage, summarize_usage
+from .retry import RetryPolicy, RetryError, CircuitOpenError
 from .dynamic_sampling import (
     BanditBase,
     AsymmetricUCB,
@@ -12,7 +27,23 @@ __all__ = [
     "extract_between",
     "QueryResult",
     "EmbeddingClient",
+    "EmbeddingBatcher",
+    "HashingNgramEmbedder",
+    "LocalEmbeddingClient",
+    "EmbeddingCache",
+    "get_embedding_cache",
+    "configure_embedding_cache",
     "BanditBase",
     "AsymmetricUCB",
     "FixedSampler",
+    "Endpoint",
+    "EndpointPool",
+    "get_endpoint_pool",
+    "configure_endpoint_pool",
+    "LLMUsage",
+    "merge_usage",
+    "summarize_usage",
+    "RetryPolicy",
+    "RetryError",
+    "CircuitOpenError",
 ]
@@ -0,0 +1,111 @@
+import ast
+import zlib
+from typing import List, Optional, Sequence
+import numpy as np
+
+POOLING_MODES = ("mean", "max")
+
+
+def _python_boundaries(code: str) -> Optional[List[int]]:
+    """Start lines (0-based) of top-level statements, incl. decorators."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    starts = []
+    for node in tree.body:
+        lineno = node.lineno
+        for dec in getattr(node, "decorator_list", []):
+            lineno = min(lineno, dec.lineno)
+        starts.append(lineno - 1)
+    return starts
+
+
+def _section_boundaries(lines: Sequence[str]) -> List[int]:
+    """Non-indented lines following a blank line (functions, blocks, dicts)."""
+    starts = [0]
+    for i in range(1, len(lines)):
+        line = lines[i]
+        if line and not line[0].isspace() and not lines[i - 1].strip():
+            starts.append(i)
+    return starts
+
+
+def _split_lines(segment: List[str], max_chars: int) -> List[str]:
+    """Split an oversized segment on line boundaries."""
+    chunks, current, size = [], [], 0
+    for line in segment:
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def chunk_code(
+    code: str, max_chars: int = 6000, language: str = "python"
+) -> List[str]:
+    """Split code into chunks of at most ~`max_chars` on natural boundaries.
+
+    Python is split between top-level statements (AST); other languages and
+    unparsable code at blank-line separated, non-indented sections. Adjacent
+    segments are merged up to `max_chars` and oversized ones split by lines.
+    Merged chunks also end after content-defined cut points (segments whose
+    hash is 0 mod 4), so an edit changes only nearby chunks and the rest
+    keep their embedding cache keys.
+    """
+    if len(code) <= max_chars:
+        return [code]
+    lines = code.splitlines(keepends=True)
+    starts = _python_boundaries(code) if language == "python" else None
+    if not starts:
+        starts = _section_boundaries(lines)
+    starts = sorted(set([0] + starts))
+    segments = [
+        lines[a:b] for a, b in zip(starts, starts[1:] + [len(lines)]) if b > a
+    ]
+    chunks: List[str] = []
+    current = ""
+    for segment in segments:
+        text = "".join(segment)
+        if len(text) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split_lines(segment, max_chars))
+        elif current and len(current) + len(text) > max_chars:
+            chunks.append(current)
+            current = text
+        else:
+            current += text
+        if len(current) >= max_chars // 4 and zlib.crc32(text.encode()) % 4 == 0:
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return [c for c in chunks if c.strip()] or [code[:max_chars]]
+
+
+def pool_embeddings(
+    embeddings: Sequence[Sequence[float]],
+    weights: Optional[Sequence[float]] = None,
+    mode: str = "mean",
+) -> List[float]:
+    """Pool chunk embeddings into one vector (length-weighted mean or max)."""
+    if mode not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling '{mode}'. Choose from {POOLING_MODES}")
+    X = np.asarray(embeddings, dtype=np.float64)
+    if X.ndim != 2 or X.shape[0] == 0:
+        return []
+    if mode == "max":
+        pooled = X.max(axis=0)
+    else:
+        w = np.ones(X.shape[0]) if weights is None else np.asarray(weights, float)
+        pooled = (X * w[:, None]).sum(axis=0) / max(w.sum(), 1e-12)
+    norm = np.linalg.norm(pooled)
+    if norm > 0:
+        pooled = pooled / norm
+    return pooled.tolist()
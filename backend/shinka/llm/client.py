@@ -1,20 +1,43 @@
-from typing import Any, Tuple
+from typing import Any, Dict, Optional, Tuple
 import os
 import re
+import threading
 import openai
 import instructor
 from pathlib import Path
 from dotenv import load_dotenv
+from .router import Endpoint
 
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
 
+_CLIENTS: Dict[Tuple[str, str], openai.OpenAI] = {}
+_CLIENTS_LOCK = threading.Lock()
 
-def get_client_llm(model_name: str, structured_output: bool = False) -> Tuple[Any, str]:
+
+def get_openai_client(base_url: str, api_key: str) -> openai.OpenAI:
+    """Return a cached OpenAI client (and connection pool) per endpoint."""
+    key = (base_url, api_key)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            # Retries are handled once, in shinka.llm.query (see retry.py)
+            client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _CLIENTS[key] = client
+        return client
+
+
+def get_client_llm(
+    model_name: str,
+    structured_output: bool = False,
+    endpoint: Optional[Endpoint] = None,
+) -> Tuple[Any, str]:
     """Get the client and model for the given model name.
 
     Args:
         model_name (str): The name of the model to get the client.
+        endpoint (Endpoint, optional): Endpoint selected by the router. Falls
+            back to `OLLAMA_BASE_URL` when not given.
 
     Raises:
         ValueError: If the model is not supported.
@@ -26,11 +49,13 @@ def get_client_llm(model_name: str, structured_output: bool = False) -> Tuple[An
     if model_name.startswith("ollama:") or model_name.startswith("ollama-"):
         # Pattern allows `ollama:llama3` or `ollama-llama3`
         parsed_model = re.sub(r"^ollama[:\-]", "", model_name)
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
-        client = openai.OpenAI(
-            api_key=os.getenv("OLLAMA_API_KEY", "ollama"),
-            base_url=base_url,
-        )
+        if endpoint is not None:
+            base_url = endpoint.base_url
+            api_key = endpoint.api_key or os.getenv("OLLAMA_API_KEY", "ollama")
+        else:
+            base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+            api_key = os.getenv("OLLAMA_API_KEY", "ollama")
+        client = get_openai_client(base_url, api_key)
         model_name = parsed_model
         if structured_output:
             client = instructor.from_openai(client, mode=instructor.Mode.TOOLS_STRICT)
@@ -115,6 +115,16 @@ class BanditBase(ABC):
     ) -> None:
         raise NotImplementedError
 
+    def update_usage(
+        self,
+        arm: Arm,
+        latency: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+        failed: bool = False,
+    ) -> None:
+        # observed call latency / throughput / failures; ignored by default
+        return None
+
     @abstractmethod
     def posterior(
         self,
@@ -148,6 +158,11 @@ class AsymmetricUCB(BanditBase):
         adaptive_scale: bool = True,
         asymmetric_scaling: bool = True,
         exponential_base: Optional[float] = 1.0,
+        reward_mode: str = "score",
+        latency_weight: float = 0.5,
+        throughput_weight: float = 0.5,
+        failure_weight: float = 1.0,
+        usage_alpha: float = 0.2,
     ):
         super().__init__(
             n_arms=n_arms,
@@ -172,6 +187,18 @@ class AsymmetricUCB(BanditBase):
 
         self.use_exponential_scaling = self.exponential_base is not None
 
+        # "score": reward score improvement only; "efficiency": additionally
+        # scale exploitation by relative latency, tokens/s and failure rate
+        if reward_mode not in ("score", "efficiency"):
+            raise ValueError("reward_mode must be 'score' or 'efficiency'")
+        self.reward_mode = reward_mode
+        self.latency_weight = float(latency_weight)
+        self.throughput_weight = float(throughput_weight)
+        self.failure_weight = float(failure_weight)
+        if not (0.0 < usage_alpha <= 1.0):
+            raise ValueError("usage_alpha must be in (0, 1]")
+        self.usage_alpha = float(usage_alpha)
+
         # if none, no exponential scaling
         if self.exponential_base is not None:
             assert self.exponential_base > 0.0, "exponential_base must be > 0"
@@ -186,6 +213,12 @@ class AsymmetricUCB(BanditBase):
             self.s = np.zeros(n, dtype=np.float64)
         self.divs = np.zeros(n, dtype=np.float64)
 
+        # ewma of per-call usage statistics
+        self.n_calls = np.zeros(n, dtype=np.float64)
+        self.latency = np.full(n, np.nan, dtype=np.float64)
+        self.tokens_per_s = np.full(n, np.nan, dtype=np.float64)
+        self.fail_rate = np.zeros(n, dtype=np.float64)
+
         if self.asymmetric_scaling:
             if self.use_exponential_scaling:
                 self._obs_max = -np.inf
@@ -286,6 +319,55 @@ class AsymmetricUCB(BanditBase):
         self.n_submitted[arm] += 1.0
         return self.n[arm]
 
+    def _ewma(self, old: float, new: float) -> float:
+        if not np.isfinite(old):
+            return new
+        return self.usage_alpha * new + (1.0 - self.usage_alpha) * old
+
+    def update_usage(self, arm, latency=None, output_tokens=None, failed=False):
+        i = self._resolve_arm(arm)
+        self.n_calls[i] += 1.0
+        self.fail_rate[i] = self._ewma(self.fail_rate[i], 1.0 if failed else 0.0)
+        if failed or latency is None or latency <= 0.0:
+            return
+        self.latency[i] = self._ewma(self.latency[i], float(latency))
+        if output_tokens:
+            tps = float(output_tokens) / float(latency)
+            self.tokens_per_s[i] = self._ewma(self.tokens_per_s[i], tps)
+
+    def _efficiency(self, idx) -> np.ndarray:
+        # multiplicative factor relative to the median arm; 1 if unobserved
+        factor = np.ones(np.size(idx), dtype=np.float64)
+        if self.reward_mode != "efficiency":
+            return factor
+        log_f = np.zeros(np.size(idx), dtype=np.float64)
+        lat = self.latency[idx]
+        seen = np.isfinite(self.latency)
+        if np.any(seen):
+            ref = float(np.median(self.latency[seen]))
+            ok = np.isfinite(lat) & (lat > 0.0)
+            log_f[ok] -= self.latency_weight * np.log(lat[ok] / max(ref, 1e-9))
+        tps = self.tokens_per_s[idx]
+        seen = np.isfinite(self.tokens_per_s)
+        if np.any(seen):
+            ref = float(np.median(self.tokens_per_s[seen]))
+            ok = np.isfinite(tps) & (tps > 0.0)
+            log_f[ok] += self.throughput_weight * np.log(tps[ok] / max(ref, 1e-9))
+        log_f -= self.failure_weight * self.fail_rate[idx]
+        return np.exp(log_f)
+
+    def _exploit(self, idx) -> np.ndarray:
+        means = self._normalized_means(idx)
+        if self.reward_mode != "efficiency":
+            return means
+        # Scale the distance above the lowest mean, not the mean itself:
+        # without adaptive scaling means can be negative, and multiplying a
+        # negative mean would favor slow arms over fast ones
+        all_means = self._normalized_means(np.arange(self._n_arms))
+        finite = all_means[np.isfinite(all_means)]
+        floor = min(float(finite.min()), 0.0) if finite.size else 0.0
+        return floor + (means - floor) * self._efficiency(idx)
+
     def update(self, arm, reward, baseline=None):
         i = self._resolve_arm(arm)
         is_real = reward is not None
@@ -346,7 +428,7 @@ class AsymmetricUCB(BanditBase):
                 return probs
 
             t = float(self.n.sum())
-            base = self._normalized_means(idx)
+            base = self._exploit(idx)
             num = 2.0 * np.log(max(t, 2.0))
             bonus = self.c * np.sqrt(num / n_sub)
             scores = base + bonus
@@ -395,7 +477,7 @@ class AsymmetricUCB(BanditBase):
                 probs[idx] = alloc / alloc.sum()
                 return probs
 
-        base = self._normalized_means(idx)
+        base = self._exploit(idx)
         t0 = float(self.n.sum())
         step = int(v.sum()) + 1
 
@@ -480,7 +562,7 @@ class AsymmetricUCB(BanditBase):
         idx = np.arange(self._n_arms)
 
         # exploitation and exploration components
-        exploitation = self._normalized_means(idx)
+        exploitation = self._exploit(idx)
         t = float(self.n.sum())
         num = 2.0 * np.log(max(t, 2.0))
         n_sub = np.maximum(self.n[idx], 1.0)
@@ -498,7 +580,8 @@ class AsymmetricUCB(BanditBase):
             f"adaptive={self.adaptive_scale}, asym={self.asymmetric_scaling}, "
             f"exp_base={exp_base_str}, shift_base={self._shift_by_baseline}, "
             f"shift_parent={self._shift_by_parent}, "
-            f"log_sum={self.use_exponential_scaling})"
+            f"log_sum={self.use_exponential_scaling}, "
+            f"reward={self.reward_mode})"
         )
 
         additional_info = []
@@ -528,7 +611,7 @@ class AsymmetricUCB(BanditBase):
         )
 
         # Add columns
-        table.add_column("arm", style="white", width=24)
+        table.add_column("arm", style="white", width=20)
         table.add_column("n", justify="right", style="green")
         table.add_column("div", justify="right", style="yellow")
         table.add_column(mean_label, justify="right", style="blue")
@@ -536,6 +619,12 @@ class AsymmetricUCB(BanditBase):
         table.add_column("explore", justify="right", style="cyan")
         table.add_column("score", justify="right", style="bold white")
         table.add_column("post", justify="right", style="bright_green")
+        table.add_column("lat(s)", justify="right", style="yellow")
+        table.add_column("tok/s", justify="right", style="green")
+        table.add_column("fail", justify="right", style="red")
+
+        def fmt_usage(x, spec):
+            return format(x, spec) if np.isfinite(x) else "-"
 
         # Add rows
         for i, name in enumerate(names):
@@ -553,6 +642,9 @@ class AsymmetricUCB(BanditBase):
                 f"{exploration[i]:.4f}",
                 f"{score[i]:.4f}",
                 f"{post[i]:.4f}",
+                fmt_usage(self.latency[i], ".2f"),
+                fmt_usage(self.tokens_per_s[i], ".1f"),
+                f"{self.fail_rate[i]:.2f}" if self.n_calls[i] > 0 else "-",
             )
 
         # Print directly to console
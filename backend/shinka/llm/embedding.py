@@ -2,8 +2,14 @@ import os
 import re
 import openai
 import pandas as pd
-from typing import Union, List, Optional, Tuple
+from typing import Union, List, Optional, Tuple, cast
 import numpy as np
+from .client import get_openai_client
+from .router import Endpoint, get_endpoint_pool
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .local_embedding import LOCAL_EMBEDDING_PREFIX, LocalEmbeddingClient
+from .chunking import POOLING_MODES, chunk_code, pool_embeddings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,18 +43,26 @@ GEMINI_EMBEDDING_COSTS = {
     "gemini-embedding-001": 0.0 / M,  # Check current pricing
 }
 
-def get_client_model(model_name: str) -> tuple[Union[openai.OpenAI, str], str]:
+def get_client_model(
+    model_name: str, endpoint: Optional[Endpoint] = None
+) -> tuple[Union[openai.OpenAI, LocalEmbeddingClient, str], str]:
     if model_name in OPENAI_EMBEDDING_MODELS:
         client = openai.OpenAI()
         model_to_use = model_name
+    elif model_name.startswith(LOCAL_EMBEDDING_PREFIX):
+        # In-process hashing embedder, e.g. `local:ngram` or `local:ngram-256`
+        client = LocalEmbeddingClient(model_name)
+        model_to_use = model_name
     elif model_name.startswith("ollama:") or model_name.startswith("ollama-"):
         # Pattern allows `ollama:nomic-embed-text` or `ollama-nomic-embed-text`
         model_to_use = re.sub(r"^ollama[:\-]", "", model_name)
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
-        client = openai.OpenAI(
-            api_key=os.getenv("OLLAMA_API_KEY", "ollama"),
-            base_url=base_url,
-        )
+        if endpoint is not None:
+            base_url = endpoint.base_url
+            api_key = endpoint.api_key or os.getenv("OLLAMA_API_KEY", "ollama")
+        else:
+            base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+            api_key = os.getenv("OLLAMA_API_KEY", "ollama")
+        client = get_openai_client(base_url, api_key)
     else:
         raise ValueError(f"Invalid embedding model: {model_name}")
 
@@ -57,17 +71,109 @@ def get_client_model(model_name: str) -> tuple[Union[openai.OpenAI, str], str]:
 
 class EmbeddingClient:
     def __init__(
-        self, model_name: str = "text-embedding-3-small", verbose: bool = False
+        self,
+        model_name: str = "text-embedding-3-small",
+        verbose: bool = False,
+        batch_size: int = 1,
+        batch_wait_ms: float = 5.0,
+        cache: Optional[EmbeddingCache] = None,
+        chunk_chars: int = 0,
+        pooling: str = "mean",
+        language: str = "python",
     ):
         """
         Initialize the EmbeddingClient.
 
         Args:
-            model (str): The OpenAI, Azure, or Gemini embedding model name to use.
+            model (str): The OpenAI, Ollama (`ollama:<name>`) or local
+                (`local:ngram[-<dim>]`) embedding model name to use.
+            batch_size (int): Max. number of concurrent single-input requests
+                coalesced into one API call. 1 disables batching.
+            batch_wait_ms (float): Max. time a request waits for a batch to fill.
+            cache (EmbeddingCache, optional): Persistent embedding cache.
+                Defaults to the shared cache at `$SHINKA_EMBEDDING_CACHE`, if set.
+            chunk_chars (int): Inputs longer than this are split on AST /
+                section boundaries, embedded per chunk and pooled. 0 disables.
+            pooling (str): Chunk pooling, "mean" (length-weighted) or "max".
+            language (str): Language of the embedded code, for chunk boundaries.
         """
         self.client, self.model = get_client_model(model_name)
         self.model_name = model_name
         self.verbose = verbose
+        # Ollama embedding models are routed through the shared endpoint pool
+        self.routed = model_name.startswith("ollama:") or model_name.startswith(
+            "ollama-"
+        )
+        self.cache = cache if cache is not None else get_embedding_cache()
+        if pooling not in POOLING_MODES:
+            raise ValueError(
+                f"Unknown pooling '{pooling}'. Choose from {POOLING_MODES}"
+            )
+        self.chunk_chars = chunk_chars
+        self.pooling = pooling
+        self.language = language
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if batch_size > 1:
+            self.batcher = EmbeddingBatcher(
+                self._create_embeddings,
+                self._response_cost,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_wait_ms,
+            )
+
+    def _response_cost(self, response) -> float:
+        usage_cost = OPENAI_EMBEDDING_COSTS.get(self.model, 0.0)
+        usage_tokens = getattr(getattr(response, "usage", None), "total_tokens", 0)
+        return usage_tokens * usage_cost
+
+    def cache_stats(self) -> Optional[dict]:
+        """Hit/miss counters of the embedding cache, if enabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def batch_stats(self) -> Optional[dict]:
+        """Batch-size / latency histograms of the request batcher, if enabled."""
+        return self.batcher.stats() if self.batcher is not None else None
+
+    def _create_embeddings(self, code: List[str]):
+        if not self.routed:
+            return self.client.embeddings.create(
+                model=self.model, input=code, encoding_format="float"
+            )
+
+        def attempt(endpoint, timeout):
+            client, _ = get_client_model(self.model_name, endpoint=endpoint)
+            return client.embeddings.create(
+                model=self.model, input=code, encoding_format="float", timeout=timeout
+            )
+
+        # Fails over to the other endpoints and backs off like LLM queries
+        response, _ = get_endpoint_pool().call_with_failover(
+            self.model_name, attempt
+        )
+        return response
+
+    def _embed_texts(self, texts: List[str]) -> Tuple[List[List[float]], float]:
+        """Embed `texts`, serving cache hits and sending only the misses."""
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        if self.cache is not None:
+            embeddings = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        cost = 0.0
+        if len(missing) == 1 and self.batcher is not None:
+            # Coalesced with concurrent requests into one API call
+            embeddings[missing[0]], cost = self.batcher.embed(texts[missing[0]])
+        elif missing:
+            response = self._create_embeddings([texts[i] for i in missing])
+            cost = self._response_cost(response)
+            for i, d in zip(missing, response.data):
+                embeddings[i] = d.embedding
+        if missing and self.cache is not None:
+            self.cache.put_many(
+                self.model_name,
+                [texts[i] for i in missing],
+                [embeddings[i] for i in missing],
+            )
+        return cast(List[List[float]], embeddings), cost
 
     def get_embedding(
         self, code: Union[str, List[str]]
@@ -89,17 +195,29 @@ class EmbeddingClient:
         else:
             single_code = False
         try:
-            response = self.client.embeddings.create(
-                model=self.model, input=code, encoding_format="float"
-            )
-            usage_cost = OPENAI_EMBEDDING_COSTS.get(self.model, 0.0)
-            usage_tokens = getattr(getattr(response, "usage", None), "total_tokens", 0)
-            cost = usage_tokens * usage_cost
-            # Extract embedding from response
+            if not self.chunk_chars:
+                embeddings, cost = self._embed_texts(code)
+            else:
+                # Long programs: embed all chunks in one request, then pool
+                chunks = [chunk_code(c, self.chunk_chars, language=self.language) for c in code]
+                flat = [chunk for item in chunks for chunk in item]
+                chunk_embeddings, cost = self._embed_texts(flat)
+                embeddings, offset = [], 0
+                for item in chunks:
+                    vectors = chunk_embeddings[offset : offset + len(item)]
+                    offset += len(item)
+                    if len(vectors) == 1:
+                        embeddings.append(vectors[0])
+                    else:
+                        embeddings.append(
+                            pool_embeddings(
+                                vectors, [len(c) for c in item], mode=self.pooling
+                            )
+                        )
             if single_code:
-                return response.data[0].embedding, cost
+                return embeddings[0], cost
             else:
-                return [d.embedding for d in response.data], cost
+                return embeddings, cost
         except Exception as e:
             logger.info(f"Error getting embedding: {e}")
             if single_code:
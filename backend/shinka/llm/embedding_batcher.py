@@ -0,0 +1,122 @@
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bucket bounds (ms) of the request latency histogram
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-input embedding requests into one call.
+
+    Requests are collected until `max_batch_size` inputs are pending or the
+    oldest one waited `max_wait_ms`; the batch is sent as one
+    `embeddings.create` and the vectors are fanned back to the callers.
+    Each caller is charged the batch cost in proportion to its input length.
+    """
+
+    def __init__(
+        self,
+        create_fn: Callable[[List[str]], Any],
+        cost_fn: Callable[[Any], float],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.create_fn = create_fn
+        self.cost_fn = cost_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: Dict[int, int] = {}
+        self._latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue `text`; the future resolves to `(embedding, cost)`."""
+        future: Future = Future()
+        self._queue.put((text, future, time.time()))
+        self._ensure_worker()
+        return future
+
+    def embed(self, text: str) -> Tuple[List[float], float]:
+        return self.submit(text).result()
+
+    def _collect(self) -> List[Tuple[str, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining <= 0:
+                    # Out of time, but still take whatever is already queued
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for text, _, _ in batch]
+            try:
+                response = self.create_fn(texts)
+                total_cost = self.cost_fn(response)
+                embeddings = [d.embedding for d in response.data]
+                if len(embeddings) != len(texts):
+                    raise RuntimeError(
+                        f"Got {len(embeddings)} embeddings for {len(texts)} inputs"
+                    )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self._record(batch)
+                continue
+            total_chars = sum(len(t) for t in texts) or 1
+            for (text, future, _), embedding in zip(batch, embeddings):
+                future.set_result((embedding, total_cost * len(text) / total_chars))
+            self._record(batch)
+
+    def _record(self, batch: List[Tuple[str, Future, float]]) -> None:
+        now = time.time()
+        with self._lock:
+            size = len(batch)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            for _, _, submitted in batch:
+                latency_ms = (now - submitted) * 1000.0
+                idx = bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+                self._latency_counts[idx] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size and request-latency histograms."""
+        with self._lock:
+            labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS]
+            labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+            num_batches = sum(self._batch_sizes.values())
+            num_requests = sum(s * n for s, n in self._batch_sizes.items())
+            return {
+                "batches": num_batches,
+                "requests": num_requests,
+                "mean_batch_size": num_requests / num_batches if num_batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "latency_ms": dict(zip(labels, self._latency_counts)),
+            }
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_ENV_VAR = "SHINKA_EMBEDDING_CACHE"
+
+
+def embedding_cache_key(model_name: str, text: str) -> str:
+    """Cache key: model name plus sha256 of the embedded (redacted) code."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    """Persistent embedding cache, float32 vectors in SQLite with LRU eviction.
+
+    Callers embed the `redact_immutable(code, no_state=True)` text, so the
+    key is stable across island copies, resubmissions and restarts. The file
+    is safe to share between processes (WAL mode); `path=":memory:"` keeps
+    the cache in-process only.
+    """
+
+    def __init__(
+        self, path: Union[str, Path] = ":memory:", max_entries: int = 100_000
+    ):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+        cursor = self.conn.cursor()
+        if self.path != ":memory:":
+            cursor.execute("PRAGMA journal_mode = WAL;")
+        cursor.execute("PRAGMA busy_timeout = 30000;")
+        cursor.execute("PRAGMA synchronous = NORMAL;")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access "
+            "ON embeddings(last_access)"
+        )
+        self.conn.commit()
+
+    def get_many(
+        self, model_name: str, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """Cached vectors for `texts` (None for misses); refreshes LRU order."""
+        keys = [embedding_cache_key(model_name, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.cursor()
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):
+                chunk = unique[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                for key, blob in cursor.fetchall():
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                cursor.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+            results = [found.get(key) for key in keys]
+            num_hits = sum(1 for r in results if r is not None)
+            self.hits += num_hits
+            self.misses += len(results) - num_hits
+        return results
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model_name, [text])[0]
+
+    def put_many(
+        self, model_name: str, texts: Sequence[str], vectors: Sequence[List[float]]
+    ) -> None:
+        now = time.time()
+        rows = [
+            (
+                embedding_cache_key(model_name, text),
+                len(vector),
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                now,
+            )
+            for text, vector in zip(texts, vectors)
+            if vector
+        ]
+        if not rows:
+            return
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(cursor)
+            self.conn.commit()
+
+    def put(self, model_name: str, text: str, vector: List[float]) -> None:
+        self.put_many(model_name, [text], [vector])
+
+    def _evict(self, cursor: sqlite3.Cursor) -> None:
+        cursor.execute("SELECT COUNT(*) FROM embeddings")
+        excess = cursor.fetchone()[0] - self.max_entries
+        if excess > 0:
+            cursor.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM embeddings")
+            return cursor.fetchone()[0]
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(
+    path: Optional[Union[str, Path]] = None, max_entries: int = 100_000
+) -> Optional[EmbeddingCache]:
+    """Process-wide cache for `path` (default: `$SHINKA_EMBEDDING_CACHE`).
+
+    Returns None if neither is set, i.e. caching is disabled.
+    """
+    path = path or os.getenv(CACHE_ENV_VAR)
+    if not path:
+        return None
+    key = str(Path(path).resolve()) if str(path) != ":memory:" else ":memory:"
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = EmbeddingCache(key, max_entries=max_entries)
+            _CACHES[key] = cache
+        return cache
+
+
+def configure_embedding_cache(
+    path: Union[str, Path], max_entries: int = 100_000
+) -> EmbeddingCache:
+    """Open the shared cache and export its path to child processes."""
+    cache = get_embedding_cache(path, max_entries=max_entries)
+    assert cache is not None
+    os.environ[CACHE_ENV_VAR] = cache.path
+    return cache
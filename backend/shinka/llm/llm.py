@@ -5,10 +5,12 @@ import json
 import multiprocessing as mp
 import asyncio
 from pydantic import BaseModel
-import time
 from .query import sample_model_kwargs, query
 from .models import QueryResult
 from .dynamic_sampling import BanditBase, FixedSampler
+from .usage import LLMUsage
+from .retry import CircuitOpenError, RetryPolicy
+from .router import get_endpoint_pool
 
 MAX_RETRIES = 3
 
@@ -26,6 +28,11 @@ class LLMClient:
         model_sample_probs: Optional[List[float]] = None,
         output_model: Optional[BaseModel] = None,
         verbose: bool = True,
+        caller: str = "llm",
+        stream: bool = False,
+        retry_deadline: float = 300.0,
+        retry_max_attempts: int = 6,
+        keep_alive: Optional[Union[str, float]] = None,
     ):
         self.temperatures = temperatures
         self.max_tokens = max_tokens
@@ -44,6 +51,22 @@ class LLMClient:
         self.output_model = output_model
         self.structured_output = output_model is not None
         self.verbose = verbose
+        # Usage is tagged with the caller (patch/novelty/meta) for reporting
+        self.caller = caller
+        self.stream = stream
+        self.usage = LLMUsage()
+        self.retry_policy = RetryPolicy(
+            deadline=retry_deadline, max_attempts=retry_max_attempts
+        )
+        self.last_error: Optional[Exception] = None
+        # How long the server keeps the model (and its prompt cache) loaded,
+        # sent as Ollama's `keep_alive` (e.g. "30m"); None: server default
+        self.keep_alive = keep_alive
+
+    def is_available(self) -> bool:
+        """False while the circuit is open for every configured model."""
+        pool = get_endpoint_pool()
+        return any(pool.is_available(name) for name in self.model_names)
 
     def batch_query(
         self,
@@ -83,7 +106,11 @@ class LLMClient:
                             msg[i],
                             system_msg[i],
                             msg_history[i],
-                            llm_kwargs[i],
+                            {
+                                **llm_kwargs[i],
+                                "stream": self.stream,
+                                "retry_policy": self.retry_policy,
+                            },
                             num_samples,
                             self.output_model,
                             self.verbose,
@@ -102,6 +129,10 @@ class LLMClient:
 
             # Sort by index and extract just the results
             results.sort(key=lambda x: x[0])
+            for idx, result in results:
+                self.usage.record(
+                    self.caller, result, llm_kwargs[idx].get("model_name")
+                )
             final_results = [r[1] for r in results if r[1] is not None]
 
             # Print batch total cost
@@ -171,6 +202,8 @@ class LLMClient:
                             self.output_model,
                             num_samples,
                             self.verbose,
+                            self.stream,
+                            self.retry_policy,
                         ),
                     )
                 )
@@ -186,6 +219,8 @@ class LLMClient:
 
             # Sort by index and extract just the results
             results.sort(key=lambda x: x[0])
+            for _, result in results:
+                self.usage.record(self.caller, result)
             final_results = [r[1] for r in results if r[1] is not None]
 
             # Print batch total cost
@@ -204,8 +239,18 @@ class LLMClient:
                 logger.info(f"==> SAMPLING: Total API costs: ${total_cost:.4f}")
             return final_results
 
-    def get_kwargs(self):
-        posterior = self.llm_selection.posterior()
+    def get_kwargs(self, exclude_models: Optional[List[str]] = None):
+        """Sample query kwargs from the selector posterior.
+
+        Models in `exclude_models` (e.g. with an open circuit) are skipped
+        unless no other model is left.
+        """
+        subset = None
+        if exclude_models:
+            subset = [
+                i for i, n in enumerate(self.model_names) if n not in exclude_models
+            ]
+        posterior = self.llm_selection.posterior(subset=subset or None)
         if self.verbose:
             lines = ["==> SAMPLING:"]
             for name, prob in zip(self.model_names, posterior):
@@ -225,6 +270,8 @@ class LLMClient:
         system_msg: str,
         msg_history: List[Dict] = [],
         llm_kwargs: Optional[Dict] = None,
+        response_format: Optional[Dict] = None,
+        session_key: Optional[str] = None,
     ) -> Optional[QueryResult]:
         """Execute a single query to the LLM.
 
@@ -234,43 +281,82 @@ class LLMClient:
             msg_history (List[Dict], optional): Message history. Defaults to [].
             llm_kwargs (Dict, optional): Additional LLM parameters.
                 Defaults to {}.
+            response_format (Dict, optional): OpenAI-style `response_format`
+                (e.g. a JSON schema) to constrain the output. Defaults to None.
+            session_key (str, optional): Routes queries of one session (e.g.
+                an island) to the same endpoint to reuse its prompt cache.
 
         Returns:
             QueryResult: The result of the query.
         """
+        # Get posterior probabilities and create model_posteriors dict
+        posterior = self.llm_selection.posterior()
+        model_posteriors = dict(zip(self.model_names, posterior))
+        model_posteriors = {k: float(v) for k, v in model_posteriors.items()}
         if llm_kwargs is None:
             llm_kwargs = sample_model_kwargs(
                 model_names=self.model_names,
                 temperatures=self.temperatures,
                 max_tokens=self.max_tokens,
                 reasoning_efforts=self.reasoning_efforts,
-                model_sample_probs=self.model_sample_probs,
+                model_sample_probs=posterior,
             )
         if self.verbose:
             logger.info(f"==> QUERYING: {list(llm_kwargs.values())}")
 
-        # Get posterior probabilities and create model_posteriors dict
-        posterior = self.llm_selection.posterior()
-        model_posteriors = dict(zip(self.model_names, posterior))
-        model_posteriors = {k: float(v) for k, v in model_posteriors.items()}
-        try_count = 0
-        while try_count < MAX_RETRIES:
-            try:
-                result = query(
-                    msg=msg,
-                    system_msg=system_msg,
-                    msg_history=msg_history,
-                    output_model=self.output_model,
-                    model_posteriors=model_posteriors,
-                    **llm_kwargs,
-                )
-                if self.verbose and hasattr(result, "cost") and result.cost is not None:
-                    logger.info(f"==> QUERY: API cost: ${result.cost:.4f}")
-                return result
-            except Exception as e:
-                logger.error(f"{try_count + 1}/{MAX_RETRIES} Error in query: {str(e)}")
-                try_count += 1
-        return None
+        self.last_error = None
+        extra_kwargs = {}
+        if response_format is not None:
+            extra_kwargs["response_format"] = response_format
+        if session_key is not None:
+            extra_kwargs["session_key"] = session_key
+        if self.keep_alive is not None:
+            extra_kwargs["extra_body"] = {"keep_alive": self.keep_alive}
+        try:
+            result = query(
+                msg=msg,
+                system_msg=system_msg,
+                msg_history=msg_history,
+                output_model=self.output_model,
+                model_posteriors=model_posteriors,
+                stream=self.stream,
+                retry_policy=self.retry_policy,
+                **llm_kwargs,
+                **extra_kwargs,
+            )
+        except Exception as e:
+            # query() already retried within the policy deadline
+            logger.error(f"Error in query: {str(e)}")
+            self.last_error = e
+            self._update_usage(llm_kwargs, None, error=e)
+            return None
+        if self.verbose and hasattr(result, "cost") and result.cost is not None:
+            logger.info(f"==> QUERY: API cost: ${result.cost:.4f}")
+        self._update_usage(llm_kwargs, result)
+        return result
+
+    def _update_usage(
+        self,
+        llm_kwargs: Dict,
+        result: Optional[QueryResult],
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Record usage and feed latency/throughput/failures to the selector."""
+        model_name = llm_kwargs.get("model_name")
+        self.usage.record(self.caller, result, model_name, error=error)
+        if isinstance(error, CircuitOpenError):
+            # Not the model's fault; do not penalize it in the selector
+            return
+        if model_name not in self.model_names:
+            return
+        if result is None:
+            self.llm_selection.update_usage(model_name, failed=True)
+        else:
+            self.llm_selection.update_usage(
+                model_name,
+                latency=result.wall_time,
+                output_tokens=result.output_tokens,
+            )
 
 
 class AsyncLLMClient:
@@ -1245,26 +1331,19 @@ def query_fn(
 ) -> tuple[int, Optional[QueryResult]]:
     if verbose:
         logger.info(f"==> SAMPLING: {idx + 1}/{total_samples} {list(kwargs.values())}")
-    try_count = 0
-    while try_count < MAX_RETRIES:
-        try:
-            result = query(
-                msg=msg,
-                system_msg=system_msg,
-                msg_history=msg_history,
-                output_model=output_model,
-                **kwargs,
-            )
-            return idx, result
-        except Exception as e:
-            logger.error(f"{try_count + 1}/{MAX_RETRIES} Error in query: {str(e)}")
-            try_count += 1
-            if try_count == MAX_RETRIES:
-                # Return None result after max retries
-                return idx, None
-            # Add a small delay between retries
-            time.sleep(1)
-    return idx, None
+    try:
+        result = query(
+            msg=msg,
+            system_msg=system_msg,
+            msg_history=msg_history,
+            output_model=output_model,
+            **kwargs,
+        )
+        return idx, result
+    except Exception as e:
+        # query() already retried within the policy deadline
+        logger.error(f"Error in query: {str(e)}")
+        return idx, None
 
 
 def sample_kwargs_query_fn(
@@ -1280,6 +1359,8 @@ def sample_kwargs_query_fn(
     output_model: Optional[BaseModel] = None,
     total_samples: int = 1,
     verbose: bool = False,
+    stream: bool = False,
+    retry_policy: Optional[RetryPolicy] = None,
 ) -> tuple[int, Optional[QueryResult]]:
     kwargs = sample_model_kwargs(
         model_names=model_names,
@@ -1296,27 +1377,22 @@ def sample_kwargs_query_fn(
         model_posteriors = {k: float(v) for k, v in model_posteriors.items()}
     if verbose:
         logger.info(f"==> SAMPLING: {idx + 1}/{total_samples} {list(kwargs.values())}")
-    try_count = 0
-    while try_count < MAX_RETRIES:
-        try:
-            result = query(
-                msg=msg,
-                system_msg=system_msg,
-                msg_history=msg_history,
-                output_model=output_model,
-                model_posteriors=model_posteriors,
-                **kwargs,
-            )
-            return idx, result
-        except Exception as e:
-            logger.error(f"{try_count + 1}/{MAX_RETRIES} Error in query: {str(e)}")
-            try_count += 1
-            if try_count == MAX_RETRIES:
-                # Return None result after max retries
-                return idx, None
-            # Add a small delay between retries
-            time.sleep(1)
-    return idx, None
+    try:
+        result = query(
+            msg=msg,
+            system_msg=system_msg,
+            msg_history=msg_history,
+            output_model=output_model,
+            model_posteriors=model_posteriors,
+            stream=stream,
+            retry_policy=retry_policy,
+            **kwargs,
+        )
+        return idx, result
+    except Exception as e:
+        # query() already retried within the policy deadline
+        logger.error(f"Error in query: {str(e)}")
+        return idx, None
 
 
 def extract_between(
@@ -0,0 +1,114 @@
+import re
+import zlib
+from dataclasses import dataclass
+from typing import List, Union
+import numpy as np
+
+LOCAL_EMBEDDING_PREFIX = "local:"
+DEFAULT_LOCAL_DIM = 512
+
+_TOKEN_RE = re.compile(r"[A-Za-z_]\w*|\d+(?:\.\d+)?|[^\s\w]")
+_WS_RE = re.compile(r"\s+")
+
+
+@dataclass
+class _Embedding:
+    embedding: List[float]
+    index: int
+
+
+@dataclass
+class _Usage:
+    prompt_tokens: int = 0
+    total_tokens: int = 0
+
+
+@dataclass
+class _EmbeddingResponse:
+    data: List[_Embedding]
+    model: str
+    usage: _Usage
+
+
+def parse_local_model(model_name: str) -> int:
+    """Dimension of a `local:ngram[-<dim>]` model name."""
+    spec = model_name[len(LOCAL_EMBEDDING_PREFIX) :]
+    match = re.fullmatch(r"ngram(?:-(\d+))?", spec)
+    if match is None:
+        raise ValueError(
+            f"Invalid local embedding model '{model_name}', "
+            "expected 'local:ngram' or 'local:ngram-<dim>'"
+        )
+    return int(match.group(1) or DEFAULT_LOCAL_DIM)
+
+
+class HashingNgramEmbedder:
+    """Deterministic in-process code embedder (feature hashing).
+
+    Token unigrams/bigrams and character 4-grams of the whitespace-normalized
+    text are hashed with crc32 into `dim` signed buckets, weighted with
+    sublinear term frequency and L2-normalized, so cosine similarity behaves
+    like TF-IDF-style lexical overlap. No network, no state, stable across
+    processes and Python versions (unlike the salted builtin `hash`).
+    """
+
+    def __init__(self, dim: int = DEFAULT_LOCAL_DIM, char_ngram: int = 4):
+        if dim < 8:
+            raise ValueError("dim must be >= 8")
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN_RE.findall(text)
+        feats = [f"t:{t}" for t in tokens]
+        feats.extend(f"b:{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        flat = _WS_RE.sub(" ", text).strip()
+        n = self.char_ngram
+        feats.extend(f"c:{flat[i : i + n]}" for i in range(len(flat) - n + 1))
+        return feats
+
+    def embed(self, text: str) -> List[float]:
+        feats = self._features(text)
+        if not feats:
+            return [0.0] * self.dim
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8")) for f in feats),
+            dtype=np.uint64,
+            count=len(feats),
+        )
+        buckets = (hashes % self.dim).astype(np.int64)
+        signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0)
+        # Sublinear tf: accumulate per (bucket, sign) then log-scale
+        pos = np.bincount(buckets[signs > 0], minlength=self.dim)
+        neg = np.bincount(buckets[signs < 0], minlength=self.dim)
+        vec = np.log1p(pos) - np.log1p(neg)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return vec.astype(np.float32).tolist()
+
+
+class _LocalEmbeddings:
+    def __init__(self, embedder: HashingNgramEmbedder, model: str):
+        self._embedder = embedder
+        self._model = model
+
+    def create(
+        self, model: str, input: Union[str, List[str]], **kwargs
+    ) -> _EmbeddingResponse:
+        texts = [input] if isinstance(input, str) else list(input)
+        data = [
+            _Embedding(embedding=self._embedder.embed(t), index=i)
+            for i, t in enumerate(texts)
+        ]
+        return _EmbeddingResponse(data=data, model=self._model, usage=_Usage())
+
+
+class LocalEmbeddingClient:
+    """Mimics the `client.embeddings.create` surface of an OpenAI client."""
+
+    def __init__(self, model_name: str):
+        self.dim = parse_local_model(model_name)
+        self.embeddings = _LocalEmbeddings(
+            HashingNgramEmbedder(dim=self.dim), model_name
+        )
@@ -1,31 +1,12 @@
-import backoff
-import openai
+import time
+from typing import Optional
+from .pricing import get_model_prices
 from .result import QueryResult
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def backoff_handler(details):
-    exc = details.get("exception")
-    if exc:
-        logger.warning(
-            f"Ollama - Retry {details['tries']} due to error: {exc}. Waiting {details['wait']:0.1f}s..."
-        )
-
-
-@backoff.on_exception(
-    backoff.expo,
-    (
-        openai.APIConnectionError,
-        openai.APIStatusError,
-        openai.RateLimitError,
-        openai.APITimeoutError,
-    ),
-    max_tries=10,
-    max_value=10,
-    on_backoff=backoff_handler,
-)
 def query_ollama(
     client,
     model,
@@ -34,35 +15,60 @@ def query_ollama(
     msg_history,
     output_model,
     model_posteriors=None,
+    stream: bool = False,
+    timeout: Optional[float] = None,
     **kwargs,
 ) -> QueryResult:
-    """Query Ollama via OpenAI-compatible endpoint."""
+    """Query Ollama via OpenAI-compatible endpoint.
+
+    With `stream=True` the response is streamed so that time-to-first-token
+    can be measured; token usage is then taken from the final usage chunk.
+    `timeout` applies to the request only and is not recorded in the result.
+    """
     new_msg_history = msg_history + [{"role": "user", "content": msg}]
-    if output_model is None:
+    messages = [
+        {"role": "system", "content": system_msg},
+        *new_msg_history,
+    ]
+    # Ollama typically does not support strict tool schemas, so structured
+    # output requests (output_model) fall back to plain text as well.
+    request_kwargs = dict(kwargs)
+    if timeout is not None:
+        request_kwargs["timeout"] = timeout
+    start = time.time()
+    ttft = None
+    if stream:
+        chunks = []
+        usage = None
         response = client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": system_msg},
-                *new_msg_history,
-            ],
-            **kwargs,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs,
         )
-        content = response.choices[0].message.content
-        new_msg_history.append({"role": "assistant", "content": content})
+        for chunk in response:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if ttft is None:
+                    ttft = time.time() - start
+                chunks.append(delta)
+        content = "".join(chunks)
     else:
-        # Ollama typically does not support strict tool schemas; fall back to text
         response = client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": system_msg},
-                *new_msg_history,
-            ],
-            **kwargs,
+            messages=messages,
+            **request_kwargs,
         )
         content = response.choices[0].message.content
-        new_msg_history.append({"role": "assistant", "content": content})
+        usage = getattr(response, "usage", None)
+    wall_time = time.time() - start
+    new_msg_history.append({"role": "assistant", "content": content})
 
-    usage = getattr(response, "usage", None)
     input_tokens = getattr(usage, "prompt_tokens", 0) or getattr(
         usage, "input_tokens", 0
     ) or 0
@@ -70,6 +76,11 @@ def query_ollama(
         usage, "output_tokens", 0
     ) or 0
 
+    prices = get_model_prices(model)
+    input_cost = input_tokens * prices["input_price"]
+    output_cost = output_tokens * prices["output_price"]
+    decode_time = wall_time - ttft if ttft is not None else wall_time
+
     result = QueryResult(
         content=content,
         msg=msg,
@@ -79,10 +90,15 @@ def query_ollama(
         kwargs=kwargs,
         input_tokens=input_tokens,
         output_tokens=output_tokens,
-        cost=0.0,
-        input_cost=0.0,
-        output_cost=0.0,
+        cost=input_cost + output_cost,
+        input_cost=input_cost,
+        output_cost=output_cost,
         thought="",
         model_posteriors=model_posteriors,
+        wall_time=wall_time,
+        time_to_first_token=ttft,
+        tokens_per_second=(
+            output_tokens / decode_time if decode_time > 0 else 0.0
+        ),
     )
     return result
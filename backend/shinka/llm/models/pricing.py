@@ -214,3 +214,24 @@ REASONING_BEDROCK_MODELS = [
     "bedrock/us.anthropic.claude-3-7-sonnet-20250219-v1:0",
     "bedrock/us.anthropic.claude-sonnet-4-20250514-v1:0",
 ]
+
+# Self-hosted models served through Ollama. Empty by default (free); add
+# entries (e.g. amortized GPU cost per token) to have them show up in costs.
+OLLAMA_MODELS = {}
+
+ZERO_PRICE = {"input_price": 0.0, "output_price": 0.0}
+
+
+def get_model_prices(model_name: str) -> dict:
+    """Look up per-token prices for `model_name` across all pricing tables."""
+    for table in (
+        OLLAMA_MODELS,
+        OPENAI_MODELS,
+        CLAUDE_MODELS,
+        GEMINI_MODELS,
+        DEEPSEEK_MODELS,
+        BEDROCK_MODELS,
+    ):
+        if model_name in table:
+            return table[model_name]
+    return ZERO_PRICE
@@ -17,6 +17,11 @@ class QueryResult:
         output_cost: float = 0.0,
         thought: str = "",
         model_posteriors: Optional[Dict[str, float]] = None,
+        wall_time: float = 0.0,
+        time_to_first_token: Optional[float] = None,
+        tokens_per_second: float = 0.0,
+        retries: int = 0,
+        retry_time: float = 0.0,
     ):
         self.content = content
         self.msg = msg
@@ -31,6 +36,11 @@ class QueryResult:
         self.output_cost = output_cost
         self.thought = thought
         self.model_posteriors = model_posteriors or {}
+        self.wall_time = wall_time
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.retries = retries
+        self.retry_time = retry_time
 
     def to_dict(self):
         return {
@@ -47,4 +57,9 @@ class QueryResult:
             "output_cost": self.output_cost,
             "thought": self.thought,
             "model_posteriors": self.model_posteriors,
+            "wall_time": self.wall_time,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "retries": self.retries,
+            "retry_time": self.retry_time,
         }
@@ -1,6 +1,9 @@
 from typing import List, Union, Optional, Dict
+import numpy as np
 from pydantic import BaseModel
 from .client import get_client_llm
+from .router import get_endpoint_pool
+from .retry import RetryPolicy
 from .models import query_ollama, QueryResult
 import logging
 
@@ -63,12 +66,21 @@ def sample_model_kwargs(
     max_tokens: Union[List[int], int] = 4096,
     reasoning_efforts: Union[List[str], str] = "",
     model_sample_probs: Optional[List[float]] = None,
+    rng: Optional[np.random.Generator] = None,
 ):
-    """Sample kwargs for Ollama; currently only temperature and max_tokens matter."""
+    """Sample kwargs for Ollama; currently only temperature and max_tokens matter.
+
+    The model is drawn from `model_sample_probs` (e.g. the bandit posterior),
+    temperature and max_tokens uniformly from the given lists. A freshly
+    seeded generator is used by default so forked batch workers do not all
+    draw the same sample.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
     if isinstance(model_names, str):
         model_names = [model_names]
-    if isinstance(temperatures, float):
-        temperatures = [temperatures]
+    if isinstance(temperatures, (float, int)):
+        temperatures = [float(temperatures)]
     if isinstance(max_tokens, int):
         max_tokens = [max_tokens]
 
@@ -76,14 +88,16 @@ def sample_model_kwargs(
     if model_sample_probs is not None:
         if len(model_sample_probs) != len(model_names):
             raise ValueError("model_sample_probs must match model_names length")
-        if not abs(sum(model_sample_probs) - 1.0) < 1e-9:
+        probs = np.asarray(model_sample_probs, dtype=np.float64)
+        if np.any(probs < 0.0) or not abs(probs.sum() - 1.0) < 1e-6:
             raise ValueError("model_sample_probs must sum to 1")
-        kwargs_dict["model_name"] = model_names[0]
+        model_idx = int(rng.choice(len(model_names), p=probs / probs.sum()))
     else:
-        kwargs_dict["model_name"] = model_names[0]
+        model_idx = int(rng.integers(len(model_names)))
+    kwargs_dict["model_name"] = model_names[model_idx]
 
-    kwargs_dict["temperature"] = temperatures[0]
-    kwargs_dict["max_tokens"] = max_tokens[0]
+    kwargs_dict["temperature"] = float(rng.choice(temperatures))
+    kwargs_dict["max_tokens"] = int(rng.choice(max_tokens))
     return kwargs_dict
 
 
@@ -94,27 +108,51 @@ def query(
     msg_history: List = [],
     output_model: Optional[BaseModel] = None,
     model_posteriors: Optional[Dict[str, float]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    session_key: Optional[str] = None,
     **kwargs,
 ) -> QueryResult:
-    """Query the LLM."""
+    """Query the LLM, routed to an endpoint of the shared endpoint pool.
+
+    This is the only retry layer for LLM calls: failed attempts fail over to
+    the other endpoints serving the model and back off with jitter once all
+    were tried, within the deadline of `retry_policy`. If every endpoint is
+    ejected, `CircuitOpenError` is raised immediately; errors that are not
+    worth retrying are raised as is and exhausted budgets raise `RetryError`.
+    Queries sharing a `session_key` stick to one endpoint.
+    """
     original_model_name = model_name
-    client, model_name = get_client_llm(
-        model_name, structured_output=output_model is not None
-    )
     if original_model_name.startswith("ollama:") or original_model_name.startswith(
         "ollama-"
     ):
         query_fn = query_ollama
     else:
         raise ValueError(f"Model {model_name} not supported.")
-    result = query_fn(
-        client,
-        model_name,
-        msg,
-        system_msg,
-        msg_history,
-        output_model,
-        model_posteriors=model_posteriors,
-        **kwargs,
+
+    def attempt(endpoint, timeout):
+        client, served_name = get_client_llm(
+            original_model_name,
+            structured_output=output_model is not None,
+            endpoint=endpoint,
+        )
+        return query_fn(
+            client,
+            served_name,
+            msg,
+            system_msg,
+            msg_history,
+            output_model,
+            model_posteriors=model_posteriors,
+            timeout=timeout,
+            **kwargs,
+        )
+
+    result, budget = get_endpoint_pool().call_with_failover(
+        original_model_name,
+        attempt,
+        retry_policy=retry_policy,
+        session_key=session_key,
     )
+    result.retries = budget.retries
+    result.retry_time = budget.retry_time
     return result
@@ -0,0 +1,139 @@
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+import logging
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+# Request timeout and rate limit; all 5xx are retryable as well
+RETRYABLE_STATUS = (408, 429)
+
+# Errors without a response: the request never got an answer
+TRANSIENT_ERRORS = tuple(
+    cls
+    for cls in (
+        ConnectionError,
+        TimeoutError,
+        getattr(httpx, "TransportError", None),
+        getattr(openai, "APIConnectionError", None),  # incl. APITimeoutError
+    )
+    if cls is not None
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when every endpoint serving a model is ejected (circuit open)."""
+
+
+class RetryError(RuntimeError):
+    """Raised when a call exhausts its retry budget or deadline."""
+
+    def __init__(self, message: str, attempts: int, retry_time: float):
+        super().__init__(message)
+        self.attempts = attempts
+        self.retry_time = retry_time
+
+
+@dataclass
+class RetryPolicy:
+    """Single retry layer for LLM calls.
+
+    `deadline` bounds the total time of a call including all retries;
+    backoff uses "full jitter", i.e. a uniform draw in
+    [0, min(max_delay, base_delay * 2**retry)].
+    """
+
+    deadline: float = 300.0
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 20.0
+
+    def backoff(self, retry: int, remaining: float) -> float:
+        cap = min(self.max_delay, self.base_delay * (2**retry))
+        return max(0.0, min(random.uniform(0.0, cap), remaining))
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of the response an error was raised for, if any."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transport errors, timeouts, rate limits and 5xx are worth retrying.
+
+    Anything else (other 4xx, parsing or programming errors) would fail the
+    same way again.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+class RetryBudget:
+    """Tracks attempts and time spent waiting for a single call."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.start = time.time()
+        self.attempt_start = self.start
+        self.attempts = 0
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+    @property
+    def retry_time(self) -> float:
+        """Time lost to failed attempts and backoff before the last attempt."""
+        return self.attempt_start - self.start
+
+    def begin_attempt(self) -> None:
+        self.attempts += 1
+        self.attempt_start = time.time()
+
+    def remaining(self) -> float:
+        return self.policy.deadline - (time.time() - self.start)
+
+    def should_retry(self, exc: BaseException) -> bool:
+        return (
+            is_retryable(exc)
+            and self.attempts < self.policy.max_attempts
+            and self.remaining() > 0.0
+        )
+
+    def wait(self, exc: Optional[BaseException] = None) -> None:
+        """Sleep for the jittered backoff of the upcoming retry."""
+        delay = self.policy.backoff(self.retries, self.remaining())
+        logger.warning(
+            f"LLM call attempt {self.attempts}/{self.policy.max_attempts} failed"
+            f" ({exc}); retrying in {delay:.1f}s"
+        )
+        time.sleep(delay)
+
+    def error(self, exc: BaseException) -> RetryError:
+        elapsed = time.time() - self.start
+        err = RetryError(
+            f"LLM call failed after {self.attempts} attempts "
+            f"({elapsed:.1f}s): {exc}",
+            attempts=self.attempts,
+            retry_time=elapsed,
+        )
+        err.__cause__ = exc
+        return err
@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from .retry import (
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    is_retryable,
+    status_code,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1"
+ROUTING_STRATEGIES = ("least_outstanding", "ewma_latency")
+
+
+@dataclass
+class Endpoint:
+    """A single OpenAI-compatible endpoint (e.g. one Ollama host)."""
+
+    base_url: str
+    models: List[str] = field(default_factory=list)  # empty = serves all
+    weight: float = 1.0
+    api_key: Optional[str] = None
+    # Runtime state, maintained by the pool
+    outstanding: int = 0
+    ewma_latency: Optional[float] = None
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    total_requests: int = 0
+    total_failures: int = 0
+
+    def serves(self, model: Optional[str]) -> bool:
+        return not self.models or model is None or model in self.models
+
+    def is_ejected(self, now: Optional[float] = None) -> bool:
+        return self.ejected_until > (now if now is not None else time.time())
+
+
+def _rendezvous(session_key: str, ep: Endpoint) -> float:
+    digest = hashlib.sha256(f"{session_key}|{ep.base_url}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") * max(ep.weight, 1e-6)
+
+
+class EndpointPool:
+    """Routes LLM and embedding requests across several endpoints.
+
+    Selection is either least-outstanding-requests (ties broken by EWMA
+    latency) or lowest weighted EWMA latency. Endpoints that fail
+    `max_failures` times in a row are ejected for `ejection_time` seconds.
+    Once the cooldown has passed they are half-open: the next request is
+    their trial, whose outcome readmits or re-ejects them (one trial at a
+    time).
+    Together this acts as a per-endpoint circuit breaker: while every endpoint
+    serving a model is ejected, `select` fails fast with `CircuitOpenError`.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        strategy: str = "least_outstanding",
+        ewma_alpha: float = 0.3,
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        health_check_timeout: float = 2.0,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointPool requires at least one endpoint")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(
+                f"Unknown routing strategy '{strategy}'. "
+                f"Choose from {ROUTING_STRATEGIES}"
+            )
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.health_check_timeout = health_check_timeout
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls, config: Union[str, List[Union[str, Dict[str, Any]]]], **kwargs
+    ) -> "EndpointPool":
+        """Build a pool from a list of URLs / dicts or a JSON / CSV string."""
+        if isinstance(config, str):
+            config = config.strip()
+            if config.startswith("["):
+                config = json.loads(config)
+            else:
+                config = [u.strip() for u in config.split(",") if u.strip()]
+        endpoints = []
+        for entry in config:
+            if isinstance(entry, str):
+                endpoints.append(Endpoint(base_url=entry))
+            else:
+                endpoints.append(
+                    Endpoint(
+                        base_url=entry["base_url"],
+                        models=list(entry.get("models", [])),
+                        weight=float(entry.get("weight", 1.0)),
+                        api_key=entry.get("api_key"),
+                    )
+                )
+        return cls(endpoints, **kwargs)
+
+    def _score(self, ep: Endpoint) -> tuple:
+        weight = max(ep.weight, 1e-6)
+        latency = ep.ewma_latency if ep.ewma_latency is not None else 0.0
+        if self.strategy == "ewma_latency":
+            # Scale latency by pending work so a fast host is not flooded
+            return (latency * (ep.outstanding + 1) / weight, ep.outstanding)
+        return (ep.outstanding / weight, latency)
+
+    def select(
+        self,
+        model: Optional[str] = None,
+        exclude: Optional[List[Endpoint]] = None,
+        session_key: Optional[str] = None,
+    ) -> Endpoint:
+        """Pick the best healthy endpoint serving `model`.
+
+        Endpoints in `exclude` (e.g. ones that just failed this request) are
+        skipped unless nothing else serves the model. With a `session_key`,
+        requests of the same session stick to one healthy endpoint
+        (rendezvous hashing) so its prompt/KV cache can be reused.
+        """
+        now = time.time()
+        exclude_ids = {id(ep) for ep in exclude or []}
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep.serves(model)]
+            if exclude_ids:
+                remaining = [ep for ep in candidates if id(ep) not in exclude_ids]
+                candidates = remaining or candidates
+            if not candidates:
+                raise ValueError(f"No endpoint in pool serves model '{model}'")
+            # Half-open: the cooldown expired, so one real request decides
+            # instead of blocking the caller on a health check. The trial
+            # keeps the endpoint ejected for everyone else until it ends.
+            half_open = [
+                ep
+                for ep in candidates
+                if not ep.is_ejected(now)
+                and ep.consecutive_failures >= self.max_failures
+            ]
+            if half_open:
+                trial = min(half_open, key=self._score)
+                trial.ejected_until = now + self.ejection_time
+                return trial
+            healthy = [
+                ep
+                for ep in candidates
+                if not ep.is_ejected(now) and ep.consecutive_failures < self.max_failures
+            ]
+            if not healthy:
+                retry_in = min(ep.ejected_until for ep in candidates) - now
+                raise CircuitOpenError(
+                    f"All endpoints for '{model}' are ejected "
+                    f"(next retry in {max(retry_in, 0.0):.0f}s)"
+                )
+            if session_key is not None:
+                return max(healthy, key=lambda ep: _rendezvous(session_key, ep))
+            return min(healthy, key=self._score)
+
+    def is_available(self, model: Optional[str] = None) -> bool:
+        """False while every endpoint serving `model` is ejected."""
+        now = time.time()
+        with self._lock:
+            return any(
+                not ep.is_ejected(now) for ep in self.endpoints if ep.serves(model)
+            )
+
+    def health_check(self, ep: Endpoint) -> bool:
+        """GET `{base_url}/models`; any 2xx response counts as healthy."""
+        url = ep.base_url.rstrip("/") + "/models"
+        request = urllib.request.Request(url)
+        if ep.api_key:
+            request.add_header("Authorization", f"Bearer {ep.api_key}")
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.health_check_timeout
+            ) as response:
+                return 200 <= response.status < 300
+        except Exception as e:
+            logger.debug(f"Health check failed for {ep.base_url}: {e}")
+            return False
+
+    def check_all(self) -> Dict[str, bool]:
+        """Health check every endpoint, ejecting or readmitting as needed."""
+        status = {}
+        for ep in self.endpoints:
+            ok = self.health_check(ep)
+            with self._lock:
+                if ok:
+                    ep.consecutive_failures = 0
+                    ep.ejected_until = 0.0
+                else:
+                    ep.consecutive_failures = max(
+                        ep.consecutive_failures, self.max_failures
+                    )
+                    ep.ejected_until = time.time() + self.ejection_time
+            status[ep.base_url] = ok
+        return status
+
+    def report_success(self, ep: Endpoint, latency: float) -> None:
+        with self._lock:
+            if ep.consecutive_failures >= self.max_failures:
+                logger.info(f"Endpoint {ep.base_url} answered again, readmitted.")
+            ep.consecutive_failures = 0
+            ep.ejected_until = 0.0
+            if ep.ewma_latency is None:
+                ep.ewma_latency = latency
+            else:
+                ep.ewma_latency = (
+                    self.ewma_alpha * latency
+                    + (1.0 - self.ewma_alpha) * ep.ewma_latency
+                )
+
+    def report_failure(self, ep: Endpoint) -> None:
+        with self._lock:
+            ep.consecutive_failures += 1
+            ep.total_failures += 1
+            if ep.consecutive_failures >= self.max_failures:
+                ep.ejected_until = time.time() + self.ejection_time
+                logger.warning(
+                    f"Ejecting endpoint {ep.base_url} for {self.ejection_time:.0f}s "
+                    f"after {ep.consecutive_failures} consecutive failures."
+                )
+
+    @contextmanager
+    def track(self, ep: Endpoint) -> Iterator[Endpoint]:
+        """Account an in-flight request against `ep`.
+
+        Only errors that point at the endpoint (transport errors, timeouts,
+        429 and 5xx) count as failures; a 4xx answer to a bad request still
+        shows the endpoint is up.
+        """
+        with self._lock:
+            ep.outstanding += 1
+            ep.total_requests += 1
+        start = time.time()
+        try:
+            yield ep
+        except Exception as e:
+            if is_retryable(e):
+                self.report_failure(ep)
+            elif status_code(e) is not None:
+                self.report_success(ep, time.time() - start)
+            raise
+        else:
+            self.report_success(ep, time.time() - start)
+        finally:
+            with self._lock:
+                ep.outstanding -= 1
+
+    def call_with_failover(
+        self,
+        model: Optional[str],
+        fn: Callable[[Endpoint, float], T],
+        retry_policy: Optional[RetryPolicy] = None,
+        session_key: Optional[str] = None,
+    ) -> Tuple[T, RetryBudget]:
+        """Run `fn(endpoint, timeout)` on an endpoint serving `model`.
+
+        Retryable failures fail over to the other endpoints serving the model
+        and back off with jitter once all were tried, within the deadline of
+        `retry_policy`. Other errors are raised as is, `CircuitOpenError` if
+        every endpoint is ejected and `RetryError` once the budget is spent.
+        """
+        budget = RetryBudget(retry_policy or RetryPolicy())
+        num_endpoints = self.num_endpoints(model)
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self.select(model, exclude=tried, session_key=session_key)
+            budget.begin_attempt()
+            try:
+                with self.track(endpoint):
+                    return fn(endpoint, max(budget.remaining(), 1.0)), budget
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if not budget.should_retry(e):
+                    raise budget.error(e) from e
+                tried.append(endpoint)
+                if len(tried) >= num_endpoints:
+                    # Every endpoint failed once: back off before the next round
+                    tried = []
+                    budget.wait(e)
+                else:
+                    logger.warning(
+                        f"Request to {endpoint.base_url} failed ({e}); failing over."
+                    )
+
+    def num_endpoints(self, model: Optional[str] = None) -> int:
+        return sum(1 for ep in self.endpoints if ep.serves(model))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "base_url": ep.base_url,
+                    "outstanding": ep.outstanding,
+                    "ewma_latency": ep.ewma_latency,
+                    "requests": ep.total_requests,
+                    "failures": ep.total_failures,
+                    "ejected": ep.is_ejected(now),
+                }
+                for ep in self.endpoints
+            ]
+
+
+_POOL: Optional[EndpointPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_from_env() -> EndpointPool:
+    strategy = os.getenv("OLLAMA_ROUTING", "least_outstanding")
+    config: Union[str, List[Any], None] = os.getenv("OLLAMA_ENDPOINTS")
+    config_file = os.getenv("OLLAMA_ENDPOINTS_FILE")
+    if not config and config_file:
+        with open(config_file, "r") as f:
+            config = json.load(f)
+    if not config:
+        config = [os.getenv("OLLAMA_BASE_URL", DEFAULT_BASE_URL)]
+    pool = EndpointPool.from_config(config, strategy=strategy)
+    default_key = os.getenv("OLLAMA_API_KEY", "ollama")
+    for ep in pool.endpoints:
+        if ep.api_key is None:
+            ep.api_key = default_key
+    return pool
+
+
+def get_endpoint_pool() -> EndpointPool:
+    """Return the process-wide endpoint pool, building it from env on first use.
+
+    `OLLAMA_ENDPOINTS` holds either comma-separated base URLs or a JSON list
+    of `{"base_url", "models", "weight", "api_key"}` entries
+    (`OLLAMA_ENDPOINTS_FILE` may point to such a JSON file instead). Without
+    either, the pool holds the single `OLLAMA_BASE_URL` endpoint.
+    `OLLAMA_ROUTING` selects the strategy.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = _pool_from_env()
+        return _POOL
+
+
+def configure_endpoint_pool(
+    endpoints: List[Union[str, Dict[str, Any]]],
+    strategy: str = "least_outstanding",
+    **kwargs,
+) -> EndpointPool:
+    """Install a process-wide pool and export it to child processes.
+
+    The configuration is mirrored into `OLLAMA_ENDPOINTS`/`OLLAMA_ROUTING` so
+    evaluation subprocesses (e.g. the LLM judge) route the same way.
+    """
+    global _POOL
+    pool = EndpointPool.from_config(list(endpoints), strategy=strategy, **kwargs)
+    default_key = os.getenv("OLLAMA_API_KEY", "ollama")
+    for ep in pool.endpoints:
+        if ep.api_key is None:
+            ep.api_key = default_key
+    os.environ["OLLAMA_ENDPOINTS"] = json.dumps(
+        [e if isinstance(e, dict) else {"base_url": e} for e in endpoints]
+    )
+    os.environ["OLLAMA_ROUTING"] = strategy
+    with _POOL_LOCK:
+        _POOL = pool
+    return pool
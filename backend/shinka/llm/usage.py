@@ -0,0 +1,147 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional
+from .models import QueryResult
+from .retry import RetryError
+
+# Per (caller, model) counters; everything else is derived from these
+USAGE_FIELDS = (
+    "calls",
+    "failures",
+    "input_tokens",
+    "output_tokens",
+    "wall_time",
+    "decode_time",
+    "ttft_sum",
+    "ttft_count",
+    "cost",
+    "retries",
+    "retry_time",
+)
+
+UsageDict = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def served_model_name(model_name: str) -> str:
+    """Strip the provider prefix, e.g. `ollama:gemma3` -> `gemma3`."""
+    return re.sub(r"^ollama[:\-]", "", model_name)
+
+
+def merge_usage(target: UsageDict, other: Optional[UsageDict]) -> UsageDict:
+    """Add the counters of `other` into `target` (in place) and return it."""
+    for caller, models in (other or {}).items():
+        caller_stats = target.setdefault(caller, {})
+        for model, stats in models.items():
+            entry = caller_stats.setdefault(model, {k: 0.0 for k in USAGE_FIELDS})
+            for key in USAGE_FIELDS:
+                entry[key] = entry.get(key, 0.0) + float(stats.get(key, 0.0))
+    return target
+
+
+def usage_from_result(
+    caller: str,
+    result: Optional[QueryResult],
+    model_name: Optional[str] = None,
+    error: Optional[BaseException] = None,
+) -> UsageDict:
+    """Build a single-call usage record; `result=None` records a failure."""
+    if result is None:
+        model = served_model_name(model_name or "unknown")
+        stats = {"calls": 1.0, "failures": 1.0}
+        if isinstance(error, RetryError):
+            stats["retries"] = float(max(error.attempts - 1, 0))
+            stats["retry_time"] = float(error.retry_time)
+        return {caller: {model: stats}}
+    wall_time = float(result.wall_time or 0.0)
+    ttft = result.time_to_first_token
+    decode_time = wall_time - ttft if ttft is not None else wall_time
+    return {
+        caller: {
+            served_model_name(result.model_name): {
+                "calls": 1.0,
+                "input_tokens": float(result.input_tokens or 0),
+                "output_tokens": float(result.output_tokens or 0),
+                "wall_time": wall_time,
+                "decode_time": max(decode_time, 0.0),
+                "ttft_sum": float(ttft) if ttft is not None else 0.0,
+                "ttft_count": 1.0 if ttft is not None else 0.0,
+                "cost": float(result.cost or 0.0),
+                "retries": float(getattr(result, "retries", 0) or 0),
+                "retry_time": float(getattr(result, "retry_time", 0.0) or 0.0),
+            }
+        }
+    }
+
+
+def summarize_usage(usage: UsageDict) -> List[Dict[str, Any]]:
+    """Flatten usage into one row per (caller, model) with derived rates."""
+    rows = []
+    for caller in sorted(usage):
+        for model in sorted(usage[caller]):
+            s = usage[caller][model]
+            ok_calls = s.get("calls", 0.0) - s.get("failures", 0.0)
+            rows.append(
+                {
+                    "caller": caller,
+                    "model": model,
+                    "calls": int(s.get("calls", 0.0)),
+                    "failures": int(s.get("failures", 0.0)),
+                    "input_tokens": int(s.get("input_tokens", 0.0)),
+                    "output_tokens": int(s.get("output_tokens", 0.0)),
+                    "wall_time": s.get("wall_time", 0.0),
+                    "avg_latency": (
+                        s.get("wall_time", 0.0) / ok_calls if ok_calls > 0 else None
+                    ),
+                    "avg_ttft": (
+                        s["ttft_sum"] / s["ttft_count"]
+                        if s.get("ttft_count", 0.0) > 0
+                        else None
+                    ),
+                    "tokens_per_second": (
+                        s.get("output_tokens", 0.0) / s["decode_time"]
+                        if s.get("decode_time", 0.0) > 0
+                        else None
+                    ),
+                    "cost": s.get("cost", 0.0),
+                    "retries": int(s.get("retries", 0.0)),
+                    "retry_time": s.get("retry_time", 0.0),
+                }
+            )
+    return rows
+
+
+class LLMUsage:
+    """Thread-safe accumulator of LLM usage per caller and model.
+
+    The runner drains it after each proposal / meta update and stores the
+    counters in program metadata under `llm_usage`.
+    """
+
+    def __init__(self):
+        self._usage: UsageDict = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        caller: str,
+        result: Optional[QueryResult],
+        model_name: Optional[str] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        record = usage_from_result(caller, result, model_name, error)
+        with self._lock:
+            merge_usage(self._usage, record)
+
+    def merge(self, other: Optional[UsageDict]) -> None:
+        with self._lock:
+            merge_usage(self._usage, other)
+
+    def to_dict(self) -> UsageDict:
+        with self._lock:
+            return merge_usage({}, self._usage)
+
+    def drain(self) -> UsageDict:
+        """Return the accumulated usage and reset the counters."""
+        with self._lock:
+            usage, self._usage = self._usage, {}
+        return usage
@@ -1,9 +1,13 @@
 from .prompts_base import (
     construct_eval_history_msg,
     construct_individual_program_msg,
+    construct_program_fragment,
+    join_eval_history,
     perf_str,
     format_text_feedback_section,
+    error_summary,
     BASE_SYSTEM_MSG,
+    RELATIVE_BASE_MSG,
 )
 from .prompts_diff import DIFF_SYS_FORMAT, DIFF_ITER_MSG
 from .prompts_full import (
@@ -22,17 +26,29 @@ from .prompts_meta import (
     META_STEP1_USER_MSG,
     META_STEP2_SYSTEM_MSG,
     META_STEP2_USER_MSG,
+    META_REDUCE_SYSTEM_MSG,
+    META_REDUCE_USER_MSG,
     META_STEP3_SYSTEM_MSG,
     META_STEP3_USER_MSG,
 )
+from .budget import count_tokens, fit_inspirations, FragmentCache
 from .prompts_novelty import NOVELTY_SYSTEM_MSG, NOVELTY_USER_MSG
+from .prompts_structured import (
+    DIFF_JSON_SYS_FORMAT,
+    FULL_JSON_SYS_FORMAT,
+    STRUCTURED_SYS_FORMATS,
+)
 
 __all__ = [
     "construct_eval_history_msg",
     "construct_individual_program_msg",
+    "construct_program_fragment",
+    "join_eval_history",
     "perf_str",
     "format_text_feedback_section",
+    "error_summary",
     "BASE_SYSTEM_MSG",
+    "RELATIVE_BASE_MSG",
     "DIFF_SYS_FORMAT",
     "DIFF_ITER_MSG",
     "FULL_SYS_FORMAT_DEFAULT",
@@ -47,8 +63,16 @@ __all__ = [
     "META_STEP1_USER_MSG",
     "META_STEP2_SYSTEM_MSG",
     "META_STEP2_USER_MSG",
+    "META_REDUCE_SYSTEM_MSG",
+    "META_REDUCE_USER_MSG",
     "META_STEP3_SYSTEM_MSG",
     "META_STEP3_USER_MSG",
+    "count_tokens",
+    "fit_inspirations",
+    "FragmentCache",
     "NOVELTY_SYSTEM_MSG",
     "NOVELTY_USER_MSG",
+    "DIFF_JSON_SYS_FORMAT",
+    "FULL_JSON_SYS_FORMAT",
+    "STRUCTURED_SYS_FORMATS",
 ]
@@ -0,0 +1,184 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from shinka.database import Program
+from shinka.edit.apply_diff import redact_immutable
+from shinka.edit.relative import encode_relative
+from .prompts_base import construct_program_fragment
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_ENCODING = None
+_ENCODING_LOCK = threading.Lock()
+_ENCODING_FAILED = False
+
+
+def _get_encoding():
+    """The cl100k encoding, or None if tiktoken is missing or cannot load it
+    (e.g. no network to fetch the BPE file); tried once per process."""
+    global _ENCODING, _ENCODING_FAILED
+    if tiktoken is None or _ENCODING_FAILED:
+        return None
+    if _ENCODING is None:
+        with _ENCODING_LOCK:
+            if _ENCODING is None and not _ENCODING_FAILED:
+                try:
+                    _ENCODING = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    _ENCODING_FAILED = True
+                    logger.warning(
+                        f"Could not load tiktoken encoding ({e}); "
+                        "estimating tokens as ~4 chars each."
+                    )
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` (tiktoken cl100k if available, else ~4 chars)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class Fragment:
+    """A rendered inspiration program and its size in tokens."""
+
+    text: str
+    tokens: int
+    redacted: bool = False
+
+
+class FragmentCache:
+    """LRU cache of rendered program fragments.
+
+    Programs are immutable once in the database, so a fragment is keyed by
+    program id and rendering options and never has to be invalidated.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Fragment]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, render: Callable[[], Fragment]) -> Fragment:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = render()
+        with self._lock:
+            self._entries[key] = fragment
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+
+def program_fragment(
+    prog: Program,
+    language: str,
+    include_text_feedback: bool,
+    redacted: bool = False,
+    cache: Optional[FragmentCache] = None,
+    base: Optional[Program] = None,
+) -> Optional[Fragment]:
+    """Rendered fragment of `prog`; redacted ones keep only EVOLVE blocks.
+
+    With a `base` program the code is sent as a unified diff against it
+    (when that is smaller). Returns None for a redacted fragment of code
+    without EVOLVE blocks or of a diff-encoded program.
+    """
+
+    def render() -> Optional[Fragment]:
+        code = None
+        if base is not None:
+            diff = encode_relative(base.code, prog.code)
+            if diff is not None:
+                if redacted:
+                    return None
+                text = construct_program_fragment(
+                    prog, "diff", include_text_feedback, diff
+                )
+                return Fragment(text=text, tokens=count_tokens(text))
+        if redacted:
+            code = redact_immutable(prog.code, no_state=True)
+            if not code.strip() or len(code) >= len(prog.code):
+                return None
+            code = redact_immutable(prog.code)
+        text = construct_program_fragment(prog, language, include_text_feedback, code)
+        return Fragment(text=text, tokens=count_tokens(text), redacted=redacted)
+
+    if cache is None or not prog.id:
+        return render()
+    base_id = base.id if base is not None else None
+    key = (prog.id, language, include_text_feedback, redacted, base_id)
+    return cache.get(key, render)
+
+
+def fit_inspirations(
+    programs: List[Program],
+    budget: Optional[int],
+    language: str = "python",
+    include_text_feedback: bool = False,
+    cache: Optional[FragmentCache] = None,
+    base: Optional[Program] = None,
+) -> Tuple[List[Optional[Fragment]], Dict[str, int]]:
+    """Fragments for `programs` fitting `budget` tokens in total.
+
+    Lowest-value programs (incorrect first, then by combined score) are
+    redacted to their EVOLVE blocks first, then dropped, until the rest fits.
+    Returns one entry per program (None if dropped) and fitting stats.
+    """
+    fragments: List[Optional[Fragment]] = [
+        program_fragment(p, language, include_text_feedback, cache=cache, base=base)
+        for p in programs
+    ]
+    stats = {"num_redacted": 0, "num_dropped": 0}
+
+    def total() -> int:
+        return sum(f.tokens for f in fragments if f is not None)
+
+    if budget is None or total() <= budget:
+        return fragments, stats
+
+    order = sorted(
+        range(len(programs)),
+        key=lambda i: (bool(programs[i].correct), programs[i].combined_score or 0.0),
+    )
+    for i in order:
+        if total() <= budget:
+            break
+        redacted = program_fragment(
+            programs[i],
+            language,
+            include_text_feedback,
+            redacted=True,
+            cache=cache,
+            base=base,
+        )
+        if redacted is not None and redacted.tokens < fragments[i].tokens:
+            fragments[i] = redacted
+            stats["num_redacted"] += 1
+    for i in order:
+        if total() <= budget:
+            break
+        if fragments[i] is not None and fragments[i].redacted:
+            stats["num_redacted"] -= 1
+        fragments[i] = None
+        stats["num_dropped"] += 1
+    return fragments, stats
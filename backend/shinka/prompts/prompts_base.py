@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from shinka.database import Program
 
 
@@ -10,6 +10,17 @@ BASE_SYSTEM_MSG = (
 )
 
 
+RELATIVE_BASE_MSG = """# Island base program
+
+To save space, the programs below are shown as unified diffs against this base program. Apply a diff to the base to obtain the full text of a program. Your SEARCH blocks or rewrites must refer to the full text of the current program, not to its diff.
+
+```{language}
+{base_code}
+```
+
+"""
+
+
 def perf_str(combined_score: float, public_metrics: Dict[str, float]) -> str:
     perf_str = f"Combined score to maximize: {combined_score:.2f}\n"
     for key, value in public_metrics.items():
@@ -20,14 +31,29 @@ def perf_str(combined_score: float, public_metrics: Dict[str, float]) -> str:
     return perf_str[:-2]
 
 
-def format_text_feedback_section(text_feedback) -> str:
-    """Format text feedback for inclusion in prompts."""
-    if not text_feedback or not text_feedback.strip():
+def error_summary(prog: Program) -> str:
+    """Compact errors of an incorrect program (see `extract_error_summary`),
+    unless they are already part of its text feedback."""
+    if prog.correct:
+        return ""
+    summary = (prog.metadata or {}).get("error_summary") or ""
+    feedback = prog.text_feedback
+    if isinstance(feedback, list):
+        feedback = "\n".join(feedback)
+    if summary and feedback and summary.strip() in feedback:
         return ""
+    return summary.strip()
 
-    feedback_text = text_feedback
+
+def format_text_feedback_section(text_feedback, errors: str = "") -> str:
+    """Format text feedback (and errors of the program) for prompts."""
+    feedback_text = text_feedback or ""
     if isinstance(feedback_text, list):
         feedback_text = "\n".join(feedback_text)
+    if errors:
+        feedback_text = f"{feedback_text.strip()}\n\nErrors:\n{errors}"
+    if not feedback_text.strip():
+        return ""
 
     return f"""
 Here is additional text feedback about the current program:
@@ -36,6 +62,41 @@ Here is additional text feedback about the current program:
 """
 
 
+EVAL_HISTORY_HEADER = (
+    "Here are the performance metrics of a set of prioviously "
+    "implemented programs:\n\n"
+)
+
+
+def construct_program_fragment(
+    prog: Program,
+    language: str = "python",
+    include_text_feedback: bool = False,
+    code: Optional[str] = None,
+) -> str:
+    """Code, metrics and optional text feedback of one prior program.
+
+    `code` overrides the program's code, e.g. with a redacted version.
+    """
+    code = prog.code if code is None else code
+    fragment = f"```{language}\n{code}\n```\n\n"
+    fragment += (
+        f"Performance metrics:\n"
+        f"{perf_str(prog.combined_score, prog.public_metrics)}\n\n"
+    )
+
+    # Add text feedback if available and requested
+    if include_text_feedback and prog.text_feedback:
+        feedback_text = prog.text_feedback
+        if isinstance(feedback_text, list):
+            feedback_text = "\n".join(feedback_text)
+        if feedback_text.strip():
+            fragment += f"Text feedback:\n{feedback_text.strip()}\n\n"
+    if include_text_feedback and error_summary(prog):
+        fragment += f"Errors:\n{error_summary(prog)}\n\n"
+    return fragment
+
+
 def construct_eval_history_msg(
     inspiration_programs: List[Program],
     language: str = "python",
@@ -43,27 +104,19 @@ def construct_eval_history_msg(
 ) -> str:
     """Construct an edit message for the given parent program and
     inspiration programs."""
-    inspiration_str = (
-        "Here are the performance metrics of a set of prioviously "
-        "implemented programs:\n\n"
+    return join_eval_history(
+        [
+            construct_program_fragment(prog, language, include_text_feedback)
+            for prog in inspiration_programs
+        ]
     )
-    for i, prog in enumerate(inspiration_programs):
-        if i == 0:
-            inspiration_str += "# Prior programs\n\n"
-        inspiration_str += f"```{language}\n{prog.code}\n```\n\n"
-        inspiration_str += (
-            f"Performance metrics:\n"
-            f"{perf_str(prog.combined_score, prog.public_metrics)}\n\n"
-        )
 
-        # Add text feedback if available and requested
-        if include_text_feedback and prog.text_feedback:
-            feedback_text = prog.text_feedback
-            if isinstance(feedback_text, list):
-                feedback_text = "\n".join(feedback_text)
-            if feedback_text.strip():
-                inspiration_str += f"Text feedback:\n{feedback_text.strip()}\n\n"
 
+def join_eval_history(fragments: List[str]) -> str:
+    """Assemble rendered program fragments into the eval history message."""
+    inspiration_str = EVAL_HISTORY_HEADER
+    if fragments:
+        inspiration_str += "# Prior programs\n\n" + "".join(fragments)
     return inspiration_str
 
 
@@ -94,5 +147,7 @@ def construct_individual_program_msg(
             feedback_text = "\n".join(feedback_text)
         if feedback_text.strip():
             program_str += f"Text feedback:\n{feedback_text.strip()}\n\n"
+    if include_text_feedback and error_summary(program):
+        program_str += f"Errors:\n{error_summary(program)}\n\n"
 
     return program_str
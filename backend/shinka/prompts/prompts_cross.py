@@ -1,7 +1,8 @@
 import random
-from typing import List
+from typing import List, Optional
 
 from shinka.database import Program
+from shinka.edit.relative import encode_relative
 from .prompts_base import perf_str
 
 
@@ -57,6 +58,7 @@ def get_cross_component(
     archive_inspirations: List[Program],
     top_k_inspirations: List[Program],
     language: str = "python",
+    base: Optional[Program] = None,
 ) -> str:
     all_inspirations = archive_inspirations + top_k_inspirations
 
@@ -66,7 +68,12 @@ def get_cross_component(
     inspiration = random.choice(all_inspirations)
 
     crossover_inspiration = "# Crossover Inspiration Programs\n"
-    crossover_inspiration += f"```{language}\n{inspiration.code}\n```\n\n"
+    diff = encode_relative(base.code, inspiration.code) if base else None
+    if diff is not None:
+        crossover_inspiration += "(as a diff against the island base program)\n"
+        crossover_inspiration += f"```diff\n{diff}\n```\n\n"
+    else:
+        crossover_inspiration += f"```{language}\n{inspiration.code}\n```\n\n"
     crossover_inspiration += f"Performance metrics: {perf_str(inspiration.combined_score, inspiration.public_metrics)}\n\n"
 
     return crossover_inspiration
@@ -90,6 +90,26 @@ META_STEP2_USER_MSG = (
     "ANALYSIS."
 )
 
+# Step 2 (reduce): Condense a batch of program summaries when all of them
+# do not fit the step-2 prompt budget
+META_REDUCE_SYSTEM_MSG = (
+    "You are an expert programming assistant condensing evaluation "
+    "summaries of evolved programs without losing the evidence needed to "
+    "compare them."
+)
+
+META_REDUCE_USER_MSG = (
+    "# Program Summaries\n"
+    "{individual_summaries}\n\n"
+    "# Instructions\n\n"
+    "Condense the program summaries above into a single summary of at most "
+    "{max_words} words. Keep the program identifiers (generation and patch "
+    "name), their correctness and scores, and the key implementation "
+    "changes that explain them. Group programs that tried the same idea. "
+    "Preserve the best-scoring programs and notable failures in full detail. "
+    "Do not add analysis or recommendations."
+)
+
 # Step 3: Recommendations Generation
 META_STEP3_SYSTEM_MSG = (
     "You are an expert programming assistant generating actionable "
@@ -0,0 +1,41 @@
+"""
+Output format overrides for the schema-constrained (structured) patch mode.
+"""
+
+DIFF_JSON_SYS_FORMAT = """
+
+# Output format override
+
+Respond with a single JSON object instead of the tagged text format above:
+
+{
+  "name": "<edit name, lowercase with underscores>",
+  "description": "<description and argumentation of the edit>",
+  "edits": [
+    {"search": "<text copied verbatim from the current file>", "replace": "<new text>"}
+  ]
+}
+
+Each entry of "edits" corresponds to one SEARCH/REPLACE block and follows the same rules. Do not add markdown fences or SEARCH/REPLACE markers inside the strings."""
+
+
+FULL_JSON_SYS_FORMAT = """
+
+# Output format override
+
+Respond with a single JSON object instead of a markdown code fence:
+
+{
+  "name": "<edit name, lowercase with underscores>",
+  "description": "<description and argumentation of the edit>",
+  "code": "<the FULL rewritten file, including the EVOLVE-BLOCK markers>"
+}
+
+Do not wrap the code string in markdown fences."""
+
+
+STRUCTURED_SYS_FORMATS = {
+    "diff": DIFF_JSON_SYS_FORMAT,
+    "full": FULL_JSON_SYS_FORMAT,
+    "cross": FULL_JSON_SYS_FORMAT,
+}
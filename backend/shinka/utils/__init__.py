@@ -1,5 +1,6 @@
 from .load_df import load_programs_to_df, get_path_to_best_node, store_best_path
 from .general import parse_time_to_seconds, load_results
+from .general import configure_log_limits, extract_error_summary, read_log
 from .utils_hydra import build_cfgs_from_python, add_evolve_markers, chdir_to_function_dir, wrap_object, load_hydra_config
 
 __all__ = [
@@ -8,6 +9,9 @@ __all__ = [
     "store_best_path",
     "parse_time_to_seconds",
     "load_results",
+    "configure_log_limits",
+    "extract_error_summary",
+    "read_log",
     "build_cfgs_from_python",
     "add_evolve_markers",
     "chdir_to_function_dir",
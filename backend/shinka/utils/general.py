@@ -1,14 +1,119 @@
 import json
+import re
+from collections import deque
 from pathlib import Path
+from typing import List, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bytes kept from the start and the end of each job log by `load_results`;
+# None keeps the whole log. Set with `configure_log_limits`.
+LOG_HEAD_BYTES: Optional[int] = 4096
+LOG_TAIL_BYTES: Optional[int] = 16384
+
+_TRACEBACK_START = "Traceback (most recent call last):"
+_ERROR_LINE = re.compile(
+    r"\b(\w*Error|\w*Exception|FAILED|Killed|Segmentation fault|"
+    r"out of memory|Timeout|timed out)\b",
+    re.IGNORECASE,
+)
+
+
+def configure_log_limits(head_bytes: Optional[int], tail_bytes: Optional[int]):
+    """Set how much of each job log `load_results` keeps."""
+    global LOG_HEAD_BYTES, LOG_TAIL_BYTES
+    LOG_HEAD_BYTES, LOG_TAIL_BYTES = head_bytes, tail_bytes
+
+
+def read_log(
+    path: Union[str, Path],
+    head_bytes: Optional[int] = None,
+    tail_bytes: Optional[int] = None,
+) -> str:
+    """
+    Reads the head and tail of a log file without loading the rest.
+
+    The omitted middle is replaced by a note pointing to the full file. With
+    both limits None (or a small enough file) the whole log is returned.
+    """
+    path = Path(path)
+    if not path.exists():
+        return ""
+    size = path.stat().st_size
+    head, tail = head_bytes or 0, tail_bytes or 0
+    with open(path, "rb") as f:
+        if (head_bytes is None and tail_bytes is None) or size <= head + tail:
+            return f.read().decode("utf-8", errors="replace")
+        head_text = f.read(head)
+        f.seek(size - tail)
+        tail_text = f.read(tail)
+    note = f"\n[... {size - head - tail} bytes omitted, full log: {path} ...]\n"
+    return (
+        head_text.decode("utf-8", errors="replace")
+        + note
+        + tail_text.decode("utf-8", errors="replace")
+    )
+
+
+def extract_error_summary(
+    log_paths: List[Union[str, Path]],
+    error: Optional[str] = None,
+    max_lines: int = 8,
+    max_chars: int = 2000,
+) -> str:
+    """
+    Compact error report of a failed job, for prompts.
+
+    Streams the logs line by line and keeps the evaluator's error message,
+    the last Python traceback and the last few error-like lines.
+    """
+    traceback_lines: List[str] = []
+    error_lines: deque = deque(maxlen=max_lines)
+    for log_path in log_paths:
+        if not Path(log_path).exists():
+            continue
+        current: Optional[List[str]] = None
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip()
+                if line.startswith(_TRACEBACK_START):
+                    current = [line]
+                elif current is not None:
+                    current.append(line)
+                    # The exception line ends the traceback
+                    if line and not line[0].isspace():
+                        traceback_lines, current = current, None
+                elif _ERROR_LINE.search(line) and line not in error_lines:
+                    error_lines.append(line)
+
+    parts = []
+    if error:
+        parts.append(f"Error: {error.strip()}")
+    if traceback_lines:
+        # Outermost call and the frames closest to the error
+        if len(traceback_lines) > 2 * max_lines:
+            traceback_lines = (
+                traceback_lines[:3] + ["  ..."] + traceback_lines[-2 * max_lines :]
+            )
+        parts.append("\n".join(traceback_lines))
+    lines = [line for line in error_lines if line not in traceback_lines]
+    if lines:
+        parts.append("\n".join(lines))
+    summary = "\n".join(parts)
+    if len(summary) > max_chars:
+        summary = summary[: max_chars - 4] + " ..."
+    return summary
+
 
 def load_results(results_dir: str):
     """
     Loads results from the specified directory.
 
+    Logs are read up to `LOG_HEAD_BYTES` and `LOG_TAIL_BYTES` (see
+    `read_log`); their paths are returned as well, and failed jobs get an
+    `error_summary`.
+
     Args:
         results_dir: The directory containing the results.
 
@@ -19,18 +124,17 @@ def load_results(results_dir: str):
     results_dir_path = Path(results_dir)
 
     stdout_log_path = results_dir_path / "job_log.out"
-    if stdout_log_path.exists():
-        with open(stdout_log_path, "r") as f:
-            loaded_results["stdout_log"] = f.read()
-    else:
-        loaded_results["stdout_log"] = ""
-
     stderr_log_path = results_dir_path / "job_log.err"
-    if stderr_log_path.exists():
-        with open(stderr_log_path, "r") as f:
-            loaded_results["stderr_log"] = f.read()
-    else:
-        loaded_results["stderr_log"] = ""
+    loaded_results["stdout_log"] = read_log(
+        stdout_log_path, LOG_HEAD_BYTES, LOG_TAIL_BYTES
+    )
+    loaded_results["stderr_log"] = read_log(
+        stderr_log_path, LOG_HEAD_BYTES, LOG_TAIL_BYTES
+    )
+    loaded_results["log_paths"] = {
+        "stdout": str(stdout_log_path),
+        "stderr": str(stderr_log_path),
+    }
 
     metrics_file_path = results_dir_path / "metrics.json"
     if metrics_file_path.exists():
@@ -55,6 +159,12 @@ def load_results(results_dir: str):
     else:
         loaded_results["correct"] = {"correct": False}
 
+    correct = loaded_results["correct"]
+    if not correct.get("correct", False):
+        loaded_results["error_summary"] = extract_error_summary(
+            [stderr_log_path, stdout_log_path], error=correct.get("error")
+        )
+
     return loaded_results
 
 